@@ -0,0 +1,65 @@
+"""
+Compare two results of benchmarks/run.py by median wall time of cases.
+
+Usage:
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+
+Exit code is 1 if any case is slower than baseline by more than threshold.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return f"{result['name']} {json.dumps(result['params'], sort_keys=True)}"
+
+
+def load(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        return {case_key(result): result for result in json.load(f)["results"]}
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Any]],
+    current: Dict[str, Dict[str, Any]],
+    threshold: float,
+) -> List[Tuple[str, float, float, float, bool]]:
+    """
+    Compare median wall times of cases which are present in both results.
+
+    :param baseline: results of baseline by key of case
+    :param current: results of current run by key of case
+    :param threshold: allowed relative slowdown, for example 0.1 is 10%
+    :return: list of tuple which contain key of case, baseline median, current median, ratio and regression flag
+    """
+
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        before = baseline[key]["median"]
+        after = current[key]["median"]
+        ratio = after / before if before else float("inf")
+        rows.append((key, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare results of ffmpeg_wrapper benchmarks")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    for key, before, after, ratio, is_regression in rows:
+        mark = "REGRESSION" if is_regression else ""
+        print(f"{key:<80} {before:10.4f}s {after:10.4f}s {ratio:6.2f}x {mark}")
+
+    if any(row[4] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+from typing import List
+
+from ffmpeg_wrapper.simple import FFMPEGWrapperException, execute_command, silent
+
+
+def tone_ffmpeg_command(
+    frequency: int,
+    duration_value: float,
+    output_path: str,
+    sample_rate: int = 48000,
+    channels: int = 2,
+) -> List[str]:
+    """
+    Build command for ffmpeg which create sine tone audio by lavfi source.
+
+    :param frequency: frequency of tone in Hz
+    :param duration_value: duration of audio in seconds
+    :param output_path: path to result
+    :param sample_rate: sample rate
+    :param channels: the number of channels
+    :return: completed ffmpeg command for shell
+    """
+
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency={frequency}:sample_rate={sample_rate}:duration={duration_value}",
+        "-ac",
+        f"{channels}",
+        "-y",
+        output_path,
+    ]
+
+
+def tone(frequency: int, duration_value: float, output_path: str) -> str:
+    """
+    Create sine tone audio if it doesn't exist, fixtures are reused by following runs.
+
+    :param frequency: frequency of tone in Hz
+    :param duration_value: duration of audio in seconds
+    :param output_path: path to result
+    :return: output_path
+    """
+
+    if os.path.exists(output_path):
+        return output_path
+
+    command_kwargs = dict(frequency=frequency, duration_value=duration_value, output_path=output_path)
+    status, out, er = execute_command(tone_ffmpeg_command, **command_kwargs)
+    if status:
+        command = tone_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+    return output_path
+
+
+def fragments(
+    directory: str,
+    count: int,
+    fragment_duration: float,
+    extension: str = "wav",
+    unique: int = 16,
+) -> List[str]:
+    """
+    Build list of book parts for benchmark. Only unique different fragments are synthesized, build list repeats them,
+    so fixture of 5000 fragments is ready in seconds. Every fourth fragment is silence created by silent().
+
+    :param directory: directory for fixtures
+    :param count: the number of fragments in build list
+    :param fragment_duration: duration of one fragment in seconds
+    :param extension: extension of files which selects format
+    :param unique: the number of synthesized files
+    :return: paths of fragments
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    pool = []
+    for index in range(min(unique, count)):
+        path = os.path.join(directory, f"fragment_{index}_{fragment_duration:g}s.{extension}")
+        if index % 4 == 3:
+            if not os.path.exists(path):
+                silent(fragment_duration, path)
+        else:
+            tone(220 + 55 * index, fragment_duration, path)
+        pool.append(path)
+
+    return [pool[index % len(pool)] for index in range(count)]
+
+
+def book(directory: str, duration_value: float, extension: str = "wav") -> str:
+    """
+    Return path of long tone audio for benchmarks of single file functions.
+
+    :param directory: directory for fixtures
+    :param duration_value: duration of audio in seconds
+    :param extension: extension of file which selects format
+    :return: path to audio
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    return tone(440, duration_value, os.path.join(directory, f"book_{duration_value:g}s.{extension}"))
@@ -0,0 +1,234 @@
+"""
+Benchmark suite of ffmpeg_wrapper.
+
+Fixtures are synthesized by ffmpeg lavfi sources and silent() to fixtures directory and reused by following runs.
+Results are written to JSON file, compare two of them with benchmarks/compare.py.
+
+Usage:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --cases concatenate --sizes 10,100 --workers 1,4 --repeats 5 --output concat.json
+"""
+
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from benchmarks.fixtures import book, fragments
+from ffmpeg_wrapper.instrumentation import CommandCounters, add_hook, remove_hook
+from ffmpeg_wrapper.simple import concat_ffmpeg_command, concatenate, convert, durations, silent, volume_detect
+
+
+SIZES = (10, 100, 1000, 5000)
+DURATIONS = (60.0, 600.0)
+FRAGMENT_DURATION = 0.5
+REPEATS = 3
+CASES = ("concat_ffmpeg_command", "concatenate", "durations", "convert", "silent", "volume_detect")
+
+
+def measure(
+    name: str,
+    params: Dict[str, Any],
+    func: Callable[[], Any],
+    repeats: int,
+    audio_duration: Optional[float] = None,
+    items: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Run function several times and collect wall times and resources used by ffmpeg processes.
+
+    :param name: name of case
+    :param params: parameters of case, together with name they are key of result for comparison
+    :param func: measured function
+    :param repeats: the number of runs
+    :param audio_duration: duration of processed audio in seconds, it is used for throughput
+    :param items: the number of processed items (fragments, files), it is used for throughput
+    :return: result of case
+    """
+
+    counters = add_hook(CommandCounters())
+    wall_times = []
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            func()
+            wall_times.append(time.perf_counter() - started)
+    finally:
+        remove_hook(counters)
+
+    median = statistics.median(wall_times)
+    processes = counters.snapshot()
+    result = {
+        "name": name,
+        "params": params,
+        "repeats": repeats,
+        "wall_times": wall_times,
+        "min": min(wall_times),
+        "median": median,
+        "mean": statistics.fmean(wall_times),
+        "processes": sum(kind["count"] for kind in processes.values()) // repeats,
+        "cpu_time": sum(kind["user_time"] + kind["system_time"] for kind in processes.values()) / repeats,
+        "max_rss": max((kind["max_rss"] or 0 for kind in processes.values()), default=None),
+    }
+    if audio_duration is not None:
+        result["audio_seconds_per_second"] = audio_duration / median if median else None
+    if items is not None:
+        result["items_per_second"] = items / median if median else None
+
+    print(f"{name} {json.dumps(params)}: median {median:.4f}s", file=sys.stderr)
+    return result
+
+
+def concat_ffmpeg_command_cases(fixtures: str, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    for size in args.sizes:
+        build_list = [f"{index}.wav" for index in range(size)]
+        yield measure(
+            "concat_ffmpeg_command",
+            {"size": size},
+            lambda: concat_ffmpeg_command(build_list, "book.wav", use_normalization=True),
+            args.repeats,
+            items=size,
+        )
+
+
+def concatenate_cases(fixtures: str, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, "book.wav")
+        for size in args.sizes:
+            build_list = fragments(fixtures, size, args.fragment_duration)
+            for workers in args.workers:
+                yield measure(
+                    "concatenate",
+                    {"size": size, "workers": workers, "fragment_duration": args.fragment_duration},
+                    lambda: concatenate(build_list, output_path, max_workers=workers, tmp_dir=output_dir),
+                    args.repeats,
+                    audio_duration=size * args.fragment_duration,
+                    items=size,
+                )
+
+
+def durations_cases(fixtures: str, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    for size in args.sizes:
+        for extension in ("wav", "mp3"):
+            paths = fragments(fixtures, size, args.fragment_duration, extension=extension)
+            for workers in args.workers:
+                yield measure(
+                    "durations",
+                    {"size": size, "workers": workers, "format": extension},
+                    lambda: durations(paths, max_workers=workers),
+                    args.repeats,
+                    items=size,
+                )
+
+
+def convert_cases(fixtures: str, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as output_dir:
+        for duration_value in args.durations:
+            input_path = book(fixtures, duration_value)
+            output_path = os.path.join(output_dir, "book.mp3")
+            yield measure(
+                "convert",
+                {"duration": duration_value, "format": "mp3", "bit_rate": 128},
+                lambda: convert(("book", input_path, "wav"), ("book", output_path, "mp3"), 128),
+                args.repeats,
+                audio_duration=duration_value,
+            )
+
+
+def silent_cases(fixtures: str, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as output_dir:
+        for duration_value in args.durations:
+            for extension in ("wav", "mp3"):
+                output_path = os.path.join(output_dir, f"pause.{extension}")
+                yield measure(
+                    "silent",
+                    {"duration": duration_value, "format": extension},
+                    lambda: silent(duration_value, output_path),
+                    args.repeats,
+                    audio_duration=duration_value,
+                )
+
+
+def volume_detect_cases(fixtures: str, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    for duration_value in args.durations:
+        input_path = book(fixtures, duration_value)
+        yield measure(
+            "volume_detect",
+            {"duration": duration_value},
+            lambda: volume_detect(input_path),
+            args.repeats,
+            audio_duration=duration_value,
+        )
+
+
+CASE_RUNNERS = {
+    "concat_ffmpeg_command": concat_ffmpeg_command_cases,
+    "concatenate": concatenate_cases,
+    "durations": durations_cases,
+    "convert": convert_cases,
+    "silent": silent_cases,
+    "volume_detect": volume_detect_cases,
+}
+
+
+def ffmpeg_version() -> Optional[str]:
+    try:
+        output = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True, check=False).stdout
+    except OSError:
+        return None
+    return output.splitlines()[0] if output else None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg_version(),
+    }
+
+
+def parse_list(value: str, cast: Callable[[str], Any]) -> List[Any]:
+    return [cast(item) for item in value.split(",") if item]
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks of ffmpeg_wrapper")
+    parser.add_argument("--cases", type=lambda value: parse_list(value, str), default=list(CASES))
+    parser.add_argument("--sizes", type=lambda value: parse_list(value, int), default=list(SIZES))
+    parser.add_argument("--durations", type=lambda value: parse_list(value, float), default=list(DURATIONS))
+    parser.add_argument(
+        "--workers", type=lambda value: parse_list(value, int), default=sorted({1, os.cpu_count() or 1})
+    )
+    parser.add_argument("--fragment-duration", type=float, default=FRAGMENT_DURATION)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "ffmpeg_wrapper_benchmarks"))
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.cases) - set(CASE_RUNNERS)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    results = []
+    for case in args.cases:
+        results.extend(CASE_RUNNERS[case](args.fixtures, args))
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
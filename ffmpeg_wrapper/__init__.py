@@ -1,4 +1,26 @@
-from ffmpeg_wrapper.simple import convert, concatenate, duration, silent, volume_detect
+from ffmpeg_wrapper.simple import (
+    convert,
+    convert_many,
+    concatenate,
+    duration,
+    durations,
+    normalize,
+    Silence,
+    silent,
+    simple_concatenate,
+    volume_detect,
+)
 
 
-__all__ = ["convert", "concatenate", "duration", "silent", "volume_detect"]
+__all__ = [
+    "convert",
+    "convert_many",
+    "concatenate",
+    "duration",
+    "durations",
+    "normalize",
+    "Silence",
+    "silent",
+    "simple_concatenate",
+    "volume_detect",
+]
@@ -0,0 +1,863 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+import os
+import signal
+import tempfile
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from ffmpeg_wrapper.cache import MetadataCache
+from ffmpeg_wrapper.filtergraph import filter_scripts
+from ffmpeg_wrapper.instrumentation import StatsHook, command_stats, emit, has_hooks
+from ffmpeg_wrapper.pipes import STREAM_CHUNK_SIZE, _terminated_exception, convert_stream_ffmpeg_command
+from ffmpeg_wrapper.progress import Progress, ProgressParser
+from ffmpeg_wrapper.simple import (
+    CONCAT_FAN_IN,
+    DURATION_CACHE_KIND,
+    INTERMEDIATE_CODEC,
+    INTERMEDIATE_EXTENSION,
+    PIPE_READ_SIZE,
+    STDERR_TAIL_LINES,
+    TERMINATE_GRACE_PERIOD,
+    VOLUME_DETECT_CACHE_KIND,
+    WATCHDOG_INTERVAL,
+    BuildList,
+    CancellationToken,
+    FFMPEGWrapperCancelledException,
+    FFMPEGWrapperException,
+    FFMPEGWrapperTimeoutException,
+    LineSplitter,
+    _remove_partial_outputs,
+    _signal_process,
+    command_arguments,
+    concat_ffmpeg_command,
+    concat_loudnorm_measure_ffmpeg_command,
+    convert_ffmpeg_command,
+    convert_many_ffmpeg_command,
+    duration_ffmpeg_command,
+    execution_options,
+    joined_output,
+    loudnorm_measure_ffmpeg_command,
+    output_paths,
+    parse_duration,
+    parse_loudnorm,
+    parse_volume_detect,
+    silent_ffmpeg_command,
+    stderr_tail_collector,
+    thread_options,
+    total_duration,
+    volume_detect_command,
+    volume_detect_line_collector,
+)
+from ffmpeg_wrapper.wav import wav_duration, write_silence
+
+
+async def _terminate(process_handle: asyncio.subprocess.Process, group: bool = False) -> None:
+    """
+    Terminate process, kill it if it doesn't exit in TERMINATE_GRACE_PERIOD and wait for it,
+    so cancelled task doesn't leave running ffmpeg behind (see ffmpeg_wrapper.simple.terminate_process).
+
+    :param process_handle: running process
+    :param group: signal whole process group, process must be started with start_new_session=True
+    """
+
+    if process_handle.returncode is None:
+        _signal_process(process_handle, signal.SIGTERM, group)
+        try:
+            await asyncio.wait_for(asyncio.shield(process_handle.wait()), TERMINATE_GRACE_PERIOD)
+        except asyncio.TimeoutError:
+            _signal_process(process_handle, getattr(signal, "SIGKILL", signal.SIGTERM), group)
+
+    await process_handle.wait()
+
+
+async def _watch_cancel_token(
+    process_handle: asyncio.subprocess.Process,
+    cancel_token: CancellationToken,
+    reasons: List[str],
+    group: bool,
+) -> None:
+    while process_handle.returncode is None:
+        if cancel_token.cancelled:
+            reasons.append("cancelled")
+            await _terminate(process_handle, group)
+            return
+        await asyncio.sleep(WATCHDOG_INTERVAL)
+
+
+async def _read_stream(
+    stream: asyncio.StreamReader,
+    splitter: Optional[LineSplitter],
+    chunks: Optional[List[bytes]] = None,
+) -> None:
+    while True:
+        chunk = await stream.read(PIPE_READ_SIZE)
+        if not chunk:
+            break
+        if chunks is not None:
+            chunks.append(chunk)
+        if splitter is not None:
+            splitter.feed(chunk)
+
+    if splitter is not None:
+        splitter.close()
+
+
+async def execute_command(command_func: Callable, *args, **kwargs) -> Tuple[int, str, str]:
+    """
+    Async executor for all commands. Execute command in subprocess and wait complete task without blocking event loop.
+    If task is cancelled, timeout expires or cancel_token is cancelled then process group of subprocess is terminated
+    and partial outputs are removed.
+
+    Output is read incrementally the same way as in ffmpeg_wrapper.simple.execute_command.
+
+    :param command_func: function will be executed in subprocess
+    :param args: values which transferred to command_func
+    :param kwargs: values which transferred to command_func, except execution options:
+                   cwd, on_stdout_line, on_stderr_line, stderr_tail_lines, timeout, cancel_token, cleanup_paths,
+                   threads, script_dir, on_stats
+                   (see ffmpeg_wrapper.simple.execute_command), process is reaped by event loop,
+                   so CPU time and peak RSS of stats are None
+    :return: tuple which contain return code, output and error message
+    """
+    cwd = kwargs.pop("cwd", None)
+    on_stdout_line: Optional[Callable[[str], None]] = kwargs.pop("on_stdout_line", None)
+    on_stderr_line: Optional[Callable[[str], None]] = kwargs.pop("on_stderr_line", None)
+    stderr_tail_lines: int = kwargs.pop("stderr_tail_lines", STDERR_TAIL_LINES)
+    timeout: Optional[float] = kwargs.pop("timeout", None)
+    cancel_token: Optional[CancellationToken] = kwargs.pop("cancel_token", None)
+    cleanup_paths: Optional[List[str]] = kwargs.pop("cleanup_paths", None)
+    threads: Optional[int] = kwargs.pop("threads", None)
+    script_dir: Optional[str] = kwargs.pop("script_dir", None)
+    on_stats: Optional[StatsHook] = kwargs.pop("on_stats", None)
+    outputs = output_paths(command_arguments(command_func, args, kwargs))
+    cleanup_paths = cleanup_paths or outputs
+    command = command_func(*args, **kwargs)
+    if threads is not None:
+        command = thread_options(command, threads, outputs)
+
+    out_chunks: Optional[List[bytes]] = [] if on_stdout_line is None else None
+    out_tail: Deque[str] = deque(maxlen=stderr_tail_lines)
+    err_tail: Deque[str] = deque(maxlen=stderr_tail_lines)
+    # task can be cancelled at any moment, so process always gets its own group where it is possible
+    group = os.name == "posix"
+    reasons: List[str] = []
+
+    if cancel_token is not None and cancel_token.cancelled:
+        raise FFMPEGWrapperCancelledException(command=command)
+
+    started = time.time()
+    started_clock = time.monotonic()
+
+    def report(return_code: Optional[int]) -> None:
+        if on_stats is not None or has_hooks():
+            kind = getattr(command_func, "__name__", "command")
+            wall_time = time.monotonic() - started_clock
+            emit(command_stats(kind, command, return_code, started, wall_time, None, outputs), on_stats)
+
+    # script of huge graph exists only while process is running
+    with filter_scripts(command, script_dir) as process_command:
+        try:
+            process_handle = await asyncio.create_subprocess_exec(
+                *process_command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                start_new_session=group,
+            )
+        except OSError as exc:
+            raise FFMPEGWrapperException(
+                er=str(exc), return_code=getattr(exc, "errno", None), command=command
+            ) from exc
+
+        process_handle.stdin.close()
+        stdout_splitter = (
+            LineSplitter(stderr_tail_collector(out_tail, on_stdout_line)) if on_stdout_line is not None else None
+        )
+        stderr_splitter = LineSplitter(stderr_tail_collector(err_tail, on_stderr_line))
+
+        async def communicate() -> int:
+            await asyncio.gather(
+                _read_stream(process_handle.stdout, stdout_splitter, out_chunks),
+                _read_stream(process_handle.stderr, stderr_splitter),
+            )
+            return await process_handle.wait()
+
+        watchdog = None
+        if cancel_token is not None:
+            watchdog = asyncio.ensure_future(_watch_cancel_token(process_handle, cancel_token, reasons, group))
+
+        try:
+            status = await asyncio.wait_for(communicate(), timeout)
+        except asyncio.TimeoutError:
+            await asyncio.shield(_terminate(process_handle, group))
+            report(process_handle.returncode)
+            _remove_partial_outputs(cleanup_paths)
+            stderr_splitter.close()
+            raise FFMPEGWrapperTimeoutException(
+                joined_output(out_chunks, out_tail),
+                "\n".join(err_tail),
+                return_code=process_handle.returncode,
+                command=command,
+                timeout=timeout,
+            )
+        except BaseException:
+            await asyncio.shield(_terminate(process_handle, group))
+            report(process_handle.returncode)
+            _remove_partial_outputs(cleanup_paths)
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+                await asyncio.gather(watchdog, return_exceptions=True)
+
+    report(status)
+    out_str: str = joined_output(out_chunks, out_tail)
+    err_str: str = "\n".join(err_tail)
+
+    if reasons:
+        _remove_partial_outputs(cleanup_paths)
+        raise FFMPEGWrapperCancelledException(out_str, err_str, return_code=status, command=command)
+
+    return status, out_str, err_str
+
+
+async def _concatenate_group(
+    group: BuildList,
+    output_path: str,
+    channels: int,
+    sample_rate: int,
+    execution_kwargs: Dict[str, Any],
+) -> None:
+    command_kwargs = dict(
+        build_list=group,
+        output_path=output_path,
+        channels=channels,
+        sample_rate=sample_rate,
+        codec=INTERMEDIATE_CODEC,
+    )
+
+    status, out, er = await execute_command(concat_ffmpeg_command, **command_kwargs, **execution_kwargs)
+    if status:
+        command = concat_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+
+@asynccontextmanager
+async def tree_concatenated(
+    build_list: BuildList,
+    channels: int = 2,
+    sample_rate: int = 48000,
+    fan_in: int = CONCAT_FAN_IN,
+    max_workers: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> AsyncIterator[BuildList]:
+    """
+    Async version of ffmpeg_wrapper.simple.tree_concatenated.
+
+    :param build_list: list book parts audio path
+    :param channels: the number of channels for the completed audio
+    :param sample_rate: sample rate
+    :param fan_in: maximum number of parts concatenated by one ffmpeg process
+    :param max_workers: maximum number of concurrently running ffmpeg processes, by default the number of CPUs
+    :param tmp_dir: directory for intermediate audios, by default system temporary directory
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: reduced build list
+    """
+
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+
+    if len(build_list) <= fan_in:
+        yield build_list
+        return
+
+    semaphore = asyncio.Semaphore(max_workers or os.cpu_count() or 1)
+
+    async def concatenate_group(group: BuildList, output_path: str, execution_kwargs: Dict[str, Any]) -> None:
+        async with semaphore:
+            await _concatenate_group(group, output_path, channels, sample_rate, execution_kwargs)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        execution_kwargs = execution_options(threads, timeout, cancel_token, directory)
+        level = 0
+        while len(build_list) > fan_in:
+            groups = [build_list[i : i + fan_in] for i in range(0, len(build_list), fan_in)]
+            outputs = [
+                os.path.join(directory, f"{level}_{index}.{INTERMEDIATE_EXTENSION}") for index in range(len(groups))
+            ]
+
+            # failed group cancels the others, so their processes are killed before directory is removed
+            tasks = [
+                asyncio.ensure_future(concatenate_group(group, output, execution_kwargs))
+                for group, output in zip(groups, outputs)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            # intermediate audios of previous level aren't needed anymore
+            if level:
+                for path in build_list:
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            build_list = outputs
+            level += 1
+
+        yield build_list
+
+
+async def concatenate(
+    build_list: BuildList,
+    output_path: str,
+    channels: int = 2,
+    background_path: Optional[str] = None,
+    background_volume: float = 1.0,
+    volume: float = 1.0,
+    sample_rate: int = 48000,
+    use_normalization: bool = False,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    is_normalize: bool = True,
+    is_short: bool = False,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    two_pass_normalization: bool = False,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    fan_in: int = CONCAT_FAN_IN,
+    max_workers: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Async version of ffmpeg_wrapper.simple.concatenate. If build list is longer than fan_in then parts are
+    concatenated by groups to intermediate audios first (see tree_concatenated).
+
+    :param sample_rate: sample rate
+    :param build_list: list book parts audio path
+    :param output_path: path to completed audio
+    :param channels: the number of channels for the completed audio
+    :param background_path: path to background audio
+    :param background_volume: value for volume for background audio
+    :param volume: value for volume for main audio
+    :param use_normalization: enable normalization
+    :param peak: value of peak volume of concatenated audio
+    :param rms_level: value of root mean square of loduness in concatenated audio
+    :param loudness_range_target: value of target loudness range
+    :param is_normalize: flag for normalize or not audio
+    :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it
+    :param on_progress: callback which is called with progress of ffmpeg, percentage is calculated against
+                        summed duration of build_list, only the final pass is reported, groups of long build list
+                        and measurement of loudness don't report progress
+    :param two_pass_normalization: if flag is True and use_normalization is True then loudness is measured
+                                   by separate pass and audio is normalized in linear mode
+    :param loudnorm_measured: loudness of book measured beforehand, for example by
+                              ffmpeg_wrapper.loudness.measure_book_loudness, if it is set and use_normalization is True
+                              then audio is normalized in linear mode without measurement pass
+    :param fan_in: maximum number of parts concatenated by one ffmpeg process
+    :param max_workers: maximum number of concurrently running ffmpeg processes for groups of parts,
+                        by default the number of CPUs
+    :param tmp_dir: directory for intermediate audios and scripts of huge filter graphs,
+                    by default system temporary directory
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    execution_kwargs = execution_options(threads, timeout, cancel_token, tmp_dir)
+    if on_progress is not None:
+        total = await asyncio.to_thread(total_duration, build_list)
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, total).feed_line
+
+    async with tree_concatenated(
+        build_list, channels, sample_rate, fan_in, max_workers, tmp_dir, threads, timeout, cancel_token
+    ) as build_list:
+        if not use_normalization:
+            loudnorm_measured = None
+        elif two_pass_normalization and loudnorm_measured is None:
+            loudnorm_measured = await measure_concat_loudness(
+                build_list,
+                volume=volume,
+                peak=peak,
+                rms_level=rms_level,
+                loudness_range_target=loudness_range_target,
+                threads=threads,
+                timeout=timeout,
+                cancel_token=cancel_token,
+            )
+
+        command_kwargs = dict(
+            build_list=build_list,
+            output_path=output_path,
+            channels=channels,
+            background_path=background_path,
+            background_volume=background_volume,
+            volume=volume,
+            sample_rate=sample_rate,
+            use_normalization=use_normalization,
+            peak=peak,
+            rms_level=rms_level,
+            loudness_range_target=loudness_range_target,
+            is_normalize=is_normalize,
+            is_short=is_short,
+            progress=on_progress is not None,
+            loudnorm_measured=loudnorm_measured,
+        )
+
+        status, out, er = await execute_command(concat_ffmpeg_command, **command_kwargs, **execution_kwargs)
+
+        if status:
+            command = concat_ffmpeg_command(**command_kwargs)
+            raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+        return status, out, er
+
+
+async def convert(
+    input_info: Tuple[str, str, str],
+    output_info: Tuple[str, str, str],
+    bit_rate: int,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Async version of ffmpeg_wrapper.simple.convert.
+
+    :param input_info: tuple with info about completed book (file_name, file_path, file_format,)
+    :param output_info: tuple with info about completed book after convert (file_name, file_path, file_format,)
+    :param bit_rate: selected bit rate value
+    :param on_progress: callback which is called with progress of ffmpeg
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    execution_kwargs = execution_options(threads, timeout, cancel_token)
+    if on_progress is not None:
+        total = await asyncio.to_thread(total_duration, [input_info[1]])
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, total).feed_line
+
+    status, out, er = await execute_command(
+        convert_ffmpeg_command,
+        input_info=input_info,
+        output_info=output_info,
+        bit_rate=bit_rate,
+        progress=on_progress is not None,
+        **execution_kwargs,
+    )
+
+    if status:
+        command = convert_ffmpeg_command(
+            input_info=input_info,
+            output_info=output_info,
+            bit_rate=bit_rate,
+            progress=on_progress is not None,
+        )
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return status, out, er
+
+
+async def convert_many(
+    input_info: Tuple[str, str, str],
+    outputs: Sequence[Tuple[Tuple[str, str, str], int]],
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Async version of ffmpeg_wrapper.simple.convert_many.
+
+    :param input_info: tuple with info about completed book (file_name, file_path, file_format,)
+    :param outputs: pairs of tuple with info about completed book after convert (file_name, file_path, file_format,)
+                    and selected bit rate value
+    :param on_progress: callback which is called with progress of ffmpeg
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    execution_kwargs = execution_options(threads, timeout, cancel_token)
+    if on_progress is not None:
+        total = await asyncio.to_thread(total_duration, [input_info[1]])
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, total).feed_line
+
+    status, out, er = await execute_command(
+        convert_many_ffmpeg_command,
+        input_info=input_info,
+        outputs=outputs,
+        progress=on_progress is not None,
+        **execution_kwargs,
+    )
+
+    if status:
+        command = convert_many_ffmpeg_command(
+            input_info=input_info,
+            outputs=outputs,
+            progress=on_progress is not None,
+        )
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return status, out, er
+
+
+async def convert_stream(
+    input_info: Tuple[str, str, str],
+    output_format: str,
+    bit_rate: int,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Async version of ffmpeg_wrapper.pipes.convert_stream. If iteration is stopped early then ffmpeg is killed
+    when iterator is closed, use aclose or contextlib.aclosing to close it immediately. If timeout expires
+    or cancel_token is cancelled then process group of ffmpeg is terminated and no more chunks are yielded.
+
+    :param input_info: tuple with info about completed book (file_name, file_path, file_format,)
+    :param output_format: container of completed audio, for example "mp3", "adts" or "ipod" (m4a, m4b)
+    :param bit_rate: selected bit rate value
+    :param chunk_size: size of chunks, the last chunk can be shorter
+    :param timeout: seconds after which ffmpeg is terminated and FFMPEGWrapperTimeoutException is raised,
+                    time spent by consumer is counted too
+    :param cancel_token: token which terminates running ffmpeg when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: async iterator of chunks of encoded audio
+    """
+
+    command = convert_stream_ffmpeg_command(input_info[1], output_format, bit_rate)
+    err_tail: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+    group = os.name == "posix"
+    reasons: List[str] = []
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    if cancel_token is not None and cancel_token.cancelled:
+        raise FFMPEGWrapperCancelledException(command=command)
+
+    try:
+        process_handle = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.DEVNULL,
+            start_new_session=group,
+        )
+    except OSError as exc:
+        raise FFMPEGWrapperException(er=str(exc), return_code=getattr(exc, "errno", None), command=command) from exc
+
+    stderr_reader = asyncio.ensure_future(
+        _read_stream(process_handle.stderr, LineSplitter(stderr_tail_collector(err_tail)))
+    )
+    watchdog = None
+    if cancel_token is not None:
+        watchdog = asyncio.ensure_future(_watch_cancel_token(process_handle, cancel_token, reasons, group))
+
+    try:
+        while True:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            try:
+                chunk = await asyncio.wait_for(process_handle.stdout.readexactly(chunk_size), remaining)
+            except asyncio.IncompleteReadError as exc:
+                if exc.partial and not reasons:
+                    yield exc.partial
+                break
+            except asyncio.TimeoutError:
+                reasons.append("timeout")
+                await asyncio.shield(_terminate(process_handle, group))
+                break
+            # output of terminated process is incomplete, so it isn't passed to consumer
+            if reasons:
+                break
+            yield chunk
+
+        await stderr_reader
+        status = await process_handle.wait()
+    except BaseException:
+        stderr_reader.cancel()
+        await asyncio.shield(_terminate(process_handle, group))
+        raise
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+            await asyncio.gather(watchdog, return_exceptions=True)
+
+    if reasons:
+        raise _terminated_exception(reasons[0], "\n".join(err_tail), status, command, timeout)
+
+    if status:
+        raise FFMPEGWrapperException("", "\n".join(err_tail), return_code=status, command=command)
+
+
+async def measure_loudness(
+    input_path: str,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Dict[str, float]:
+    """
+    Async version of ffmpeg_wrapper.simple.measure_loudness.
+
+    :param input_path: path to audio file
+    :param peak: value of peak volume
+    :param rms_level: value of root mean square of loudness
+    :param loudness_range_target: value of target loudness range
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: dict with loudness measured by loudnorm filter (input_i, input_tp, input_lra, input_thresh, ...)
+    """
+
+    command_kwargs = dict(
+        input_path=input_path,
+        peak=peak,
+        rms_level=rms_level,
+        loudness_range_target=loudness_range_target,
+    )
+
+    status, out, er = await execute_command(
+        loudnorm_measure_ffmpeg_command, **command_kwargs, **execution_options(threads, timeout, cancel_token)
+    )
+
+    if status:
+        command = loudnorm_measure_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return parse_loudnorm(er)
+
+
+async def measure_concat_loudness(
+    build_list: BuildList,
+    volume: float = 1.0,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Dict[str, float]:
+    """
+    Async version of ffmpeg_wrapper.simple.measure_concat_loudness.
+
+    :param build_list: list book parts audio path
+    :param volume: value for volume for main audio
+    :param peak: value of peak volume
+    :param rms_level: value of root mean square of loudness
+    :param loudness_range_target: value of target loudness range
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: dict with loudness measured by loudnorm filter (input_i, input_tp, input_lra, input_thresh, ...)
+    """
+
+    command_kwargs = dict(
+        build_list=build_list,
+        volume=volume,
+        peak=peak,
+        rms_level=rms_level,
+        loudness_range_target=loudness_range_target,
+    )
+
+    status, out, er = await execute_command(
+        concat_loudnorm_measure_ffmpeg_command, **command_kwargs, **execution_options(threads, timeout, cancel_token)
+    )
+
+    if status:
+        command = concat_loudnorm_measure_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return parse_loudnorm(er)
+
+
+async def duration(
+    file_path: str,
+    cache: Optional[MetadataCache] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> float:
+    """
+    Async version of ffmpeg_wrapper.simple.duration.
+
+    :param file_path: path to audio file
+    :param cache: cache of metadata, if it has duration of unchanged file then ffprobe isn't executed
+    :param timeout: seconds after which ffprobe is terminated and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffprobe when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: audio duration in seconds
+    """
+
+    value = wav_duration(file_path)
+    if value is not None:
+        return value
+
+    if cache is not None:
+        cached = cache.get(file_path, DURATION_CACHE_KIND)
+        if cached is not None:
+            return cached
+
+    status, out, er = await execute_command(
+        duration_ffmpeg_command, file_path=file_path, **execution_options(timeout=timeout, cancel_token=cancel_token)
+    )
+
+    if status:
+        command = duration_ffmpeg_command(file_path)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    value = parse_duration(out)
+
+    if cache is not None:
+        cache.set(file_path, DURATION_CACHE_KIND, value)
+
+    return value
+
+
+async def silent(
+    duration_value: float,
+    output_path: str,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Async version of ffmpeg_wrapper.simple.silent.
+
+    :param duration_value: duration for silent audio
+    :param output_path: path to result
+    :param on_progress: callback which is called with progress of ffmpeg
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    if output_path.lower().endswith(".wav"):
+        # file is written by blocking calls, so event loop isn't blocked by slow file system
+        await asyncio.to_thread(write_silence, output_path, duration_value)
+        if on_progress is not None:
+            on_progress(Progress(duration_value, duration_value, 100.0, None, 0.0, True))
+        return 0, "", ""
+
+    execution_kwargs = execution_options(timeout=timeout, cancel_token=cancel_token)
+    if on_progress is not None:
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, duration_value).feed_line
+
+    status, out, er = await execute_command(
+        silent_ffmpeg_command,
+        duration_value=duration_value,
+        output_path=output_path,
+        progress=on_progress is not None,
+        **execution_kwargs,
+    )
+
+    if status:
+        command = silent_ffmpeg_command(duration_value, output_path, progress=on_progress is not None)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return status, out, er
+
+
+async def volume_detect(
+    path_to_file: str,
+    cache: Optional[MetadataCache] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Dict[str, float]:
+    """
+    Async version of ffmpeg_wrapper.simple.volume_detect.
+
+    :param path_to_file: path to audio file
+    :param cache: cache of metadata, if it has volume of unchanged file then ffmpeg isn't executed
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: dict with root_mean_square and max_volume of audio in dB
+    """
+
+    if cache is not None:
+        cached = cache.get(path_to_file, VOLUME_DETECT_CACHE_KIND)
+        if cached is not None:
+            return cached
+
+    rows: List[str] = []
+    status, out, er = await execute_command(
+        volume_detect_command,
+        path_to_file=path_to_file,
+        on_stderr_line=volume_detect_line_collector(rows),
+        **execution_options(timeout=timeout, cancel_token=cancel_token),
+    )
+
+    if status:
+        command = volume_detect_command(path_to_file=path_to_file)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    result = parse_volume_detect("\n".join(rows))
+
+    if cache is not None:
+        cache.set(path_to_file, VOLUME_DETECT_CACHE_KIND, result)
+
+    return result
+
+
+async def iter_progress(func: Callable[..., Awaitable[Any]], *args, **kwargs) -> AsyncIterator[Progress]:
+    """
+    Run function which accepts on_progress (concatenate, convert, silent) and iterate over its progress events.
+    Exception of function is raised after the last event. If iteration is stopped early then function is cancelled.
+
+    :param func: async function of this module
+    :param args: values which transferred to func
+    :param kwargs: values which transferred to func
+    :return: async iterator of progress events
+    """
+
+    queue: "asyncio.Queue[Optional[Progress]]" = asyncio.Queue()
+    task = asyncio.ensure_future(func(*args, on_progress=queue.put_nowait, **kwargs))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Optional, Tuple
+
+
+class MetadataCache:
+    """
+    Cache for metadata of audio files (duration, loudness, ...) which is expensive to get with ffmpeg.
+
+    Values are kept in memory LRU tier and, if path to database is given, in sqlite database on disk,
+    so they survive restarts. Key of file is its real path, size and modification time or hash of its content,
+    so changed file never gets stale value. Values of previous versions of file are dropped when new value is stored,
+    and returned values are copies, so caller can change them without corrupting cache.
+    """
+
+    HASH_BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, path: Optional[str] = None, max_size: int = 4096, use_content_hash: bool = False):
+        """
+        :param path: path to sqlite database for on-disk tier, if None then only memory tier is used
+        :param max_size: maximum number of values in memory tier
+        :param use_content_hash: use sha256 of file content as key instead of path, size and modification time
+        """
+
+        self.path = path
+        self.max_size = max_size
+        self.use_content_hash = use_content_hash
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS metadata "
+                "(key TEXT NOT NULL, kind TEXT NOT NULL, path TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (key, kind))"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS metadata_path ON metadata (path)")
+            self._connection.commit()
+
+    def key(self, file_path: str) -> Optional[str]:
+        """
+        Build key for file.
+
+        :param file_path: path to file
+        :return: key or None if file doesn't exist
+        """
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        if not self.use_content_hash:
+            return f"{os.path.realpath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(self.HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+    def get(self, file_path: str, kind: str) -> Optional[Any]:
+        """
+        Return cached value.
+
+        :param file_path: path to file
+        :param kind: kind of value, for example "duration"
+        :return: value or None if there is no value for current version of file
+        """
+
+        key = self.key(file_path)
+        if key is None:
+            return None
+
+        with self._lock:
+            item = self._memory.get((key, kind))
+            if item is not None:
+                self._memory.move_to_end((key, kind))
+                return copy.deepcopy(item[1])
+
+            if self._connection is None:
+                return None
+
+            row = self._connection.execute(
+                "SELECT value FROM metadata WHERE key = ? AND kind = ?",
+                (key, kind),
+            ).fetchone()
+            if row is None:
+                return None
+
+            value = json.loads(row[0])
+            self._remember(key, kind, os.path.realpath(file_path), value)
+            return copy.deepcopy(value)
+
+    def set(self, file_path: str, kind: str, value: Any) -> None:
+        """
+        Store value for current version of file.
+
+        :param file_path: path to file
+        :param kind: kind of value, for example "duration"
+        :param value: JSON serializable value
+        """
+
+        key = self.key(file_path)
+        if key is None:
+            return
+
+        real_path = os.path.realpath(file_path)
+        value = copy.deepcopy(value)
+
+        with self._lock:
+            # values of previous versions of file are never read again
+            for memory_key in [
+                k for k, (path, _) in self._memory.items() if path == real_path and k[1] == kind and k[0] != key
+            ]:
+                del self._memory[memory_key]
+            self._remember(key, kind, real_path, value)
+
+            if self._connection is not None:
+                self._connection.execute(
+                    "DELETE FROM metadata WHERE path = ? AND kind = ? AND key != ?",
+                    (real_path, kind, key),
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO metadata (key, kind, path, value) VALUES (?, ?, ?, ?)",
+                    (key, kind, real_path, json.dumps(value)),
+                )
+                self._connection.commit()
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """
+        Drop cached values.
+
+        :param file_path: path to file which values are dropped, if None then all values are dropped
+        """
+
+        real_path = None if file_path is None else os.path.realpath(file_path)
+
+        with self._lock:
+            if real_path is None:
+                self._memory.clear()
+            else:
+                for memory_key in [k for k, (path, _) in self._memory.items() if path == real_path]:
+                    del self._memory[memory_key]
+
+            if self._connection is not None:
+                if real_path is None:
+                    self._connection.execute("DELETE FROM metadata")
+                else:
+                    self._connection.execute("DELETE FROM metadata WHERE path = ?", (real_path,))
+                self._connection.commit()
+
+    def close(self) -> None:
+        """
+        Close on-disk tier.
+        """
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _remember(self, key: str, kind: str, real_path: str, value: Any) -> None:
+        self._memory[(key, kind)] = (real_path, value)
+        self._memory.move_to_end((key, kind))
+
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
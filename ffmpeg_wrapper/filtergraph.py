@@ -0,0 +1,175 @@
+from contextlib import contextmanager
+from functools import lru_cache
+import os
+import tempfile
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+# exec rejects single argument longer than 128 KiB on Linux, bigger graphs are passed by -filter_complex_script
+FILTER_SCRIPT_THRESHOLD = 64 * 1024
+GRAPH_CACHE_SIZE = 128
+
+
+class Filter(NamedTuple):
+    """
+    One filter of chain, for example loudnorm=I=-18.0:TP=-3.0.
+
+    :param name: name of ffmpeg filter
+    :param args: positional values followed by pairs of option name and value, all of them serialized
+    """
+
+    name: str
+    args: Tuple[Union[str, Tuple[str, str]], ...] = ()
+
+    def __str__(self) -> str:
+        if not self.args:
+            return self.name
+
+        args = ":".join(arg if isinstance(arg, str) else f"{arg[0]}={arg[1]}" for arg in self.args)
+        return f"{self.name}={args}"
+
+
+def node(name: str, *values: object, **options: object) -> Filter:
+    """
+    Build filter, values and options are serialized by str in given order.
+
+    Usage:
+        node("atrim", start=30)  # atrim=start=30
+        node("volume", "2.0")  # volume=2.0
+
+    :param name: name of ffmpeg filter
+    :param values: positional values of filter
+    :param options: named options of filter
+    :return: filter
+    """
+
+    args = tuple(f"{value}" for value in values) + tuple((key, f"{value}") for key, value in options.items())
+    return Filter(name, args)
+
+
+class Chain(NamedTuple):
+    """
+    Linear chain of filters with labelled input and output pads, for example [0:a][s1]concat=n=2,volume=2.0[book].
+
+    :param filters: filters of chain
+    :param inputs: labels of input pads without brackets, unlabelled pads are connected by ffmpeg
+    :param outputs: labels of output pads without brackets
+    """
+
+    filters: Tuple[Filter, ...]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+
+    def __str__(self) -> str:
+        inputs = "".join(f"[{label}]" for label in self.inputs)
+        outputs = "".join(f"[{label}]" for label in self.outputs)
+        return f"{inputs}{','.join(str(item) for item in self.filters)}{outputs}"
+
+
+class FilterGraph(NamedTuple):
+    """
+    Filter graph for -filter_complex, chains are connected by labels. Graph is immutable, so graphs built once
+    are shared and their serialization is cached (see render).
+
+    :param chains: chains of graph
+    """
+
+    chains: Tuple[Chain, ...] = ()
+
+    def extend(self, *chains: Union[Chain, "FilterGraph"]) -> "FilterGraph":
+        """
+        Return new graph with chains or chains of other graphs added to the end.
+
+        :param chains: chains or graphs
+        :return: graph
+        """
+
+        added: List[Chain] = []
+        for item in chains:
+            if isinstance(item, FilterGraph):
+                added.extend(item.chains)
+            else:
+                added.append(item)
+        return FilterGraph(self.chains + tuple(added))
+
+    def __str__(self) -> str:
+        return render(self)
+
+
+@lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def render(graph: FilterGraph) -> str:
+    """
+    Serialize graph for -filter_complex.
+
+    :param graph: filter graph
+    :return: graph description
+    """
+
+    return ";".join(str(chain) for chain in graph.chains)
+
+
+def write_filter_script(script: str, directory: Optional[str] = None) -> str:
+    """
+    Write graph description to new file with unique name, so concurrent writers don't clash.
+    File belongs to caller, which removes it when command is finished (see filter_scripts).
+
+    :param script: graph description
+    :param directory: directory for scripts, by default system temporary directory
+    :return: path to script
+    """
+
+    fd, path = tempfile.mkstemp(dir=directory, prefix="graph_", suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(script)
+
+    return path
+
+
+def filter_complex_options(graph: Union[FilterGraph, str]) -> List[str]:
+    """
+    Part of command which passes filter graph to ffmpeg. Command builders don't write files,
+    graph longer than FILTER_SCRIPT_THRESHOLD is moved to script by filter_scripts when command is executed.
+
+    :param graph: filter graph or its description
+    :return: options for command
+    """
+
+    return ["-filter_complex", str(graph)]
+
+
+@contextmanager
+def filter_scripts(
+    command: Sequence[str],
+    directory: Optional[str] = None,
+    threshold: int = FILTER_SCRIPT_THRESHOLD,
+) -> Iterator[List[str]]:
+    """
+    Pass graphs of command longer than threshold by -filter_complex_script. Graphs are written to files
+    in directory and files are removed on exit, so scripts exist only while command is running.
+
+    Usage:
+        with filter_scripts(command, tmp_dir) as command:
+            subprocess.run(command)
+
+    :param command: ffmpeg command
+    :param directory: directory for scripts, by default system temporary directory
+    :param threshold: maximum length of graph description passed as argument
+    :return: command with long graphs replaced by scripts
+    """
+
+    command = list(command)
+    paths = []
+    try:
+        for index in range(len(command) - 1):
+            if command[index] == "-filter_complex" and len(command[index + 1]) > threshold:
+                path = write_filter_script(command[index + 1], directory)
+                paths.append(path)
+                command[index : index + 2] = ["-filter_complex_script", path]
+
+        yield command
+    finally:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
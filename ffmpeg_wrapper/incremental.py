@@ -0,0 +1,300 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import re
+import tempfile
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from ffmpeg_wrapper.simple import (
+    INTERMEDIATE_EXTENSION,
+    BuildList,
+    CancellationToken,
+    FFMPEGWrapperException,
+    Silence,
+    concatenate,
+    demux_concat_ffmpeg_command,
+    execute_command,
+    execution_options,
+    segment_ffmpeg_command,
+    write_concat_list,
+)
+from ffmpeg_wrapper.wav import write_silence
+
+
+SEGMENT_EXTENSION = "wav"
+FINAL_SEGMENT_CODEC = "pcm_s16le"
+# segments which are processed after joining are kept in float, so volume doesn't clip them before loudnorm
+INTERMEDIATE_SEGMENT_CODEC = "pcm_f32le"
+# segments which aren't used by any build for so long are removed from segments directory
+SEGMENT_MAX_AGE = 30 * 24 * 3600
+SEGMENT_NAME_PATTERN = re.compile(rf"^([0-9a-f]{{64}}|silence_\d+ms_\d+_\d+_\w+)\.{SEGMENT_EXTENSION}$")
+
+
+def segment_fingerprint(input_path: str, channels: int, volume: float, sample_rate: int, codec: str) -> str:
+    """
+    Build fingerprint of segment from version of book part and parameters of rendering.
+
+    :param input_path: path to book part
+    :param channels: the number of channels for the completed audio
+    :param volume: value for volume for main audio
+    :param sample_rate: sample rate
+    :param codec: audio codec of segment
+    :return: hex digest
+    """
+
+    stat = os.stat(input_path)
+    source = f"{os.path.realpath(input_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    parameters = f"{channels}:{volume:.1f}:{sample_rate}:{codec}"
+
+    return hashlib.sha256(f"{source}|{parameters}".encode("utf-8")).hexdigest()
+
+
+def render_segment(
+    input_path: str,
+    segment_path: str,
+    channels: int,
+    volume: float,
+    sample_rate: int,
+    codec: str,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> None:
+    """
+    Render book part to segment. Segment is written to temporary file and renamed, so broken segment is never reused.
+
+    :param input_path: path to book part
+    :param segment_path: path to segment
+    :param channels: the number of channels for the completed audio
+    :param volume: value for volume for main audio
+    :param sample_rate: sample rate
+    :param codec: audio codec of segment
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    """
+
+    directory, name = os.path.split(segment_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=f".{SEGMENT_EXTENSION}", dir=directory)
+    os.close(fd)
+
+    command_kwargs = dict(
+        input_path=input_path,
+        output_path=tmp_path,
+        channels=channels,
+        volume=volume,
+        sample_rate=sample_rate,
+        codec=codec,
+    )
+
+    try:
+        status, out, er = execute_command(
+            segment_ffmpeg_command, **command_kwargs, **execution_options(threads, timeout, cancel_token)
+        )
+        if status:
+            command = segment_ffmpeg_command(**command_kwargs)
+            raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+        os.replace(tmp_path, segment_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def render_silence_segment(
+    duration_value: float,
+    segment_path: str,
+    channels: int,
+    sample_rate: int,
+    codec: str,
+) -> None:
+    """
+    Write pause to segment without ffmpeg. Segment is written to temporary file and renamed.
+
+    :param duration_value: duration of pause in seconds
+    :param segment_path: path to segment
+    :param channels: the number of channels for the completed audio
+    :param sample_rate: sample rate
+    :param codec: audio codec of segment
+    """
+
+    directory, name = os.path.split(segment_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=f".{SEGMENT_EXTENSION}", dir=directory)
+    os.close(fd)
+
+    try:
+        write_silence(tmp_path, duration_value, sample_rate, channels, codec)
+        os.replace(tmp_path, segment_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def prune_segments(segments_dir: str, keep: Iterable[str], max_age: float = SEGMENT_MAX_AGE) -> None:
+    """
+    Remove segments which aren't used longer than max_age. Segments are touched by every build which uses them,
+    so segments of books which are still built are kept.
+
+    :param segments_dir: directory where segments are kept between builds
+    :param keep: paths of segments which are used by current build
+    :param max_age: age of unused segment in seconds
+    """
+
+    keep = {os.path.abspath(path) for path in keep}
+    deadline = time.time() - max_age
+    for name in os.listdir(segments_dir):
+        path = os.path.abspath(os.path.join(segments_dir, name))
+        if path in keep or not SEGMENT_NAME_PATTERN.match(name):
+            continue
+        try:
+            if os.path.getmtime(path) < deadline:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def incremental_concatenate(
+    build_list: BuildList,
+    output_path: str,
+    segments_dir: str,
+    channels: int = 2,
+    background_path: Optional[str] = None,
+    background_volume: float = 1.0,
+    volume: float = 1.0,
+    sample_rate: int = 48000,
+    use_normalization: bool = False,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    is_normalize: bool = True,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    max_workers: Optional[int] = None,
+    segments_max_age: Optional[float] = SEGMENT_MAX_AGE,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Concatenate book parts to book reusing segments rendered by previous builds.
+
+    Every book part is rendered with volume, sample rate and channels of completed audio to segment in segments_dir,
+    which name is fingerprint of part and parameters. Only parts without segment (new or changed) are rendered,
+    then segments are joined by concat demuxer. WAV book is written with stream copy, other formats are encoded
+    while joining. If background or normalization is needed then segments are joined to lossless intermediate audio
+    which is processed by concatenate as one part.
+
+    :param build_list: list book parts audio path and pauses (Silence), pauses are written without ffmpeg
+    :param output_path: path to completed audio
+    :param segments_dir: directory where segments are kept between builds
+    :param channels: the number of channels for the completed audio
+    :param background_path: path to background audio
+    :param background_volume: value for volume for background audio
+    :param volume: value for volume for main audio
+    :param sample_rate: sample rate
+    :param use_normalization: enable normalization
+    :param peak: value of peak volume of concatenated audio
+    :param rms_level: value of root mean square of loduness in concatenated audio
+    :param loudness_range_target: value of target loudness range
+    :param is_normalize: flag for normalize or not audio
+    :param loudnorm_measured: loudness of book measured beforehand, see ffmpeg_wrapper.loudness.measure_book_loudness
+    :param max_workers: maximum number of concurrently rendered segments, by default the number of CPUs
+    :param segments_max_age: segments which aren't used longer than this number of seconds are removed,
+                             if it is None then segments are never removed
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    os.makedirs(segments_dir, exist_ok=True)
+
+    is_final = not background_path and not use_normalization
+    codec = FINAL_SEGMENT_CODEC if is_final else INTERMEDIATE_SEGMENT_CODEC
+
+    segments = []
+    dirty: Dict[str, str] = {}
+    for part_path in build_list:
+        if isinstance(part_path, Silence):
+            milliseconds = round(part_path.duration * 1000)
+            segment_path = os.path.join(
+                segments_dir, f"silence_{milliseconds}ms_{channels}_{sample_rate}_{codec}.{SEGMENT_EXTENSION}"
+            )
+            if not os.path.exists(segment_path):
+                render_silence_segment(milliseconds / 1000, segment_path, channels, sample_rate, codec)
+            else:
+                os.utime(segment_path)
+            segments.append(segment_path)
+            continue
+
+        fingerprint = segment_fingerprint(part_path, channels, volume, sample_rate, codec)
+        segment_path = os.path.join(segments_dir, f"{fingerprint}.{SEGMENT_EXTENSION}")
+        segments.append(segment_path)
+        if not os.path.exists(segment_path):
+            dirty[segment_path] = part_path
+        else:
+            os.utime(segment_path)
+
+    if dirty:
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(dirty)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    render_segment,
+                    part_path,
+                    segment_path,
+                    channels,
+                    volume,
+                    sample_rate,
+                    codec,
+                    threads,
+                    timeout,
+                    cancel_token,
+                )
+                for segment_path, part_path in dirty.items()
+            ]
+            for future in futures:
+                future.result()
+
+    if segments_max_age is not None:
+        prune_segments(segments_dir, segments, segments_max_age)
+
+    with tempfile.TemporaryDirectory(dir=segments_dir) as tmp_dir:
+        list_path = os.path.join(tmp_dir, "segments.txt")
+        write_concat_list(segments, list_path)
+
+        # matroska isn't limited to 4 GiB like WAV, float book of several hours fits it
+        joined_path = output_path if is_final else os.path.join(tmp_dir, f"book.{INTERMEDIATE_EXTENSION}")
+        stream_copy = not is_final or os.path.splitext(output_path)[1].lower() == f".{SEGMENT_EXTENSION}"
+        command_kwargs = dict(list_path=list_path, output_path=joined_path, stream_copy=stream_copy)
+        status, out, er = execute_command(
+            demux_concat_ffmpeg_command, **command_kwargs, **execution_options(threads, timeout, cancel_token)
+        )
+        if status:
+            command = demux_concat_ffmpeg_command(**command_kwargs)
+            raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+        if is_final:
+            return status, out, er
+
+        return concatenate(
+            [joined_path],
+            output_path,
+            channels=channels,
+            background_path=background_path,
+            background_volume=background_volume,
+            sample_rate=sample_rate,
+            use_normalization=use_normalization,
+            peak=peak,
+            rms_level=rms_level,
+            loudness_range_target=loudness_range_target,
+            is_normalize=is_normalize,
+            two_pass_normalization=True,
+            loudnorm_measured=loudnorm_measured,
+            threads=threads,
+            timeout=timeout,
+            cancel_token=cancel_token,
+        )
@@ -0,0 +1,280 @@
+import logging
+import os
+import subprocess
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class CommandStats(NamedTuple):
+    """
+    Resources used by one executed command.
+
+    :param kind: name of command builder, for example concat_ffmpeg_command
+    :param command: executed command
+    :param return_code: return code of process
+    :param started: time.time() when process was started
+    :param wall_time: elapsed time in seconds
+    :param user_time: user CPU time of process in seconds, None if it isn't available
+    :param system_time: system CPU time of process in seconds, None if it isn't available
+    :param max_rss: peak resident set size of process in bytes, None if it isn't available
+    :param input_size: summed size of input files in bytes
+    :param output_size: summed size of output files in bytes
+    """
+
+    kind: str
+    command: Sequence[str]
+    return_code: Optional[int]
+    started: float
+    wall_time: float
+    user_time: Optional[float]
+    system_time: Optional[float]
+    max_rss: Optional[int]
+    input_size: int
+    output_size: int
+
+
+StatsHook = Callable[[CommandStats], None]
+
+_hooks: List[StatsHook] = []
+_hooks_lock = threading.Lock()
+
+
+def add_hook(hook: StatsHook) -> StatsHook:
+    """
+    Register hook which is called with CommandStats of every command executed by execute_command.
+    Hook is called in thread which executed command, so it must be thread safe.
+
+    :param hook: callable which gets CommandStats
+    :return: the same hook, so function can be used as decorator
+    """
+
+    with _hooks_lock:
+        _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook: StatsHook) -> None:
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def has_hooks() -> bool:
+    return bool(_hooks)
+
+
+def emit(stats: CommandStats, on_stats: Optional[StatsHook] = None) -> None:
+    """
+    Deliver stats to registered hooks and to hook of the call.
+
+    :param stats: stats of executed command
+    :param on_stats: hook of the call
+    """
+
+    with _hooks_lock:
+        hooks = list(_hooks)
+    if on_stats is not None:
+        hooks.append(on_stats)
+
+    for hook in hooks:
+        hook(stats)
+
+
+def wait_with_usage(process_handle: subprocess.Popen) -> Tuple[int, Optional[Any]]:
+    """
+    Wait for process and get resource usage of it by os.wait4. Where os.wait4 isn't available
+    or process is already reaped by Popen, usage is None.
+
+    :param process_handle: running process
+    :return: tuple which contain return code and resource.struct_rusage or None
+    """
+
+    if not hasattr(os, "wait4"):
+        return process_handle.wait(), None
+
+    try:
+        _, wait_status, usage = os.wait4(process_handle.pid, 0)
+    except ChildProcessError:
+        return process_handle.wait(), None
+
+    return_code = os.waitstatus_to_exitcode(wait_status)
+    process_handle.returncode = return_code
+    return return_code, usage
+
+
+def max_rss_bytes(usage: Any) -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def command_paths(command: Sequence[str], output_paths: Iterable[str] = ()) -> Tuple[List[str], List[str]]:
+    """
+    Find input and output files of ffmpeg command. Inputs are values of -i options, outputs are given output paths
+    or the last argument of command.
+
+    :param command: ffmpeg command
+    :param output_paths: known paths of outputs
+    :return: tuple which contain input paths and output paths
+    """
+
+    inputs = [value for option, value in zip(command, command[1:]) if option == "-i"]
+    outputs = list(output_paths)
+    if not outputs and len(command) > 1 and command[-1] not in inputs:
+        outputs = [command[-1]]
+    return inputs, outputs
+
+
+def files_size(paths: Iterable[str]) -> int:
+    """
+    Return summed size of regular files, pipes, devices and missing files are skipped.
+
+    :param paths: paths to files
+    :return: size in bytes
+    """
+
+    size = 0
+    for path in paths:
+        try:
+            if os.path.isfile(path):
+                size += os.path.getsize(path)
+        except (OSError, TypeError, ValueError):
+            pass
+    return size
+
+
+def command_stats(
+    kind: str,
+    command: Sequence[str],
+    return_code: Optional[int],
+    started: float,
+    wall_time: float,
+    usage: Optional[Any] = None,
+    output_paths: Iterable[str] = (),
+) -> CommandStats:
+    """
+    Build CommandStats of finished command.
+
+    :param kind: name of command builder
+    :param command: executed command
+    :param return_code: return code of process
+    :param started: time.time() when process was started
+    :param wall_time: elapsed time in seconds
+    :param usage: resource.struct_rusage of process
+    :param output_paths: known paths of outputs, by default the last argument of command
+    :return: stats of command
+    """
+
+    inputs, outputs = command_paths(command, output_paths)
+    return CommandStats(
+        kind=kind,
+        command=command,
+        return_code=return_code,
+        started=started,
+        wall_time=wall_time,
+        user_time=usage.ru_utime if usage is not None else None,
+        system_time=usage.ru_stime if usage is not None else None,
+        max_rss=max_rss_bytes(usage) if usage is not None else None,
+        input_size=files_size(inputs),
+        output_size=files_size(outputs),
+    )
+
+
+def logging_hook(logger: Optional[logging.Logger] = None, level: int = logging.INFO) -> StatsHook:
+    """
+    Build hook which writes one line with stats of every command to log.
+
+    :param logger: logger, by default logger of this module
+    :param level: level of records
+    :return: hook for add_hook
+    """
+
+    logger = logger or logging.getLogger(__name__)
+
+    def hook(stats: CommandStats) -> None:
+        logger.log(
+            level,
+            "%s exited with %s in %.3fs user=%ss sys=%ss max_rss=%s input=%d output=%d",
+            stats.kind,
+            stats.return_code,
+            stats.wall_time,
+            stats.user_time,
+            stats.system_time,
+            stats.max_rss,
+            stats.input_size,
+            stats.output_size,
+        )
+
+    return hook
+
+
+class CommandCounters:
+    """
+    Prometheus-style counters of executed commands by kind, they only grow. Use it as hook and export snapshot
+    to metrics system.
+
+    Usage:
+        counters = add_hook(CommandCounters())
+        ...
+        counters.snapshot()["concat_ffmpeg_command"]["wall_time"]
+    """
+
+    FIELDS = ("count", "failures", "wall_time", "user_time", "system_time", "input_size", "output_size")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._max_rss: Dict[str, int] = {}
+
+    def __call__(self, stats: CommandStats) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(stats.kind, dict.fromkeys(self.FIELDS, 0))
+            counters["count"] += 1
+            counters["failures"] += 1 if stats.return_code else 0
+            counters["wall_time"] += stats.wall_time
+            counters["user_time"] += stats.user_time or 0.0
+            counters["system_time"] += stats.system_time or 0.0
+            counters["input_size"] += stats.input_size
+            counters["output_size"] += stats.output_size
+            if stats.max_rss is not None:
+                self._max_rss[stats.kind] = max(self._max_rss.get(stats.kind, 0), stats.max_rss)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return copy of counters.
+
+        :return: dict of kind of command to dict of counter name to value, max_rss is peak over all commands
+        """
+
+        with self._lock:
+            return {
+                kind: {**counters, "max_rss": self._max_rss.get(kind)} for kind, counters in self._counters.items()
+            }
+
+
+def span_hook(tracer: Any) -> StatsHook:
+    """
+    Build hook which records every command as span of OpenTelemetry tracer. opentelemetry isn't imported,
+    any tracer with start_span(name, start_time=..., attributes=...) is accepted.
+
+    :param tracer: tracer, for example opentelemetry.trace.get_tracer(__name__)
+    :return: hook for add_hook
+    """
+
+    def hook(stats: CommandStats) -> None:
+        attributes = {
+            "ffmpeg.kind": stats.kind,
+            "ffmpeg.return_code": stats.return_code if stats.return_code is not None else -1,
+            "ffmpeg.input_size": stats.input_size,
+            "ffmpeg.output_size": stats.output_size,
+        }
+        for name in ("user_time", "system_time", "max_rss"):
+            value = getattr(stats, name)
+            if value is not None:
+                attributes[f"ffmpeg.{name}"] = value
+
+        start_time = int(stats.started * 1e9)
+        span = tracer.start_span(stats.kind, start_time=start_time, attributes=attributes)
+        span.end(end_time=start_time + int(stats.wall_time * 1e9))
+
+    return hook
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from ffmpeg_wrapper.cache import MetadataCache
+from ffmpeg_wrapper.simple import BuildList, Silence, duration, measure_loudness
+
+
+LOUDNORM_CACHE_KIND = "loudnorm"
+
+# gates of ITU-R BS.1770 / EBU R128
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+LRA_RELATIVE_GATE = -20.0
+
+# ranges of measured_I, measured_TP and measured_thresh options of loudnorm
+LOUDNORM_I_RANGE = (-99.0, 0.0)
+LOUDNORM_TP_RANGE = (-99.0, 99.0)
+LOUDNORM_THRESH_RANGE = (-99.0, 0.0)
+
+
+class FragmentLoudness(NamedTuple):
+    """
+    Loudness statistics of one book part.
+
+    :param path: path to audio file
+    :param duration: duration of audio in seconds
+    :param input_i: integrated loudness in LUFS
+    :param input_tp: true peak in dBTP
+    :param input_lra: loudness range in LU
+    :param input_thresh: relative gating threshold in LUFS
+    """
+
+    path: str
+    duration: float
+    input_i: float
+    input_tp: float
+    input_lra: float
+    input_thresh: float
+
+
+def fragment_loudness(path: str, cache: Optional[MetadataCache] = None) -> FragmentLoudness:
+    """
+    Measure loudness of book part. If cache has statistics of unchanged file then ffmpeg isn't executed.
+
+    :param path: path to audio file
+    :param cache: cache of metadata
+    :return: loudness statistics
+    """
+
+    measured = cache.get(path, LOUDNORM_CACHE_KIND) if cache is not None else None
+    if measured is None:
+        measured = measure_loudness(path)
+        if cache is not None:
+            cache.set(path, LOUDNORM_CACHE_KIND, measured)
+
+    return FragmentLoudness(
+        path=path,
+        duration=duration(path, cache=cache),
+        input_i=measured["input_i"],
+        input_tp=measured["input_tp"],
+        input_lra=measured["input_lra"],
+        input_thresh=measured["input_thresh"],
+    )
+
+
+def _power_mean(fragments: List[FragmentLoudness]) -> float:
+    total_duration = sum(f.duration for f in fragments)
+    if not total_duration:
+        return -math.inf
+
+    energy = sum(f.duration * 10 ** (f.input_i / 10) for f in fragments)
+    return 10 * math.log10(energy / total_duration) if energy else -math.inf
+
+
+def _weighted_percentile(values: List[tuple], percentile: float) -> float:
+    # values are pairs of loudness and duration sorted by loudness
+    total = sum(weight for _, weight in values)
+    position = total * percentile
+    accumulated = 0.0
+    for value, weight in values:
+        accumulated += weight
+        if accumulated >= position:
+            return value
+
+    return values[-1][0]
+
+
+def _clamp(value: float, bounds: tuple) -> float:
+    return min(max(value, bounds[0]), bounds[1])
+
+
+def combine_loudness(fragments: Iterable[FragmentLoudness], volume: float = 1.0) -> Dict[str, float]:
+    """
+    Estimate loudness of concatenated book parts from their statistics, so loudness of whole book
+    isn't measured again when only some parts are changed.
+
+    Integrated loudness is duration weighted power mean of parts with absolute and relative gates applied
+    to whole parts instead of 400 ms blocks, true peak is maximum of parts. Loudness range is estimated as the widest
+    of range of any part and spread between 10th and 95th percentile of parts loudness. True peak is exact,
+    integrated loudness is close to full measurement when parts are much longer than gating blocks.
+
+    :param fragments: statistics of book parts
+    :param volume: value for volume for main audio which is applied after concatenation,
+                   it must be positive after rounding to one decimal
+    :return: dict with loudness which can be passed as loudnorm_measured to concatenate,
+             values are clamped to ranges accepted by loudnorm
+    """
+
+    # volume filter of concatenation gets value with one decimal, gain is calculated from the same value
+    applied_volume = float(f"{volume:.1f}")
+    if not applied_volume > 0:
+        raise ValueError(f"volume must be at least 0.05 to be applied by volume filter, got {volume}")
+
+    fragments = [f for f in fragments if f.duration > 0 and f.input_i > ABSOLUTE_GATE]
+    gain = 20 * math.log10(applied_volume)
+
+    if not fragments:
+        return {
+            "input_i": ABSOLUTE_GATE,
+            "input_tp": ABSOLUTE_GATE,
+            "input_lra": 0.0,
+            "input_thresh": ABSOLUTE_GATE,
+            "target_offset": 0.0,
+        }
+
+    ungated = _power_mean(fragments)
+    gated = [f for f in fragments if f.input_i >= ungated + RELATIVE_GATE] or fragments
+    integrated = _power_mean(gated)
+
+    lra_values = sorted((f.input_i, f.duration) for f in fragments if f.input_i >= integrated + LRA_RELATIVE_GATE)
+    spread = _weighted_percentile(lra_values, 0.95) - _weighted_percentile(lra_values, 0.10) if lra_values else 0.0
+
+    return {
+        "input_i": round(_clamp(integrated + gain, LOUDNORM_I_RANGE), 2),
+        "input_tp": round(_clamp(max(f.input_tp for f in fragments) + gain, LOUDNORM_TP_RANGE), 2),
+        "input_lra": round(max(spread, max(f.input_lra for f in fragments)), 2),
+        "input_thresh": round(_clamp(integrated + gain + RELATIVE_GATE, LOUDNORM_THRESH_RANGE), 2),
+        "target_offset": 0.0,
+    }
+
+
+def measure_book_loudness(
+    build_list: BuildList,
+    cache: Optional[MetadataCache] = None,
+    volume: float = 1.0,
+    max_workers: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Measure loudness of book from loudness of its parts. Parts which statistics are in cache aren't analysed again,
+    other parts are measured concurrently.
+
+    :param build_list: list book parts audio path and pauses, pauses are below absolute gate and are skipped
+    :param cache: cache of metadata where statistics of parts are stored
+    :param volume: value for volume for main audio
+    :param max_workers: maximum number of concurrently running ffmpeg processes, by default the number of CPUs
+    :return: dict with loudness which can be passed as loudnorm_measured to concatenate
+    """
+
+    build_list = [path for path in build_list if not isinstance(path, Silence)]
+    if not build_list:
+        return combine_loudness([], volume)
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(build_list)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fragments = list(executor.map(lambda path: fragment_loudness(path, cache), build_list))
+
+    return combine_loudness(fragments, volume)
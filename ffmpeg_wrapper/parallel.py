@@ -0,0 +1,187 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+from typing import List, Optional, Sequence, Tuple
+
+from ffmpeg_wrapper.simple import (
+    CancellationToken,
+    FFMPEGWrapperException,
+    convert,
+    demux_concat_ffmpeg_command,
+    duration,
+    execute_command,
+    execution_options,
+    write_concat_list,
+)
+
+
+# ten minutes of audio is encoded in a few seconds, so overhead of process start and join is negligible
+CHUNK_DURATION = 600.0
+
+
+def chunk_ranges(
+    total: float,
+    boundaries: Sequence[float],
+    chunk_duration: float = CHUNK_DURATION,
+) -> List[Tuple[float, Optional[float]]]:
+    """
+    Split audio to time ranges at given boundaries. Boundaries closer than chunk_duration to the previous one
+    are skipped and the last range is extended to the end of audio instead of being a short tail.
+
+    :param total: duration of audio in seconds
+    :param boundaries: times in seconds where audio may be split, for example starts of chapters
+    :param chunk_duration: minimum duration of one range in seconds
+    :return: list of pairs of start and duration in seconds, duration of the last range is None
+    """
+
+    if chunk_duration <= 0:
+        raise ValueError("chunk_duration must be positive")
+
+    starts = [0.0]
+    for boundary in sorted(boundaries):
+        if boundary - starts[-1] >= chunk_duration:
+            starts.append(boundary)
+    if len(starts) > 1 and total - starts[-1] < chunk_duration:
+        starts.pop()
+
+    ranges: List[Tuple[float, Optional[float]]] = [(start, end - start) for start, end in zip(starts, starts[1:])]
+    ranges.append((starts[-1], None))
+    return ranges
+
+
+def chunk_convert_ffmpeg_command(
+    input_path: str,
+    output_path: str,
+    start: float,
+    chunk_duration: Optional[float],
+    bit_rate: int,
+) -> List[str]:
+    """
+    Build command for ffmpeg which convert time range of audio to selected format.
+
+    :param input_path: path to source audio
+    :param output_path: path to converted chunk
+    :param start: start of range in seconds
+    :param chunk_duration: duration of range in seconds, None means till the end of audio
+    :param bit_rate: bit rate value which will be set to result audio
+    :return: completed ffmpeg command for shell
+    """
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-ss", f"{start:.6f}"]
+    if chunk_duration is not None:
+        command.extend(["-t", f"{chunk_duration:.6f}"])
+    command.extend(["-i", input_path, "-ab", f"{bit_rate}k", "-y", output_path])
+    return command
+
+
+def convert_chunk(
+    input_path: str,
+    output_path: str,
+    start: float,
+    chunk_duration: Optional[float],
+    bit_rate: int,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> None:
+    """
+    Convert time range of audio to selected format.
+
+    :param input_path: path to source audio
+    :param output_path: path to converted chunk
+    :param start: start of range in seconds
+    :param chunk_duration: duration of range in seconds, None means till the end of audio
+    :param bit_rate: bit rate value which will be set to result audio
+    :param timeout: seconds after which ffmpeg is terminated and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    """
+
+    command_kwargs = dict(
+        input_path=input_path,
+        output_path=output_path,
+        start=start,
+        chunk_duration=chunk_duration,
+        bit_rate=bit_rate,
+    )
+
+    status, out, er = execute_command(
+        chunk_convert_ffmpeg_command, **command_kwargs, **execution_options(timeout=timeout, cancel_token=cancel_token)
+    )
+    if status:
+        command = chunk_convert_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+
+def parallel_convert(
+    input_info: Tuple[str, str, str],
+    output_info: Tuple[str, str, str],
+    bit_rate: int,
+    chunk_duration: float = CHUNK_DURATION,
+    max_workers: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+    boundaries: Sequence[float] = (),
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Convert audio to chosen format with selected bit rate using several ffmpeg processes. Audio is split
+    only at boundaries given by caller, ranges are encoded concurrently and joined by concat demuxer with stream copy.
+    Audio without boundaries or not longer than one chunk is converted by convert.
+
+    Lossy encoders like MP3 and AAC add priming samples at the start of every stream and pad the last frame,
+    so join of independently encoded ranges isn't sample exact: it adds a few milliseconds of silence
+    (about 25 ms for MP3). That is why audio is never split at arbitrary time, boundaries must lie in pauses,
+    for example between chapters, where the join only lengthens the pause.
+
+    :param input_info: tuple with info about completed book (file_name, file_path, file_format,)
+    :param output_info: tuple with info about completed book after convert (file_name, file_path, file_format,)
+    :param bit_rate: selected bit rate value
+    :param chunk_duration: minimum duration of one chunk in seconds, closer boundaries are skipped
+    :param max_workers: maximum number of concurrently running ffmpeg processes, by default the number of CPUs
+    :param tmp_dir: directory for converted chunks, by default system temporary directory
+    :param boundaries: times in seconds where audio may be split, for example starts of chapters
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg processes when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised, it also stops chunks which aren't started yet
+    :return: tuple which contain return code, output and error message
+    """
+
+    input_path = input_info[1]
+    output_path = output_info[1]
+
+    if not boundaries:
+        return convert(input_info, output_info, bit_rate, timeout=timeout, cancel_token=cancel_token)
+
+    ranges = chunk_ranges(duration(input_path), boundaries, chunk_duration)
+    if len(ranges) == 1:
+        return convert(input_info, output_info, bit_rate, timeout=timeout, cancel_token=cancel_token)
+
+    extension = os.path.splitext(output_path)[1]
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(ranges)))
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        chunks = [os.path.join(directory, f"{index}{extension}") for index in range(len(ranges))]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(convert_chunk, input_path, chunk_path, start, length, bit_rate, timeout, cancel_token)
+                for chunk_path, (start, length) in zip(chunks, ranges)
+            ]
+            for future in futures:
+                future.result()
+
+        list_path = os.path.join(directory, "chunks.txt")
+        write_concat_list(chunks, list_path)
+
+        status, out, er = execute_command(
+            demux_concat_ffmpeg_command,
+            list_path=list_path,
+            output_path=output_path,
+            **execution_options(timeout=timeout, cancel_token=cancel_token),
+        )
+        if status:
+            command = demux_concat_ffmpeg_command(list_path=list_path, output_path=output_path)
+            raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+        return status, out, er
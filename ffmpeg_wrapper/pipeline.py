@@ -0,0 +1,216 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from ffmpeg_wrapper.filtergraph import Chain, filter_complex_options, node
+from ffmpeg_wrapper.progress import PROGRESS_OPTIONS, Progress, ProgressParser
+from ffmpeg_wrapper.simple import (
+    CONCAT_FAN_IN,
+    BuildList,
+    CancellationToken,
+    FFMPEGWrapperException,
+    background_graph,
+    concat_graph,
+    concat_inputs,
+    execute_command,
+    execution_options,
+    measure_concat_loudness,
+    total_duration,
+    tree_concatenated,
+)
+
+
+def pipeline_ffmpeg_command(
+    build_list: BuildList,
+    outputs: Sequence[Tuple[Tuple[str, str, str], int]],
+    channels: int = 2,
+    background_path: Optional[str] = None,
+    background_volume: float = 1.0,
+    volume: float = 1.0,
+    sample_rate: int = 48000,
+    use_normalization: bool = False,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    is_normalize: bool = True,
+    is_short: bool = False,
+    progress: bool = False,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+) -> List[str]:
+    """
+    Build command for ffmpeg which concatenate book parts, add background audio if need, normalize loudness
+    and encode book to every output, so completed audio isn't written to intermediate file.
+
+    :param build_list: list book parts audio path and pauses (Silence)
+    :param outputs: pairs of tuple which contain completed audio file name, path, format and bit rate value
+    :param channels: the number of channels for the completed audio
+    :param background_path: path to background audio
+    :param background_volume: value for volume for background audio
+    :param volume: value for volume for main audio
+    :param sample_rate: sample rate
+    :param use_normalization: enable normalization
+    :param peak: allowed peak volume
+    :param rms_level: allowed root mean square of audio volume
+    :param loudness_range_target: allowed range of loudness of audio volume
+    :param is_normalize: flag for normalize or not audio
+    :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it
+    :param progress: if flag is True then ffmpeg writes progress to output
+    :param loudnorm_measured: loudness measured by concat_loudnorm_measure_ffmpeg_command,
+                              if it is set then audio is normalized in linear mode
+    :return: completed ffmpeg command for shell
+    """
+
+    graph = concat_graph(
+        build_list,
+        volume,
+        use_normalization,
+        rms_level,
+        peak,
+        loudness_range_target,
+        is_short,
+        loudnorm_measured=loudnorm_measured,
+        sample_rate=sample_rate,
+        channels=channels,
+    )
+
+    if background_path:
+        graph = graph.extend(background_graph(background_path, background_volume, is_normalize, output="out"))
+        out_label = "out"
+    else:
+        out_label = "book"
+
+    if len(outputs) > 1:
+        labels = [f"out{index}" for index in range(len(outputs))]
+        graph = graph.extend(Chain((node("asplit", len(outputs)),), (out_label,), tuple(labels)))
+    else:
+        labels = [out_label]
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if progress:
+        command.extend(PROGRESS_OPTIONS)
+    command.extend(concat_inputs(build_list))
+    command.extend(filter_complex_options(graph))
+    command.append("-y")
+    for label, (output_info, bit_rate) in zip(labels, outputs):
+        output_file_name, output_file_path, output_file_format = output_info
+        command.extend(
+            [
+                "-map",
+                f"[{label}]",
+                "-ac",
+                f"{channels}",
+                "-ar",
+                f"{sample_rate}",
+                "-ab",
+                f"{bit_rate}k",
+                output_file_path,
+            ]
+        )
+    return command
+
+
+def build_book(
+    build_list: BuildList,
+    outputs: Sequence[Tuple[Tuple[str, str, str], int]],
+    channels: int = 2,
+    background_path: Optional[str] = None,
+    background_volume: float = 1.0,
+    volume: float = 1.0,
+    sample_rate: int = 48000,
+    use_normalization: bool = False,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    is_normalize: bool = True,
+    is_short: bool = False,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    two_pass_normalization: bool = False,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    fan_in: int = CONCAT_FAN_IN,
+    max_workers: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Concatenate book parts and convert book to delivery formats by one ffmpeg process. It does the same
+    as concatenate followed by convert or convert_many, but completed audio isn't written to disk and read again.
+
+    :param build_list: list book parts audio path and pauses (Silence)
+    :param outputs: pairs of tuple with info about completed book after convert (file_name, file_path, file_format,)
+                    and selected bit rate value
+    :param channels: the number of channels for the completed audio
+    :param background_path: path to background audio
+    :param background_volume: value for volume for background audio
+    :param volume: value for volume for main audio
+    :param sample_rate: sample rate
+    :param use_normalization: enable normalization
+    :param peak: value of peak volume of concatenated audio
+    :param rms_level: value of root mean square of loduness in concatenated audio
+    :param loudness_range_target: value of target loudness range
+    :param is_normalize: flag for normalize or not audio
+    :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it
+    :param on_progress: callback which is called with progress of ffmpeg, percentage is calculated against
+                        summed duration of build_list, only the final pass is reported, groups of long build list
+                        and measurement of loudness don't report progress
+    :param two_pass_normalization: if flag is True and use_normalization is True then loudness is measured
+                                   by separate ffmpeg pass and audio is normalized in linear mode
+    :param loudnorm_measured: loudness measured beforehand, for example by measure_concat_loudness,
+                              then audio is normalized in linear mode without measurement pass
+    :param fan_in: maximum number of parts concatenated by one ffmpeg process
+    :param max_workers: maximum number of concurrently running ffmpeg processes for groups of parts,
+                        by default the number of CPUs
+    :param tmp_dir: directory for intermediate audios and scripts of huge filter graphs,
+                    by default system temporary directory
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    execution_kwargs = execution_options(threads, timeout, cancel_token, tmp_dir)
+    if on_progress is not None:
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, total_duration(build_list)).feed_line
+
+    with tree_concatenated(
+        build_list, channels, sample_rate, fan_in, max_workers, tmp_dir, threads, timeout, cancel_token
+    ) as build_list:
+        if not use_normalization:
+            loudnorm_measured = None
+        elif two_pass_normalization and loudnorm_measured is None:
+            loudnorm_measured = measure_concat_loudness(
+                build_list,
+                volume=volume,
+                peak=peak,
+                rms_level=rms_level,
+                loudness_range_target=loudness_range_target,
+                threads=threads,
+                timeout=timeout,
+                cancel_token=cancel_token,
+            )
+
+        command_kwargs = dict(
+            build_list=build_list,
+            outputs=outputs,
+            channels=channels,
+            background_path=background_path,
+            background_volume=background_volume,
+            volume=volume,
+            sample_rate=sample_rate,
+            use_normalization=use_normalization,
+            peak=peak,
+            rms_level=rms_level,
+            loudness_range_target=loudness_range_target,
+            is_normalize=is_normalize,
+            is_short=is_short,
+            progress=on_progress is not None,
+            loudnorm_measured=loudnorm_measured,
+        )
+
+        status, out, er = execute_command(pipeline_ffmpeg_command, **command_kwargs, **execution_kwargs)
+        if status:
+            command = pipeline_ffmpeg_command(**command_kwargs)
+            raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+        return status, out, er
@@ -0,0 +1,436 @@
+from collections import deque
+from contextlib import contextmanager
+import errno
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import IO, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from ffmpeg_wrapper.simple import (
+    PIPE_READ_SIZE,
+    STDERR_TAIL_LINES,
+    BuildList,
+    CancellationToken,
+    FFMPEGWrapperCancelledException,
+    FFMPEGWrapperException,
+    FFMPEGWrapperTimeoutException,
+    LineSplitter,
+    Silence,
+    _read_pipe,
+    _signal_process,
+    _watchdog,
+    concat_ffmpeg_command,
+    convert_ffmpeg_command,
+    execution_options,
+    stderr_tail_collector,
+)
+
+
+PIPE_INPUT = "pipe:0"
+PIPE_OUTPUT = "pipe:1"
+# writes to pipe are atomic up to its buffer size, larger writes only block longer
+PIPE_WRITE_SIZE = 64 * 1024
+# named pipe can't be opened for writing until ffmpeg opens it for reading
+FIFO_OPEN_INTERVAL = 0.01
+
+# uploads to object storage are done by parts of several hundreds kilobytes at least
+STREAM_CHUNK_SIZE = 256 * 1024
+# every audio packet is keyframe, so fragments are cut by duration in microseconds instead of frag_keyframe
+FRAGMENT_DURATION = 1000000
+FRAGMENTED_MP4_OPTIONS = ["-movflags", "empty_moov+default_base_moof", "-frag_duration", f"{FRAGMENT_DURATION}"]
+# options which make container writable to non-seekable output, mp3 and adts need none
+STREAMABLE_FORMAT_OPTIONS = {
+    "mp4": FRAGMENTED_MP4_OPTIONS,
+    "ipod": FRAGMENTED_MP4_OPTIONS,
+    "mov": FRAGMENTED_MP4_OPTIONS,
+}
+
+# path to audio file, pause, audio in memory, binary file object or iterable of chunks of audio
+AudioSource = Union[str, Silence, bytes, bytearray, memoryview, BinaryIO, Iterable[bytes]]
+
+
+def _iter_source(source: AudioSource) -> Iterator[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # slices of memoryview aren't copies
+        view = memoryview(source)
+        for offset in range(0, len(view), PIPE_WRITE_SIZE):
+            yield view[offset : offset + PIPE_WRITE_SIZE]
+    elif hasattr(source, "read"):
+        yield from iter(lambda: source.read(PIPE_WRITE_SIZE), b"")
+    else:
+        yield from source
+
+
+def _write_source(stream: IO[bytes], source: AudioSource) -> None:
+    try:
+        for chunk in _iter_source(source):
+            stream.write(chunk)
+    except BrokenPipeError:
+        # ffmpeg stopped reading input, its return code and error output explain the reason
+        pass
+    finally:
+        try:
+            stream.close()
+        except BrokenPipeError:
+            pass
+
+
+def _open_fifo(path: str, process_handle: subprocess.Popen) -> Optional[IO[bytes]]:
+    while True:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as exc:
+            if exc.errno != errno.ENXIO:
+                raise
+            # ffmpeg exited before it opened all inputs
+            if process_handle.poll() is not None:
+                return None
+            time.sleep(FIFO_OPEN_INTERVAL)
+            continue
+
+        os.set_blocking(fd, True)
+        return os.fdopen(fd, "wb")
+
+
+def _feed_fifo(path: str, source: AudioSource, process_handle: subprocess.Popen) -> None:
+    stream = _open_fifo(path, process_handle)
+    if stream is not None:
+        _write_source(stream, source)
+
+
+def _catch_errors(target: Callable, errors: List[BaseException]) -> Callable:
+    def run(*args) -> None:
+        try:
+            target(*args)
+        except BaseException as exc:
+            errors.append(exc)
+
+    return run
+
+
+@contextmanager
+def piped_inputs(
+    sources: Sequence[AudioSource],
+) -> Iterator[Tuple[BuildList, Optional[AudioSource], Dict[str, AudioSource]]]:
+    """
+    Map sources to inputs of ffmpeg. Paths and pauses are passed as is, the first source in memory is passed
+    through stdin, other ones through named pipes in temporary directory which is removed on exit.
+    Named pipes are POSIX only.
+
+    :param sources: audio sources
+    :return: tuple which contain input paths for ffmpeg command, source for stdin and sources for named pipes
+    """
+
+    paths: BuildList = []
+    stdin_source = None
+    fifo_sources: Dict[str, AudioSource] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for index, source in enumerate(sources):
+            if isinstance(source, (str, Silence)):
+                paths.append(source)
+            elif stdin_source is None:
+                stdin_source = source
+                paths.append(PIPE_INPUT)
+            else:
+                path = os.path.join(directory, f"{index}.fifo")
+                os.mkfifo(path)
+                fifo_sources[path] = source
+                paths.append(path)
+
+        yield paths, stdin_source, fifo_sources
+
+
+def _terminated_exception(
+    reason: str,
+    er: str,
+    return_code: Optional[int],
+    command: List[str],
+    timeout: Optional[float],
+) -> FFMPEGWrapperException:
+    if reason == "timeout":
+        return FFMPEGWrapperTimeoutException("", er, return_code=return_code, command=command, timeout=timeout)
+    return FFMPEGWrapperCancelledException("", er, return_code=return_code, command=command)
+
+
+def stream_command(command_func: Callable, *args, **kwargs) -> Iterator[bytes]:
+    """
+    Execute command in subprocess and yield its output by chunks as ffmpeg writes it. Sources are written
+    to stdin and named pipes by background threads. Process is read only when consumer asks for the next chunk,
+    so ffmpeg waits for slow consumer instead of buffering output in memory. If consumer stops iteration early
+    then process is killed. If timeout expires or cancel_token is cancelled then process group of subprocess
+    is terminated, no more chunks are yielded and FFMPEGWrapperTimeoutException or FFMPEGWrapperCancelledException
+    is raised.
+
+    :param command_func: function will be executed in subprocess
+    :param args: values which transferred to command_func
+    :param kwargs: values which transferred to command_func, except execution options:
+                   stdin_source - source which is written to stdin of process,
+                   fifo_sources - dict of named pipe path and source which is written to it,
+                   chunk_size - size of yielded chunks, the last chunk can be shorter,
+                   on_stderr_line - callback which is called with every line of error output,
+                   stderr_tail_lines - the number of last lines of error output which are kept for exception,
+                   timeout - seconds after which process is terminated, time of consumer is counted too,
+                   cancel_token - token which terminates process when it is cancelled
+    :return: iterator of chunks of output
+    """
+
+    stdin_source: Optional[AudioSource] = kwargs.pop("stdin_source", None)
+    fifo_sources: Dict[str, AudioSource] = kwargs.pop("fifo_sources", None) or {}
+    chunk_size: int = kwargs.pop("chunk_size", PIPE_READ_SIZE)
+    on_stderr_line: Optional[Callable[[str], None]] = kwargs.pop("on_stderr_line", None)
+    stderr_tail_lines: int = kwargs.pop("stderr_tail_lines", STDERR_TAIL_LINES)
+    timeout: Optional[float] = kwargs.pop("timeout", None)
+    cancel_token: Optional[CancellationToken] = kwargs.pop("cancel_token", None)
+    command = command_func(*args, **kwargs)
+
+    err_tail: Deque[str] = deque(maxlen=stderr_tail_lines)
+    errors: List[BaseException] = []
+    is_watched = timeout is not None or cancel_token is not None
+    group = is_watched and os.name == "posix"
+    done = threading.Event()
+    reasons: List[str] = []
+
+    if cancel_token is not None and cancel_token.cancelled:
+        raise FFMPEGWrapperCancelledException(command=command)
+
+    try:
+        process_handle = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE if stdin_source is not None else subprocess.DEVNULL,
+            start_new_session=group,
+        )
+    except OSError as exc:
+        raise FFMPEGWrapperException(er=str(exc), return_code=getattr(exc, "errno", None), command=command) from exc
+
+    threads = [
+        threading.Thread(
+            target=_read_pipe,
+            args=(process_handle.stderr, LineSplitter(stderr_tail_collector(err_tail, on_stderr_line))),
+            daemon=True,
+        )
+    ]
+    if stdin_source is not None:
+        threads.append(
+            threading.Thread(
+                target=_catch_errors(_write_source, errors),
+                args=(process_handle.stdin, stdin_source),
+                daemon=True,
+            )
+        )
+    for path, source in fifo_sources.items():
+        threads.append(
+            threading.Thread(
+                target=_catch_errors(_feed_fifo, errors),
+                args=(path, source, process_handle),
+                daemon=True,
+            )
+        )
+
+    if is_watched:
+        threads.append(
+            threading.Thread(
+                target=_watchdog,
+                args=(process_handle, timeout, cancel_token, done, reasons, group),
+                daemon=True,
+            )
+        )
+
+    for thread in threads:
+        thread.start()
+
+    completed = False
+    try:
+        for chunk in iter(lambda: process_handle.stdout.read(chunk_size), b""):
+            # output of terminated process is incomplete, so it isn't passed to consumer
+            if reasons:
+                break
+            yield chunk
+        completed = True
+    finally:
+        if not completed and process_handle.poll() is None:
+            _signal_process(process_handle, getattr(signal, "SIGKILL", signal.SIGTERM), group)
+        process_handle.stdout.close()
+        status = process_handle.wait()
+        done.set()
+        for thread in threads:
+            thread.join()
+        process_handle.stderr.close()
+
+    if reasons:
+        raise _terminated_exception(reasons[0], "\n".join(err_tail), status, command, timeout)
+
+    if errors:
+        raise errors[0]
+
+    if status:
+        raise FFMPEGWrapperException("", "\n".join(err_tail), return_code=status, command=command)
+
+
+def _collect(chunks: Iterator[bytes], output: Optional[BinaryIO]) -> Optional[bytes]:
+    if output is None:
+        return b"".join(chunks)
+
+    for chunk in chunks:
+        output.write(chunk)
+
+    return None
+
+
+def concatenate_piped(
+    sources: Sequence[AudioSource],
+    output_format: str,
+    output: Optional[BinaryIO] = None,
+    channels: int = 2,
+    background_path: Optional[str] = None,
+    background_volume: float = 1.0,
+    volume: float = 1.0,
+    sample_rate: int = 48000,
+    use_normalization: bool = False,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    is_normalize: bool = True,
+    is_short: bool = False,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Optional[bytes]:
+    """
+    Concatenate book parts which can be kept in memory to book without temporary files.
+
+    :param sources: book parts, every part is path, bytes-like object, binary file object or iterable of chunks
+    :param output_format: container of completed audio, for example "wav", "mp3" or "adts"
+    :param output: binary file object where completed audio is written, if it is None then audio is returned
+    :param channels: the number of channels for the completed audio
+    :param background_path: path to background audio
+    :param background_volume: value for volume for background audio
+    :param volume: value for volume for main audio
+    :param sample_rate: sample rate
+    :param use_normalization: enable normalization
+    :param peak: value of peak volume of concatenated audio
+    :param rms_level: value of root mean square of loduness in concatenated audio
+    :param loudness_range_target: value of target loudness range
+    :param is_normalize: flag for normalize or not audio
+    :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it
+    :param loudnorm_measured: loudness measured beforehand, then audio is normalized in linear mode
+    :param timeout: seconds after which ffmpeg is terminated and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: completed audio or None if it is written to output
+    """
+
+    with piped_inputs(sources) as (build_list, stdin_source, fifo_sources):
+        chunks = stream_command(
+            concat_ffmpeg_command,
+            build_list=build_list,
+            output_path=PIPE_OUTPUT,
+            channels=channels,
+            background_path=background_path,
+            background_volume=background_volume,
+            volume=volume,
+            sample_rate=sample_rate,
+            use_normalization=use_normalization,
+            peak=peak,
+            rms_level=rms_level,
+            loudness_range_target=loudness_range_target,
+            is_normalize=is_normalize,
+            is_short=is_short,
+            loudnorm_measured=loudnorm_measured,
+            output_format=output_format,
+            stdin_source=stdin_source,
+            fifo_sources=fifo_sources,
+            **execution_options(timeout=timeout, cancel_token=cancel_token),
+        )
+        return _collect(chunks, output)
+
+
+def convert_piped(
+    source: AudioSource,
+    output_format: str,
+    bit_rate: int,
+    output: Optional[BinaryIO] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Optional[bytes]:
+    """
+    Convert audio which can be kept in memory to chosen format with selected bit rate without temporary files.
+
+    :param source: path, bytes-like object, binary file object or iterable of chunks of audio
+    :param output_format: container of completed audio, for example "mp3" or "adts"
+    :param bit_rate: selected bit rate value
+    :param output: binary file object where completed audio is written, if it is None then audio is returned
+    :param timeout: seconds after which ffmpeg is terminated and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: completed audio or None if it is written to output
+    """
+
+    with piped_inputs([source]) as (paths, stdin_source, fifo_sources):
+        chunks = stream_command(
+            convert_ffmpeg_command,
+            input_info=("", paths[0], ""),
+            output_info=("", PIPE_OUTPUT, output_format),
+            bit_rate=bit_rate,
+            output_format=output_format,
+            stdin_source=stdin_source,
+            fifo_sources=fifo_sources,
+            **execution_options(timeout=timeout, cancel_token=cancel_token),
+        )
+        return _collect(chunks, output)
+
+
+def convert_stream_ffmpeg_command(input_path: str, output_format: str, bit_rate: int) -> List[str]:
+    """
+    Build command for ffmpeg which convert audio to selected format and write it to output in streamable container.
+
+    :param input_path: path to source audio
+    :param output_format: container of completed audio, for example "mp3", "adts" or "ipod" (m4a, m4b)
+    :param bit_rate: bit rate value which will be set to result audio
+    :return: completed ffmpeg command for shell
+    """
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", input_path, "-ab", f"{bit_rate}k"]
+    command.extend(STREAMABLE_FORMAT_OPTIONS.get(output_format, []))
+    command.extend(["-f", output_format, PIPE_OUTPUT])
+    return command
+
+
+def convert_stream(
+    input_info: Tuple[str, str, str],
+    output_format: str,
+    bit_rate: int,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Iterator[bytes]:
+    """
+    Convert audio to chosen format with selected bit rate and yield encoded audio by chunks while ffmpeg works,
+    so upload can start before encoding is finished. ffmpeg is paused while consumer doesn't ask for the next chunk.
+    If iteration is stopped early then ffmpeg is killed when generator is closed, use contextlib.closing
+    to close it immediately. Exception is raised after the last chunk if ffmpeg fails.
+
+    :param input_info: tuple with info about completed book (file_name, file_path, file_format,)
+    :param output_format: container of completed audio, for example "mp3", "adts" or "ipod" (m4a, m4b)
+    :param bit_rate: selected bit rate value
+    :param chunk_size: size of chunks, the last chunk can be shorter
+    :param timeout: seconds after which ffmpeg is terminated and FFMPEGWrapperTimeoutException is raised,
+                    time spent by consumer is counted too
+    :param cancel_token: token which terminates running ffmpeg when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: iterator of chunks of encoded audio
+    """
+
+    return stream_command(
+        convert_stream_ffmpeg_command,
+        input_path=input_info[1],
+        output_format=output_format,
+        bit_rate=bit_rate,
+        chunk_size=chunk_size,
+        **execution_options(timeout=timeout, cancel_token=cancel_token),
+    )
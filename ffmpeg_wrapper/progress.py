@@ -0,0 +1,86 @@
+from typing import Callable, Dict, NamedTuple, Optional
+
+
+PROGRESS_OPTIONS = ["-progress", "pipe:1", "-nostats"]
+
+
+class Progress(NamedTuple):
+    """
+    Progress of running ffmpeg command.
+
+    :param out_time: duration of already processed audio in seconds
+    :param total: expected duration of result audio in seconds or None if it is unknown
+    :param percentage: processed part of audio in percents or None if total is unknown
+    :param speed: speed of processing relative to realtime, for example 20.0 means 20 seconds of audio per second,
+                  None if ffmpeg didn't report it yet
+    :param eta: estimated time to finish in seconds or None if it is unknown
+    :param is_end: True for the last event
+    """
+
+    out_time: float
+    total: Optional[float]
+    percentage: Optional[float]
+    speed: Optional[float]
+    eta: Optional[float]
+    is_end: bool
+
+
+class ProgressParser:
+    """
+    Parse output of ffmpeg with option "-progress pipe:1" line by line. ffmpeg writes block of "key=value" lines
+    which ends with line "progress=continue" or "progress=end", every block is passed to callback as Progress.
+    """
+
+    def __init__(self, callback: Callable[[Progress], None], total: Optional[float] = None):
+        """
+        :param callback: function which is called with every progress event
+        :param total: expected duration of result audio in seconds
+        """
+
+        self.callback = callback
+        self.total = total if total else None
+        self._values: Dict[str, str] = {}
+
+    def feed_line(self, line: str) -> None:
+        key, separator, value = line.strip().partition("=")
+        if not separator:
+            return
+
+        if key != "progress":
+            self._values[key] = value.strip()
+            return
+
+        self.callback(self._build(is_end=value.strip() == "end"))
+        self._values = {}
+
+    def _build(self, is_end: bool) -> Progress:
+        out_time = self._parse_out_time()
+        speed = self._parse_speed()
+
+        percentage = None
+        eta = None
+        if self.total is not None:
+            percentage = 100.0 if is_end else min(100.0, out_time * 100.0 / self.total)
+            if is_end:
+                eta = 0.0
+            elif speed:
+                eta = max(0.0, self.total - out_time) / speed
+
+        return Progress(out_time, self.total, percentage, speed, eta, is_end)
+
+    def _parse_out_time(self) -> float:
+        # out_time_ms is in microseconds too, it is ffmpeg naming bug kept for compatibility
+        for key in ("out_time_us", "out_time_ms"):
+            try:
+                return max(0.0, int(self._values[key]) / 1_000_000)
+            except (KeyError, ValueError):
+                continue
+
+        return 0.0
+
+    def _parse_speed(self) -> Optional[float]:
+        # speed looks like "20.5x" or "N/A"
+        try:
+            return float(self._values.get("speed", "").rstrip("x"))
+        except ValueError:
+            return None
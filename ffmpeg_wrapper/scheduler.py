@@ -0,0 +1,215 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import functools
+import inspect
+import itertools
+import os
+import threading
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from ffmpeg_wrapper.simple import command_arguments, execute_command, output_paths, thread_options
+
+
+# the number of cores which job of the kind keeps busy, functions and command builders which aren't listed weigh 1
+JOB_WEIGHTS = {
+    "concatenate": 4,
+    "concat_ffmpeg_command": 4,
+    "build_book": 4,
+    "pipeline_ffmpeg_command": 4,
+    "incremental_concatenate": 4,
+    "normalize": 2,
+    "normalize_ffmpeg_command": 2,
+    "convert": 2,
+    "convert_ffmpeg_command": 2,
+    "convert_many": 3,
+    "convert_many_ffmpeg_command": 3,
+    "measure_loudness": 2,
+    "measure_concat_loudness": 2,
+    "loudnorm_measure_ffmpeg_command": 2,
+    "concat_loudnorm_measure_ffmpeg_command": 2,
+}
+
+
+def job_weight(func: Callable) -> int:
+    """
+    Return weight of job by name of function.
+
+    :param func: function or command builder
+    :return: the number of cores which job keeps busy
+    """
+
+    return JOB_WEIGHTS.get(getattr(func, "__name__", ""), 1)
+
+
+def accepts_parameter(func: Callable, name: str) -> bool:
+    """
+    Check that function of this package has parameter, for example threads of concatenate.
+
+    :param func: function which runs ffmpeg
+    :param name: name of parameter
+    :return: True if func accepts parameter
+    """
+
+    try:
+        return name in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def accepts_threads(func: Callable) -> bool:
+    """
+    Check that function of this package has threads parameter, for example concatenate or convert.
+
+    :param func: function which runs ffmpeg
+    :return: True if func accepts threads
+    """
+
+    return accepts_parameter(func, "threads")
+
+
+def threaded_command(command_func: Callable, threads: int) -> Callable:
+    """
+    Wrap command builder, so ffmpeg uses selected number of threads for encoding and filtering
+    (see ffmpeg_wrapper.simple.thread_options). Outputs are found by arguments of command builder.
+
+    :param command_func: command builder
+    :param threads: the number of threads
+    :return: command builder
+    """
+
+    @functools.wraps(command_func)
+    def build(*args, **kwargs) -> List[str]:
+        command = command_func(*args, **kwargs)
+        return thread_options(command, threads, output_paths(command_arguments(command_func, args, kwargs)))
+
+    return build
+
+
+class WeightedLimiter:
+    """
+    Limit of summed weight of running jobs. Waiting jobs are admitted in order of arrival, so heavy job
+    isn't starved by stream of light ones. Job heavier than capacity is admitted alone.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: maximum summed weight of running jobs
+        """
+
+        self.capacity = capacity
+        self.used = 0
+        self._condition = threading.Condition()
+        self._queue: Deque[int] = deque()
+        self._tickets = itertools.count()
+
+    def acquire(self, weight: int) -> int:
+        weight = min(weight, self.capacity)
+        with self._condition:
+            ticket = next(self._tickets)
+            self._queue.append(ticket)
+            self._condition.wait_for(lambda: self._queue[0] == ticket and self.used + weight <= self.capacity)
+            self._queue.popleft()
+            self.used += weight
+            self._condition.notify_all()
+
+        return weight
+
+    def release(self, weight: int) -> None:
+        with self._condition:
+            self.used -= weight
+            self._condition.notify_all()
+
+
+class Scheduler:
+    """
+    Executor of ffmpeg jobs with limit of used cores. Every job has weight, the number of cores it keeps busy,
+    and jobs wait in queue while summed weight of running jobs would exceed capacity.
+
+    Usage:
+        with Scheduler(capacity=8) as scheduler:
+            futures = [scheduler.submit(concatenate, build_list, path) for build_list, path in books]
+            results = [future.result() for future in futures]
+    """
+
+    def __init__(self, capacity: Optional[int] = None, max_workers: Optional[int] = None):
+        """
+        :param capacity: maximum summed weight of running jobs, by default the number of CPUs
+        :param max_workers: maximum number of threads which wait for jobs, by default capacity,
+                            it is upper bound of the number of running jobs
+        """
+
+        self.capacity = capacity or os.cpu_count() or 1
+        self._limiter = WeightedLimiter(self.capacity)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or self.capacity)
+
+    def _run(self, weight: int, func: Callable, args: tuple, kwargs: dict) -> Any:
+        weight = self._limiter.acquire(weight)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._limiter.release(weight)
+
+    def submit(self, func: Callable, *args, weight: Optional[int] = None, **kwargs) -> Future:
+        """
+        Queue call of function of this package, for example concatenate or volume_detect.
+        Function which accepts threads, like concatenate or convert, gets threads equal to weight of job.
+        Function which runs several ffmpeg processes and accepts max_workers, like convert_many, gets
+        max_workers, so its processes together keep busy no more cores than weight of job.
+
+        :param func: function which runs ffmpeg
+        :param args: values which transferred to func
+        :param weight: the number of cores which job keeps busy, by default it is taken from JOB_WEIGHTS
+        :param kwargs: values which transferred to func
+        :return: future of result of func
+        """
+
+        if weight is None:
+            weight = job_weight(func)
+
+        threads = min(weight, self.capacity)
+        if "threads" not in kwargs and accepts_threads(func):
+            kwargs["threads"] = threads
+
+        if "max_workers" not in kwargs and accepts_parameter(func, "max_workers"):
+            kwargs["max_workers"] = max(1, weight // threads)
+
+        return self._executor.submit(self._run, weight, func, args, kwargs)
+
+    def submit_command(
+        self,
+        command_func: Callable,
+        *args,
+        weight: Optional[int] = None,
+        **kwargs,
+    ) -> "Future[Tuple[int, str, str]]":
+        """
+        Queue execution of command built by command builder, ffmpeg gets -threads equal to weight of job.
+
+        :param command_func: command builder, for example convert_ffmpeg_command
+        :param args: values which transferred to command_func
+        :param weight: the number of cores which job keeps busy, by default it is taken from JOB_WEIGHTS
+        :param kwargs: values which transferred to command_func and execution options of execute_command
+        :return: future of tuple which contain return code, output and error message
+        """
+
+        if weight is None:
+            weight = job_weight(command_func)
+
+        kwargs.setdefault("threads", min(weight, self.capacity))
+        return self.submit(execute_command, command_func, *args, weight=weight, **kwargs)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """
+        Stop accepting jobs.
+
+        :param wait: wait for queued jobs
+        :param cancel_futures: cancel jobs which aren't started yet
+        """
+
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self) -> "Scheduler":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.shutdown()
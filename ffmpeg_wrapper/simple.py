@@ -1,6 +1,69 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+import inspect
+import json
+import os
+import re
+import signal
 import subprocess
 from subprocess import CalledProcessError
-from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import tempfile
+import threading
+import time
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from ffmpeg_wrapper.cache import MetadataCache
+from ffmpeg_wrapper.filtergraph import (
+    GRAPH_CACHE_SIZE,
+    Chain,
+    Filter,
+    FilterGraph,
+    filter_complex_options,
+    filter_scripts,
+    node,
+)
+from ffmpeg_wrapper.instrumentation import StatsHook, command_stats, emit, has_hooks, wait_with_usage
+from ffmpeg_wrapper.progress import PROGRESS_OPTIONS, Progress, ProgressParser
+from ffmpeg_wrapper.wav import read_wav_info, wav_duration, write_silence
+
+
+DURATION_CACHE_KIND = "duration"
+VOLUME_DETECT_CACHE_KIND = "volume_detect"
+
+# ffmpeg writes a lot of progress lines to stderr while processing long audio,
+# only the last lines are kept for FFMPEGWrapperException
+STDERR_TAIL_LINES = 1000
+PIPE_READ_SIZE = 64 * 1024
+MAX_LINE_LENGTH = 64 * 1024
+LINE_SEPARATOR_PATTERN = re.compile(rb"\r\n|\r|\n")
+
+# larger build lists are concatenated by groups, so ffmpeg doesn't open thousands of inputs at once
+CONCAT_FAN_IN = 256
+# intermediate audio is lossless and can be longer than 4 GB limit of WAV
+INTERMEDIATE_CODEC = "pcm_f32le"
+INTERMEDIATE_EXTENSION = "mka"
+
+CHANNEL_LAYOUTS = {1: "mono", 2: "stereo"}
+
+# ffmpeg finalizes output on SIGTERM, it is killed if it doesn't exit in this time
+TERMINATE_GRACE_PERIOD = 5.0
+WATCHDOG_INTERVAL = 0.05
 
 
 class FFMPEGWrapperException(Exception):
@@ -71,11 +134,176 @@ class FFMPEGWrapperException(Exception):
         return "; ".join(parts)
 
 
+class FFMPEGWrapperTimeoutException(FFMPEGWrapperException):
+    """
+    ffmpeg didn't finish in time and was killed. stderr contains error output written before it.
+    """
+
+    def __init__(
+        self,
+        out: Optional[str] = None,
+        er: Optional[str] = None,
+        return_code: Optional[int] = None,
+        command: Optional[Union[str, Sequence[str]]] = None,
+        timeout: Optional[float] = None,
+    ):
+        super().__init__(out, er, return_code=return_code, command=command)
+        self.timeout = timeout
+        self.args = (f"FFMPEG timed out after {timeout} seconds; {self.args[0]}",)
+
+
+class FFMPEGWrapperCancelledException(FFMPEGWrapperException):
+    """
+    ffmpeg was killed because its CancellationToken was cancelled. stderr contains error output written before it.
+    """
+
+    def __init__(
+        self,
+        out: Optional[str] = None,
+        er: Optional[str] = None,
+        return_code: Optional[int] = None,
+        command: Optional[Union[str, Sequence[str]]] = None,
+    ):
+        super().__init__(out, er, return_code=return_code, command=command)
+        self.args = (f"FFMPEG was cancelled; {self.args[0]}",)
+
+
 class FFMPEGWrapperParsingException(Exception):
     pass
 
 
-def loudnorm_filter(use_normalization: bool, rms_level: float, peak: float, loudness_range_target: float) -> str:
+class CancellationToken:
+    """
+    Token which is passed to execute_command as cancel_token, cancel from any thread kills running ffmpeg.
+    One token can be shared by all commands of one job.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+
+class StreamInfo(NamedTuple):
+    """
+    Parameters of the first audio stream of file.
+
+    :param codec_name: name of codec in terms of ffmpeg, for example "pcm_s16le"
+    :param sample_rate: sample rate
+    :param channels: the number of channels
+    """
+
+    codec_name: str
+    sample_rate: int
+    channels: int
+
+
+class Silence(NamedTuple):
+    """
+    Pause in build list of concatenate. It is generated inside filter graph, so no file is read or written.
+
+    :param duration: duration of pause in seconds
+    """
+
+    duration: float
+
+
+# book parts audio paths and pauses
+BuildList = List[Union[str, Silence]]
+
+
+class DurationResult(NamedTuple):
+    """
+    Result of probing one file in batch.
+
+    :param path: path to audio file
+    :param duration: audio duration in seconds or None if probing failed
+    :param error: exception raised while probing or None if probing succeeded
+    """
+
+    path: str
+    duration: Optional[float]
+    error: Optional[Exception]
+
+
+def loudnorm_node(
+    rms_level: float,
+    peak: float,
+    loudness_range_target: float,
+    measured: Optional[Dict[str, float]] = None,
+    print_format: Optional[str] = None,
+) -> Filter:
+    """
+    Build loudnorm filter which normalizes audio stream loudness.
+
+    :param rms_level: allowed root mean square of audio volume
+    :param peak: allowed peak volume
+    :param loudness_range_target: allowed range of loudness of audio volume
+    :param measured: loudness of audio measured by the first pass (see parse_loudnorm),
+                     if it is set then filter normalizes audio in linear mode
+    :param print_format: if it is set then filter prints measured loudness in this format, for example "json"
+    :return: filter
+    """
+
+    options: Dict[str, Any] = dict(I=rms_level, TP=peak, LRA=loudness_range_target)
+
+    if measured is not None:
+        options.update(
+            measured_I=measured["input_i"],
+            measured_TP=measured["input_tp"],
+            measured_LRA=measured["input_lra"],
+            measured_thresh=measured["input_thresh"],
+            offset=measured["target_offset"],
+            linear="true",
+        )
+
+    if print_format is not None:
+        options["print_format"] = print_format
+
+    return node("loudnorm", **options)
+
+
+def loudnorm_is_linear(
+    measured: Optional[Dict[str, float]],
+    rms_level: float,
+    peak: float,
+    loudness_range_target: float,
+) -> bool:
+    """
+    Check that loudnorm with measured values normalizes audio in linear mode. loudnorm reverts to dynamic mode
+    if loudness range of source is above target, if gain pushes true peak above target or if source is silent.
+
+    :param measured: loudness of audio measured by the first pass (see parse_loudnorm)
+    :param rms_level: allowed root mean square of audio volume
+    :param peak: allowed peak volume
+    :param loudness_range_target: allowed range of loudness of audio volume
+    :return: True if loudnorm works in linear mode
+    """
+
+    # input_thresh is -70 if source is silent
+    if measured is None or measured["input_thresh"] <= -70.0:
+        return False
+
+    offset = rms_level - measured["input_i"]
+    return measured["input_lra"] <= loudness_range_target and measured["input_tp"] + offset <= peak
+
+
+def loudnorm_filter(
+    use_normalization: bool,
+    rms_level: float,
+    peak: float,
+    loudness_range_target: float,
+    measured: Optional[Dict[str, float]] = None,
+    print_format: Optional[str] = None,
+) -> str:
     """
     Build ffmpeg filter which normalizes audio stream loudness.
 
@@ -83,54 +311,228 @@ def loudnorm_filter(use_normalization: bool, rms_level: float, peak: float, loud
     :param rms_level: allowed root mean square of audio volume
     :param peak: allowed peak volume
     :param loudness_range_target: allowed range of loudness of audio volume
+    :param measured: loudness of audio measured by the first pass (see parse_loudnorm),
+                     if it is set then filter normalizes audio in linear mode
+    :param print_format: if it is set then filter prints measured loudness in this format, for example "json"
     :return: command for shell
     """
 
     if not use_normalization:
         return ""
 
-    return f",loudnorm=I={rms_level}:TP={peak}:LRA={loudness_range_target}"
+    return f",{loudnorm_node(rms_level, peak, loudness_range_target, measured, print_format)}"
+
+
+def silence_chains(
+    build_list: BuildList,
+    sample_rate: int = 48000,
+    channels: int = 2,
+) -> Tuple[List[Chain], List[str]]:
+    """
+    Build chains which render pauses of build list by anullsrc and atrim filters and labels of concat inputs.
+
+    :param build_list: list book parts audio path and pauses
+    :param sample_rate: sample rate of pauses
+    :param channels: the number of channels of pauses
+    :return: - tuple 0 - chains of pauses 1 - labels of concat inputs, both are empty if there are no pauses
+    """
+
+    if not any(isinstance(part, Silence) for part in build_list):
+        return [], []
+
+    channel_layout = CHANNEL_LAYOUTS.get(channels, f"{channels}c")
+    chains = []
+    labels = []
+    input_index = 0
+    for index, part in enumerate(build_list):
+        if isinstance(part, Silence):
+            silence = (
+                node("anullsrc", r=sample_rate, cl=channel_layout),
+                node("atrim", duration=f"{part.duration:.3f}"),
+            )
+            chains.append(Chain(silence, outputs=(f"s{index}",)))
+            labels.append(f"s{index}")
+        else:
+            labels.append(f"{input_index}:a")
+            input_index += 1
+
+    return chains, labels
+
+
+def silence_concat_inputs(build_list: BuildList, sample_rate: int = 48000, channels: int = 2) -> str:
+    """
+    Part of filter for concatenate book parts with pauses. Every pause is rendered by anullsrc and atrim filters
+    and all inputs of concat filter are labeled explicitly.
+
+    :param build_list: list book parts audio path and pauses
+    :param sample_rate: sample rate of pauses
+    :param channels: the number of channels of pauses
+    :return: filters of pauses followed by labels of concat inputs, empty string if there are no pauses
+    """
+
+    chains, labels = silence_chains(build_list, sample_rate, channels)
+    return "".join(f"{chain};" for chain in chains) + "".join(f"[{label}]" for label in labels)
+
+
+def concat_inputs(build_list: BuildList) -> List[str]:
+    """
+    Part of command with inputs of concatenate, pauses aren't read from files.
+
+    :param build_list: list book parts audio path and pauses
+    :return: list of options
+    """
+
+    command = []
+    for part_path in build_list:
+        if isinstance(part_path, Silence):
+            continue
+        command.append("-i")
+        command.append(part_path)
+    return command
+
+
+@lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def _concat_graph(
+    build_list: Tuple[Union[str, Silence], ...],
+    volume: float,
+    use_normalization: bool,
+    rms_level: float,
+    peak: float,
+    loudness_range_target: float,
+    is_short: bool,
+    loudnorm_measured: Optional[Tuple[Tuple[str, float], ...]],
+    loudnorm_print_format: Optional[str],
+    sample_rate: int,
+    channels: int,
+) -> FilterGraph:
+    chains, labels = silence_chains(build_list, sample_rate, channels)
+    filters = [node("concat", n=len(build_list), v=0, a=1), node("volume", f"{volume:.1f}")]
+
+    if use_normalization:
+        measured = dict(loudnorm_measured) if loudnorm_measured is not None else None
+        loudnorm = loudnorm_node(rms_level, peak, loudness_range_target, measured, loudnorm_print_format)
+        # dynamic mode of loudnorm needs 3 seconds of audio to start, linear mode works for audio of any length
+        if is_short and not loudnorm_is_linear(measured, rms_level, peak, loudness_range_target):
+            filters.extend([node("adelay", "30s"), loudnorm, node("atrim", start=30)])
+        else:
+            filters.append(loudnorm)
+
+    return FilterGraph(tuple(chains) + (Chain(tuple(filters), tuple(labels), ("book",)),))
+
+
+def concat_graph(
+    build_list: BuildList,
+    volume: float,
+    use_normalization: bool,
+    rms_level: float,
+    peak: float,
+    loudness_range_target: float,
+    is_short: bool,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    loudnorm_print_format: Optional[str] = None,
+    sample_rate: int = 48000,
+    channels: int = 2,
+) -> FilterGraph:
+    """
+    Build filter graph which concatenates book parts to stream labelled book. Graphs are cached,
+    so repeated builds of the same book share graph and its serialization.
+
+    Parameters are the same as parameters of concat_command.
+
+    :return: filter graph
+    """
+
+    return _concat_graph(
+        tuple(build_list),
+        volume,
+        use_normalization,
+        rms_level,
+        peak,
+        loudness_range_target,
+        is_short,
+        tuple(loudnorm_measured.items()) if loudnorm_measured is not None else None,
+        loudnorm_print_format,
+        sample_rate,
+        channels,
+    )
 
 
 def concat_command(
-    build_list: List[str],
+    build_list: BuildList,
     volume: float,
     use_normalization: bool,
     rms_level: float,
     peak: float,
     loudness_range_target: float,
     is_short: bool,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    loudnorm_print_format: Optional[str] = None,
+    sample_rate: int = 48000,
+    channels: int = 2,
 ) -> Tuple[List[str], str]:
     """
     Part of command for concatenate book parts to book.
 
-    :param build_list: list book parts audio path
+    :param build_list: list book parts audio path and pauses (Silence) which are generated by anullsrc filter
     :param volume: setting for audio volume
     :param use_normalization: enable normalization
     :param peak: allowed peak volume
     :param rms_level: allowed root mean square of audio volume
     :param loudness_range_target: allowed range of loudness of audio volume
-    :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it
+    :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it,
+                     it isn't needed if loudnorm normalizes in linear mode (see loudnorm_is_linear)
+    :param loudnorm_measured: loudness measured by the first pass of two-pass normalization
+    :param loudnorm_print_format: format of loudness printed by loudnorm filter
+    :param sample_rate: sample rate of pauses
+    :param channels: the number of channels of pauses
     :return: - tuple 0 - list files 1 - concatenate filter
     """
 
-    concat_files = []
-    for part_path in build_list:
-        concat_files.append("-i")
-        concat_files.append(part_path)
+    graph = concat_graph(
+        build_list,
+        volume,
+        use_normalization,
+        rms_level,
+        peak,
+        loudness_range_target,
+        is_short,
+        loudnorm_measured=loudnorm_measured,
+        loudnorm_print_format=loudnorm_print_format,
+        sample_rate=sample_rate,
+        channels=channels,
+    )
 
-    count = len(build_list)
+    return concat_inputs(build_list), str(graph)
 
-    volume_filter = f",volume={volume:.1f}"
 
-    loudnorm = loudnorm_filter(use_normalization, rms_level, peak, loudness_range_target)
+def background_graph(
+    background_path: str,
+    background_volume: float,
+    is_normalize: bool = True,
+    output: Optional[str] = None,
+) -> FilterGraph:
+    """
+    Build filter graph which mixes stream labelled book with infinity stream audio from chosen file.
 
-    if is_short and loudnorm:
-        concat_filter = f"concat=n={count}:v=0:a=1{volume_filter},adelay=30s{loudnorm},atrim=start=30[book]"
-    else:
-        concat_filter = f"concat=n={count}:v=0:a=1{volume_filter}{loudnorm}[book]"
+    :param background_path: path to source background audio
+    :param background_volume: value for volume for background audio
+    :param is_normalize: flag for normalize or not audio
+    :param output: label of mixed stream, by default it isn't labelled
+    :return: filter graph
+    """
 
-    return concat_files, concat_filter
+    background = (
+        node("amovie", background_path, loop=0),
+        node("asetpts", "N/SR/TB"),
+        node("volume", f"{background_volume:.1f}"),
+    )
+    mix = node("amix", duration="shortest", normalize=int(is_normalize))
+    return FilterGraph(
+        (
+            Chain(background, outputs=("background",)),
+            Chain((mix,), inputs=("book", "background"), outputs=(output,) if output else ()),
+        )
+    )
 
 
 def background_filter(background_path: str, background_volume: float, is_normalize: bool = True) -> str:
@@ -143,11 +545,7 @@ def background_filter(background_path: str, background_volume: float, is_normali
     :return: command for shell
     """
 
-    normalize = int(is_normalize)
-    return (
-        f"amovie={background_path}:loop=0,asetpts=N/SR/TB,volume={background_volume:.1f}[background];"
-        f"[book][background]amix=duration=shortest:normalize={normalize}"
-    )
+    return str(background_graph(background_path, background_volume, is_normalize))
 
 
 def simple_concat_ffmpeg_command(
@@ -156,7 +554,8 @@ def simple_concat_ffmpeg_command(
     channels: int = 2,
 ) -> List[str]:
     """
-    Simple concatenate audios
+    Simple concatenate audios by concat filter, audios are decoded, so they may have different codecs,
+    sample rates and the number of channels. It produces the same audio as join by concat demuxer.
 
     :param build_list: list book parts audio path
     :param output_path: path to completed audio
@@ -164,24 +563,18 @@ def simple_concat_ffmpeg_command(
     :return: completed ffmpeg command for shell
     """
 
-    command = [
-        "ffmpeg",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-    ]
-
-    for part_path in build_list:
-        command.append("-i")
-        command.append(part_path)
+    graph = FilterGraph((Chain((node("concat", n=len(build_list), v=0, a=1),), outputs=("book",)),))
 
-    command.extend(["-ac", f"{channels}", "-y", output_path])
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    command.extend(concat_inputs(build_list))
+    command.extend(filter_complex_options(graph))
+    command.extend(["-map", "[book]", "-ac", f"{channels}", "-y", output_path])
 
     return command
 
 
 def concat_ffmpeg_command(
-    build_list: List[str],
+    build_list: BuildList,
     output_path: str,
     channels: int = 2,
     background_path: Optional[str] = None,
@@ -194,6 +587,10 @@ def concat_ffmpeg_command(
     loudness_range_target: float = 18.0,
     is_normalize: bool = True,
     is_short: bool = False,
+    progress: bool = False,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    codec: Optional[str] = None,
+    output_format: Optional[str] = None,
 ) -> List[str]:
     """
     Build command for ffmpeg which concatenate book parts to book and add background audio if need.
@@ -211,18 +608,16 @@ def concat_ffmpeg_command(
     :param loudness_range_target: allowed range of loudness of audio volume
     :param is_normalize: flag for normalize or not audio
     :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it
+    :param progress: if flag is True then ffmpeg writes progress to output
+    :param loudnorm_measured: loudness measured by concat_loudnorm_measure_ffmpeg_command,
+                              if it is set then audio is normalized in linear mode
+    :param codec: audio codec of completed audio, by default it is chosen by ffmpeg from output_path
+    :param output_format: container of completed audio, by default it is chosen by ffmpeg from output_path,
+                          it is required for output to pipe
     :return: completed ffmpeg command for shell
     """
 
-    if background_path:
-        background = background_filter(background_path, background_volume, is_normalize)
-        background = f";{background}"
-        map_out = []
-    else:
-        background = ""
-        map_out = ["-map", "[book]"]
-
-    concat_files, concat_filter = concat_command(
+    graph = concat_graph(
         build_list,
         volume,
         use_normalization,
@@ -230,110 +625,1023 @@ def concat_ffmpeg_command(
         peak,
         loudness_range_target,
         is_short,
+        loudnorm_measured=loudnorm_measured,
+        sample_rate=sample_rate,
+        channels=channels,
     )
 
+    if background_path:
+        graph = graph.extend(background_graph(background_path, background_volume, is_normalize))
+        map_out = []
+    else:
+        map_out = ["-map", "[book]"]
+
     command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
-    command.extend(concat_files)
-    command.extend(["-filter_complex", f"{concat_filter}{background}"])
+    if progress:
+        command.extend(PROGRESS_OPTIONS)
+    command.extend(concat_inputs(build_list))
+    command.extend(filter_complex_options(graph))
     command.extend(map_out)
-    command.extend(["-ac", f"{channels}", "-ar", f"{sample_rate}", "-y", output_path])
+    command.extend(["-ac", f"{channels}", "-ar", f"{sample_rate}"])
+    if codec is not None:
+        command.extend(["-c:a", codec])
+    if output_format is not None:
+        command.extend(["-f", output_format])
+    command.extend(["-y", output_path])
     return command
 
 
-def convert_ffmpeg_command(
-    input_info: Tuple[str, str, str],
-    output_info: Tuple[str, str, str],
-    bit_rate: int,
+def segment_ffmpeg_command(
+    input_path: str,
+    output_path: str,
+    channels: int = 2,
+    volume: float = 1.0,
+    sample_rate: int = 48000,
+    codec: str = "pcm_s16le",
 ) -> List[str]:
     """
-    Build command for ffmpeg which convert from source format to selected format.
+    Build command for ffmpeg which renders book part to intermediate segment with parameters of completed audio,
+    so segments can be joined by concat demuxer without re-encoding.
 
-    :param input_info: tuple which contain source audio file name, path, format
-    :param output_info: tuple which contain completed audio file name, path, format
-    :param bit_rate: bit rate value which will be set to result audio
+    :param input_path: path to book part
+    :param output_path: path to segment
+    :param channels: the number of channels for the completed audio
+    :param volume: value for volume for main audio
+    :param sample_rate: sample rate
+    :param codec: audio codec of segment
     :return: completed ffmpeg command for shell
     """
 
-    input_file_name, input_file_path, input_file_format = input_info
-    output_file_name, output_file_path, output_file_format = output_info
-
     return [
         "ffmpeg",
         "-hide_banner",
         "-loglevel",
         "error",
         "-i",
-        input_file_path,
-        "-ab",
-        f"{bit_rate}k",
+        input_path,
+        "-af",
+        f"volume={volume:.1f}",
+        "-ac",
+        f"{channels}",
+        "-ar",
+        f"{sample_rate}",
+        "-c:a",
+        codec,
         "-y",
-        output_file_path,
+        output_path,
     ]
 
 
-def duration_ffmpeg_command(file_path: str) -> List[str]:
+def write_concat_list(paths: List[str], list_path: str) -> None:
     """
-    Build command for ffmpeg which return audio file duration.
+    Write list of files for concat demuxer.
 
-    :param file_path: path to audio file
-    :return: completed ffmpeg command for shell
+    :param paths: paths to audio files
+    :param list_path: path to list
     """
 
-    return [
-        "ffprobe",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-i",
-        file_path,
-        "-show_entries",
-        "format=duration",
-        "-v",
-        "quiet",
-        "-of",
-        "csv=p=0",
-    ]
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
 
 
-def silent_ffmpeg_command(duration_value: float, output_path: str) -> List[str]:
+def demux_concat_ffmpeg_command(list_path: str, output_path: str, stream_copy: bool = True) -> List[str]:
     """
-    Build command for ffmpeg which create silent audio with selected duration.
+    Build command for ffmpeg which joins files from list (see write_concat_list) by concat demuxer
+    with stream copy, so audio isn't decoded and encoded again. All files must have the same codec and parameters.
 
-    :param duration_value: duration for silent audio
-    :param output_path: path to result
+    :param list_path: path to list of files
+    :param output_path: path to completed audio
+    :param stream_copy: if flag is False then joined audio is encoded by codec chosen by ffmpeg from output_path
     :return: completed ffmpeg command for shell
     """
 
-    return [
-        "ffmpeg",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-f",
-        "lavfi",
-        "-i",
-        "anullsrc",
-        "-t",
-        f"{duration_value:.3f}",
-        "-ar",
-        "48000",
-        "-ac",
-        "1",
-        "-y",
-        output_path,
-    ]
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if stream_copy:
+        command.extend(["-c", "copy"])
+    command.extend(["-y", output_path])
+    return command
 
 
-def normalize_ffmpeg_command(
-    input_path: str,
-    output_path: str,
+def concat_loudnorm_measure_ffmpeg_command(
+    build_list: BuildList,
+    volume: float = 1.0,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+) -> List[str]:
+    """
+    Build command for ffmpeg which measures loudness of concatenated book parts. It is the first pass of
+    two-pass normalization, result is parsed by parse_loudnorm and passed to concat_ffmpeg_command.
+
+    :param build_list: list book parts audio path
+    :param volume: value for volume for main audio
+    :param peak: allowed peak volume
+    :param rms_level: allowed root mean square of audio volume
+    :param loudness_range_target: allowed range of loudness of audio volume
+    :return: completed ffmpeg command for shell
+    """
+
+    graph = concat_graph(
+        build_list,
+        volume,
+        True,
+        rms_level,
+        peak,
+        loudness_range_target,
+        False,
+        loudnorm_print_format="json",
+    )
+
+    # loudnorm prints measured values with info level
+    command = ["ffmpeg", "-hide_banner", "-nostdin", "-nostats"]
+    command.extend(concat_inputs(build_list))
+    command.extend(filter_complex_options(graph))
+    command.extend(["-map", "[book]", "-f", "null", "-"])
+    return command
+
+
+def convert_ffmpeg_command(
+    input_info: Tuple[str, str, str],
+    output_info: Tuple[str, str, str],
+    bit_rate: int,
+    progress: bool = False,
+    output_format: Optional[str] = None,
+) -> List[str]:
+    """
+    Build command for ffmpeg which convert from source format to selected format.
+
+    :param input_info: tuple which contain source audio file name, path, format
+    :param output_info: tuple which contain completed audio file name, path, format
+    :param bit_rate: bit rate value which will be set to result audio
+    :param progress: if flag is True then ffmpeg writes progress to output
+    :param output_format: container of completed audio, by default it is chosen by ffmpeg from output path,
+                          it is required for output to pipe
+    :return: completed ffmpeg command for shell
+    """
+
+    input_file_name, input_file_path, input_file_format = input_info
+    output_file_name, output_file_path, output_file_format = output_info
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if progress:
+        command.extend(PROGRESS_OPTIONS)
+    command.extend(["-i", input_file_path, "-ab", f"{bit_rate}k"])
+    if output_format is not None:
+        command.extend(["-f", output_format])
+    command.extend(["-y", output_file_path])
+    return command
+
+
+def convert_many_ffmpeg_command(
+    input_info: Tuple[str, str, str],
+    outputs: Sequence[Tuple[Tuple[str, str, str], int]],
+    progress: bool = False,
+) -> List[str]:
+    """
+    Build command for ffmpeg which convert from source format to several selected formats. Source is read
+    and decoded once, decoded audio is encoded for every output.
+
+    :param input_info: tuple which contain source audio file name, path, format
+    :param outputs: pairs of tuple which contain completed audio file name, path, format and bit rate value
+    :param progress: if flag is True then ffmpeg writes progress to output
+    :return: completed ffmpeg command for shell
+    """
+
+    input_file_name, input_file_path, input_file_format = input_info
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if progress:
+        command.extend(PROGRESS_OPTIONS)
+    command.extend(["-i", input_file_path, "-y"])
+    for output_info, bit_rate in outputs:
+        output_file_name, output_file_path, output_file_format = output_info
+        command.extend(["-ab", f"{bit_rate}k", output_file_path])
+    return command
+
+
+def duration_ffmpeg_command(file_path: str) -> List[str]:
+    """
+    Build command for ffmpeg which return audio file duration.
+
+    :param file_path: path to audio file
+    :return: completed ffmpeg command for shell
+    """
+
+    return [
+        "ffprobe",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        file_path,
+        "-show_entries",
+        "format=duration",
+        "-v",
+        "quiet",
+        "-of",
+        "csv=p=0",
+    ]
+
+
+def stream_info_ffmpeg_command(file_path: str) -> List[str]:
+    """
+    Build command for ffprobe which return codec, sample rate and the number of channels of the first audio stream.
+
+    :param file_path: path to audio file
+    :return: completed ffmpeg command for shell
+    """
+
+    return [
+        "ffprobe",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        file_path,
+        "-select_streams",
+        "a:0",
+        "-show_entries",
+        "stream=codec_name,sample_rate,channels",
+        "-v",
+        "quiet",
+        "-of",
+        "csv=p=0",
+    ]
+
+
+def probe_durations_ffmpeg_command(paths: List[str]) -> List[str]:
+    """
+    Build command for ffmpeg which print info about many audio files in one process.
+    ffprobe accepts only one input, so ffmpeg is used without output: it opens every input, dumps its info
+    to error output and exits with error "At least one output file must be specified".
+
+    :param paths: paths to audio files
+    :return: completed ffmpeg command for shell
+    """
+
+    command = ["ffmpeg", "-hide_banner", "-nostdin"]
+
+    for path in paths:
+        command.append("-i")
+        command.append(path)
+
+    return command
+
+
+def silent_ffmpeg_command(duration_value: float, output_path: str, progress: bool = False) -> List[str]:
+    """
+    Build command for ffmpeg which create silent audio with selected duration.
+
+    :param duration_value: duration for silent audio
+    :param output_path: path to result
+    :param progress: if flag is True then ffmpeg writes progress to output
+    :return: completed ffmpeg command for shell
+    """
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if progress:
+        command.extend(PROGRESS_OPTIONS)
+    command.extend(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            "anullsrc",
+            "-t",
+            f"{duration_value:.3f}",
+            "-ar",
+            "48000",
+            "-ac",
+            "1",
+            "-y",
+            output_path,
+        ]
+    )
+    return command
+
+
+def normalize_ffmpeg_command(
+    input_path: str,
+    output_path: str,
     peak: float,
     rms_level: float,
     loudness_range_target: float,
     sampling_frequency: int,
+    measured: Optional[Dict[str, float]] = None,
+) -> List[str]:
+    """
+    Build command for ffmpeg which normalizes audio with selected level
+
+    :param input_path: path where input file is
+    :param output_path: path to output file
+    :param peak: value of peak volume
+    :param rms_level: value of root mean square of loudness
+    :param loudness_range_target: value of target loudness range
+    :param sampling_frequency: frequency of sampling in Hz, for example 44100
+    :param measured: loudness measured by loudnorm_measure_ffmpeg_command,
+                     if it is set then audio is normalized in linear mode
+    :return: completed ffmpeg command for shell
+    """
+
+    loudnorm = loudnorm_node(rms_level, peak, loudness_range_target, measured=measured)
+
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        input_path,
+        "-af",
+        f"{loudnorm}",
+        "-ar",
+        f"{sampling_frequency}",
+        output_path,
+    ]
+
+
+def loudnorm_measure_ffmpeg_command(
+    input_path: str,
+    peak: float,
+    rms_level: float,
+    loudness_range_target: float,
 ) -> List[str]:
     """
-    Build command for ffmpeg which normalizes audio with selected level
+    Build command for ffmpeg which measures loudness of audio. It is the first pass of two-pass normalization,
+    result is parsed by parse_loudnorm and passed to normalize_ffmpeg_command.
+
+    :param input_path: path where input file is
+    :param peak: value of peak volume
+    :param rms_level: value of root mean square of loudness
+    :param loudness_range_target: value of target loudness range
+    :return: completed ffmpeg command for shell
+    """
+
+    loudnorm = loudnorm_node(rms_level, peak, loudness_range_target, print_format="json")
+
+    # loudnorm prints measured values with info level
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostdin",
+        "-nostats",
+        "-i",
+        input_path,
+        "-af",
+        f"{loudnorm}",
+        "-vn",
+        "-sn",
+        "-dn",
+        "-f",
+        "null",
+        "-",
+    ]
+
+
+def volume_detect_command(path_to_file: str) -> List[str]:
+    return [
+        "ffmpeg",
+        "-i",
+        path_to_file,
+        "-af",
+        "volumedetect",
+        "-vn",
+        "-sn",
+        "-dn",
+        "-f",
+        "null",
+        "/dev/null",
+    ]
+
+
+def parse_duration(out: str) -> float:
+    """
+    Parse output of duration command.
+
+    :param out: output of command built by duration_ffmpeg_command
+    :return: audio duration in seconds or 0.0 if output can't be parsed
+    """
+
+    try:
+        return float(out)
+    except ValueError:
+        return 0.0
+
+
+INPUT_DUMP_PATTERN = re.compile(r"^Input #(\d+),", re.MULTILINE)
+DURATION_DUMP_PATTERN = re.compile(r"^\s+Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)", re.MULTILINE)
+
+
+def parse_probe_durations(er: str) -> Dict[int, Optional[float]]:
+    """
+    Parse error output of command built by probe_durations_ffmpeg_command.
+
+    Lines look like:
+        Input #0, wav, from '1.wav':
+          Duration: 00:00:01.25, bitrate: 768 kb/s
+
+    :param er: error output of command
+    :return: dict where key is index of opened input and value is its duration in seconds
+             or None if ffmpeg doesn't know duration ("Duration: N/A")
+    """
+
+    inputs = list(INPUT_DUMP_PATTERN.finditer(er))
+    result: Dict[int, Optional[float]] = {}
+
+    for position, match in enumerate(inputs):
+        end = inputs[position + 1].start() if position + 1 < len(inputs) else len(er)
+        duration_match = DURATION_DUMP_PATTERN.search(er, match.end(), end)
+        if duration_match is None:
+            result[int(match.group(1))] = None
+            continue
+
+        hours, minutes, seconds = duration_match.groups()
+        result[int(match.group(1))] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    return result
+
+
+LOUDNORM_JSON_PATTERN = re.compile(r"\{[^{}]*\}")
+LOUDNORM_MEASURED_KEYS = ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")
+
+
+def parse_loudnorm(er: str) -> Dict[str, float]:
+    """
+    Parse loudness printed by loudnorm filter with print_format=json.
+
+    Output looks like:
+        [Parsed_loudnorm_0 @ 0x7f8b5c004a80]
+        {
+            "input_i" : "-27.61",
+            "input_tp" : "-4.47",
+            ...
+        }
+
+    :param er: error output of ffmpeg
+    :return: dict with measured values, keys are the same as in output of loudnorm
+    """
+
+    matches = LOUDNORM_JSON_PATTERN.findall(er)
+    if not matches:
+        raise FFMPEGWrapperParsingException("Error occurred while parsing FFMPEG output: loudnorm stats not found")
+
+    try:
+        stats = json.loads(matches[-1])
+        # the only not numeric value is "normalization_type"
+        result = {key: float(value) for key, value in stats.items() if key != "normalization_type"}
+    except (ValueError, TypeError, AttributeError) as e:
+        raise FFMPEGWrapperParsingException("Error occurred while parsing FFMPEG output") from e
+
+    if any(key not in result for key in LOUDNORM_MEASURED_KEYS):
+        raise FFMPEGWrapperParsingException("Error occurred while parsing FFMPEG output: loudnorm stats are partial")
+
+    return result
+
+
+def volume_detect_line_collector(rows: List[str]) -> Callable[[str], None]:
+    """
+    Build callback for execute_command which collects lines with result of volumedetect filter.
+
+    :param rows: list where lines are collected
+    :return: callback for on_stderr_line
+    """
+
+    def collect(line: str) -> None:
+        if "Parsed_volumedetect" in line:
+            rows.append(line)
+
+    return collect
+
+
+def parse_stream_info(out: str) -> Optional[StreamInfo]:
+    """
+    Parse output of stream info command.
+
+    :param out: output of command built by stream_info_ffmpeg_command, looks like "pcm_s16le,48000,1"
+    :return: info about stream or None if output can't be parsed
+    """
+
+    try:
+        codec_name, sample_rate, channels = out.strip().split(",")[:3]
+        return StreamInfo(codec_name, int(sample_rate), int(channels))
+    except ValueError:
+        return None
+
+
+def parse_volume_detect(er: str) -> Dict[str, float]:
+    """
+    Parse error output of volume detect command.
+
+    :param er: error output of command built by volume_detect_command
+    :return: dict with root_mean_square and max_volume of audio in dB
+    """
+
+    rows = (r for r in er.split("\n") if "Parsed_volumedetect" in r)
+    result = {}
+    try:
+        for r in rows:
+            if "mean_volume:" in r:
+                # line looks like '[Parsed_volumedetect_0 @ 0x153e3a880] mean_volume: -16.7 dB'
+                result["root_mean_square"] = float(r.split(" ")[-2])
+            if "max_volume:" in r:
+                # line looks like '[Parsed_volumedetect_0 @ 0x153e3a880] max_volume: -0.0 dB'
+                result["max_volume"] = float(r.split(" ")[-2])
+    except (
+        KeyError,
+        IndexError,
+        AttributeError,
+    ) as e:
+        raise FFMPEGWrapperParsingException("Error occurred while parsing FFMPEG output") from e
+
+    return result
+
+
+class LineSplitter:
+    """
+    Split chunks of process output to lines and pass every line to callback.
+    ffmpeg separates progress lines by carriage return, so it is treated as line separator too.
+    Too long line is passed by parts, so memory is bounded by MAX_LINE_LENGTH.
+    """
+
+    def __init__(self, callback: Callable[[str], None]):
+        self.callback = callback
+        self._buffer = b""
+        self._skip_newline = False
+
+    def feed(self, chunk: bytes) -> None:
+        data = self._buffer + chunk
+
+        # "\r\n" may be split between chunks, then "\n" at the beginning of the next chunk isn't new line
+        if self._skip_newline and data.startswith(b"\n"):
+            data = data[1:]
+        self._skip_newline = data.endswith(b"\r")
+
+        *lines, self._buffer = LINE_SEPARATOR_PATTERN.split(data)
+
+        for line in lines:
+            self.callback(line.decode("utf-8", "ignore"))
+
+        if len(self._buffer) > MAX_LINE_LENGTH:
+            self.callback(self._buffer.decode("utf-8", "ignore"))
+            self._buffer = b""
+
+    def close(self) -> None:
+        if self._buffer:
+            self.callback(self._buffer.decode("utf-8", "ignore"))
+            self._buffer = b""
+
+
+def _read_pipe(stream: IO[bytes], splitter: Optional[LineSplitter], chunks: Optional[List[bytes]] = None) -> None:
+    for chunk in iter(lambda: stream.read1(PIPE_READ_SIZE), b""):
+        if chunks is not None:
+            chunks.append(chunk)
+        if splitter is not None:
+            splitter.feed(chunk)
+
+    if splitter is not None:
+        splitter.close()
+
+
+def stderr_tail_collector(
+    tail: Deque[str],
+    on_stderr_line: Optional[Callable[[str], None]] = None,
+) -> Callable[[str], None]:
+    """
+    Build callback which keeps the last lines of output and passes every line to on_stderr_line.
+
+    :param tail: bounded deque where the last lines are kept
+    :param on_stderr_line: callback of caller
+    :return: callback for LineSplitter
+    """
+
+    def collect(line: str) -> None:
+        tail.append(line)
+        if on_stderr_line is not None:
+            on_stderr_line(line)
+
+    return collect
+
+
+def joined_output(chunks: Optional[List[bytes]], tail: Deque[str]) -> str:
+    """
+    Return output of process, whole output if it is collected by chunks else the last lines of it.
+
+    :param chunks: chunks of output or None if output is consumed by callback
+    :param tail: the last lines of output
+    :return: output
+    """
+
+    if chunks is None:
+        return "\n".join(tail)
+    return b"".join(chunks).decode("utf-8", "ignore")
+
+
+def _signal_process(process_handle: subprocess.Popen, sig: int, group: bool) -> None:
+    try:
+        if group:
+            os.killpg(process_handle.pid, sig)
+        elif sig == signal.SIGTERM:
+            process_handle.terminate()
+        else:
+            process_handle.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def terminate_process(process_handle: subprocess.Popen, group: bool = False) -> None:
+    """
+    Terminate process and kill it if it doesn't exit in TERMINATE_GRACE_PERIOD.
+
+    :param process_handle: running process
+    :param group: signal whole process group, process must be started with start_new_session=True
+    """
+
+    if process_handle.poll() is not None:
+        return
+
+    _signal_process(process_handle, signal.SIGTERM, group)
+    try:
+        process_handle.wait(TERMINATE_GRACE_PERIOD)
+    except subprocess.TimeoutExpired:
+        _signal_process(process_handle, getattr(signal, "SIGKILL", signal.SIGTERM), group)
+
+
+def _watchdog(
+    process_handle: subprocess.Popen,
+    timeout: Optional[float],
+    cancel_token: Optional[CancellationToken],
+    done: threading.Event,
+    reasons: List[str],
+    group: bool,
+) -> None:
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while not done.wait(WATCHDOG_INTERVAL):
+        if process_handle.poll() is not None:
+            continue
+        if cancel_token is not None and cancel_token.cancelled:
+            reasons.append("cancelled")
+        elif deadline is not None and time.monotonic() >= deadline:
+            reasons.append("timeout")
+        else:
+            continue
+
+        terminate_process(process_handle, group)
+        return
+
+
+def output_paths(command_kwargs: Dict[str, Any]) -> List[str]:
+    """
+    Return paths of outputs which are passed by keyword to command builder.
+
+    :param command_kwargs: keyword arguments of command builder
+    :return: list of paths
+    """
+
+    paths = []
+    if command_kwargs.get("output_path"):
+        paths.append(command_kwargs["output_path"])
+    if command_kwargs.get("output_info"):
+        paths.append(command_kwargs["output_info"][1])
+    for output_info, _ in command_kwargs.get("outputs") or []:
+        paths.append(output_info[1])
+    return paths
+
+
+def command_arguments(command_func: Callable, args: Sequence[Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return arguments of command builder by name, positional values are bound by signature of builder.
+
+    :param command_func: command builder
+    :param args: positional values of command builder
+    :param kwargs: keyword arguments of command builder
+    :return: dict of parameter name to value, only kwargs if values can't be bound
+    """
+
+    try:
+        return dict(inspect.signature(command_func).bind_partial(*args, **kwargs).arguments)
+    except (TypeError, ValueError):
+        return dict(kwargs)
+
+
+def thread_options(command: List[str], threads: int, outputs: Iterable[str] = ()) -> List[str]:
+    """
+    Limit the number of threads used by ffmpeg command. Threads of filter graphs are global options,
+    they are placed after program name. -threads is option of output, it is placed before every output,
+    so commands without outputs, like probes, get only global options.
+
+    :param command: ffmpeg command
+    :param threads: the number of threads
+    :param outputs: paths of outputs of command
+    :return: new command
+    """
+
+    if not command or command[0] != "ffmpeg":
+        return command
+
+    global_options = []
+    if "-filter_complex" in command or "-filter_complex_script" in command:
+        global_options.extend(["-filter_complex_threads", f"{threads}"])
+    if "-af" in command:
+        global_options.extend(["-filter_threads", f"{threads}"])
+
+    positions = set()
+    for path in outputs:
+        for index in range(len(command) - 1, 0, -1):
+            if command[index] == path and command[index - 1] != "-i":
+                positions.add(index)
+                break
+
+    result = [command[0], *global_options]
+    for index, item in enumerate(command[1:], start=1):
+        if index in positions:
+            result.extend(["-threads", f"{threads}"])
+        result.append(item)
+    return result
+
+
+def execution_options(
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    script_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build execution options of execute_command for high-level functions, options which aren't set are left out.
+
+    :param threads: the number of threads of every ffmpeg process (see thread_options)
+    :param timeout: seconds after which every ffmpeg process is terminated
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled
+    :param script_dir: directory for scripts of huge filter graphs (see ffmpeg_wrapper.filtergraph.filter_scripts)
+    :return: dict of execution options
+    """
+
+    options: Dict[str, Any] = {}
+    if threads is not None:
+        options["threads"] = threads
+    if timeout is not None:
+        options["timeout"] = timeout
+    if cancel_token is not None:
+        options["cancel_token"] = cancel_token
+    if script_dir is not None:
+        options["script_dir"] = script_dir
+    return options
+
+
+def _remove_partial_outputs(paths: Iterable[Optional[str]]) -> None:
+    for path in paths:
+        if path and os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def execute_command(command_func: Callable, *args, **kwargs) -> Tuple[int, str, str]:
+    """
+    Executor for all commands. Execute command in subprocess and wait complete task.
+
+    Output of process is read incrementally. Only the last stderr_tail_lines lines of error output are kept,
+    so memory doesn't depend on length of processed audio. Use on_stderr_line to handle every line of error output.
+
+    :param command_func: function will be executed in subprocess
+    :param args: values which transferred to command_func
+    :param kwargs: values which transferred to command_func, except execution options:
+                   cwd - working directory of process,
+                   on_stdout_line - callback which is called with every line of output, then only the last
+                                    stderr_tail_lines lines of output are returned, so memory of long progress
+                                    reports is bounded,
+                   on_stderr_line - callback which is called with every line of error output,
+                   stderr_tail_lines - the number of last lines of error output which are returned,
+                                       None keeps all lines,
+                   timeout - seconds after which process is terminated and FFMPEGWrapperTimeoutException is raised,
+                   cancel_token - CancellationToken, if it is cancelled then process is terminated
+                                  and FFMPEGWrapperCancelledException is raised,
+                   cleanup_paths - files which are removed if process is terminated,
+                                   by default output_path or paths of output_info and outputs of command builder,
+                   threads - the number of threads of ffmpeg (see thread_options),
+                   script_dir - directory for scripts of graphs longer than FILTER_SCRIPT_THRESHOLD,
+                                by default system temporary directory, scripts are removed when process is finished
+                                (see ffmpeg_wrapper.filtergraph.filter_scripts),
+                   on_stats - callback which is called with CommandStats of process
+                              (see ffmpeg_wrapper.instrumentation, hooks registered by add_hook are called too)
+    :return: tuple which contain return code, output and error message
+    """
+    cwd = kwargs.pop("cwd", None)
+    on_stdout_line: Optional[Callable[[str], None]] = kwargs.pop("on_stdout_line", None)
+    on_stderr_line: Optional[Callable[[str], None]] = kwargs.pop("on_stderr_line", None)
+    stderr_tail_lines: int = kwargs.pop("stderr_tail_lines", STDERR_TAIL_LINES)
+    timeout: Optional[float] = kwargs.pop("timeout", None)
+    cancel_token: Optional[CancellationToken] = kwargs.pop("cancel_token", None)
+    cleanup_paths: Optional[List[str]] = kwargs.pop("cleanup_paths", None)
+    threads: Optional[int] = kwargs.pop("threads", None)
+    script_dir: Optional[str] = kwargs.pop("script_dir", None)
+    on_stats: Optional[StatsHook] = kwargs.pop("on_stats", None)
+    is_instrumented = on_stats is not None or has_hooks()
+    outputs = output_paths(command_arguments(command_func, args, kwargs))
+    cleanup_paths = cleanup_paths or outputs
+    command = command_func(*args, **kwargs)
+    if threads is not None:
+        command = thread_options(command, threads, outputs)
+
+    out_chunks: Optional[List[bytes]] = [] if on_stdout_line is None else None
+    out_tail: Deque[str] = deque(maxlen=stderr_tail_lines)
+    err_tail: Deque[str] = deque(maxlen=stderr_tail_lines)
+    # process group is killed with ffmpeg, so children like amovie sources and network helpers don't survive it
+    is_watched = timeout is not None or cancel_token is not None
+    group = is_watched and os.name == "posix"
+    done = threading.Event()
+    reasons: List[str] = []
+
+    if cancel_token is not None and cancel_token.cancelled:
+        raise FFMPEGWrapperCancelledException(command=command)
+
+    started = time.time()
+    started_clock = time.monotonic()
+    usage = None
+    # script of huge graph exists only while process is running
+    with filter_scripts(command, script_dir) as process_command:
+        try:
+            process_handle = subprocess.Popen(
+                process_command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                stdin=subprocess.PIPE,
+                cwd=cwd,
+                start_new_session=group,
+            )
+            process_handle.stdin.close()
+
+            if is_watched:
+                watchdog = threading.Thread(
+                    target=_watchdog,
+                    args=(process_handle, timeout, cancel_token, done, reasons, group),
+                    daemon=True,
+                )
+                watchdog.start()
+
+            stderr_reader = threading.Thread(
+                target=_read_pipe,
+                args=(process_handle.stderr, LineSplitter(stderr_tail_collector(err_tail, on_stderr_line))),
+                daemon=True,
+            )
+            stderr_reader.start()
+            stdout_splitter = (
+                LineSplitter(stderr_tail_collector(out_tail, on_stdout_line)) if on_stdout_line is not None else None
+            )
+            _read_pipe(process_handle.stdout, stdout_splitter, out_chunks)
+            stderr_reader.join()
+
+            process_handle.stdout.close()
+            process_handle.stderr.close()
+            if is_instrumented:
+                status, usage = wait_with_usage(process_handle)
+            else:
+                status = process_handle.wait()
+        except CalledProcessError as cpe:
+            stdout = getattr(cpe, "stdout", None)
+            stderr = getattr(cpe, "stderr", None)
+            if isinstance(stdout, bytes):
+                stdout = stdout.decode("utf-8", "ignore")
+            if isinstance(stderr, bytes):
+                stderr = stderr.decode("utf-8", "ignore")
+            raise FFMPEGWrapperException(out=stdout, er=stderr, return_code=cpe.returncode, command=command)
+        except OSError as exc:
+            raise FFMPEGWrapperException(
+                er=str(exc), return_code=getattr(exc, "errno", None), command=command
+            ) from exc
+        finally:
+            done.set()
+
+        if is_watched:
+            watchdog.join()
+
+    if is_instrumented:
+        stats = command_stats(
+            getattr(command_func, "__name__", "command"),
+            command,
+            status,
+            started,
+            time.monotonic() - started_clock,
+            usage,
+            outputs,
+        )
+        emit(stats, on_stats)
+
+    out_str: str = joined_output(out_chunks, out_tail)
+    err_str: str = "\n".join(err_tail)
+
+    if reasons:
+        _remove_partial_outputs(cleanup_paths)
+        if reasons[0] == "timeout":
+            raise FFMPEGWrapperTimeoutException(out_str, err_str, return_code=status, command=command, timeout=timeout)
+        raise FFMPEGWrapperCancelledException(out_str, err_str, return_code=status, command=command)
+
+    return status, out_str, err_str
+
+
+def measure_loudness(
+    input_path: str,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Dict[str, float]:
+    """
+    Measure loudness of audio file, it is the first pass of two-pass normalization.
+
+    :param input_path: path to audio file
+    :param peak: value of peak volume
+    :param rms_level: value of root mean square of loudness
+    :param loudness_range_target: value of target loudness range
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: dict with loudness measured by loudnorm filter (input_i, input_tp, input_lra, input_thresh, ...)
+    """
+
+    command_kwargs = dict(
+        input_path=input_path,
+        peak=peak,
+        rms_level=rms_level,
+        loudness_range_target=loudness_range_target,
+    )
+
+    status, out, er = execute_command(
+        loudnorm_measure_ffmpeg_command, **command_kwargs, **execution_options(threads, timeout, cancel_token)
+    )
+
+    if status:
+        command = loudnorm_measure_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return parse_loudnorm(er)
+
+
+def measure_concat_loudness(
+    build_list: BuildList,
+    volume: float = 1.0,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Dict[str, float]:
+    """
+    Measure loudness of concatenated book parts, it is the first pass of two-pass normalization in concatenate.
+
+    :param build_list: list book parts audio path
+    :param volume: value for volume for main audio
+    :param peak: value of peak volume
+    :param rms_level: value of root mean square of loudness
+    :param loudness_range_target: value of target loudness range
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: dict with loudness measured by loudnorm filter (input_i, input_tp, input_lra, input_thresh, ...)
+    """
+
+    command_kwargs = dict(
+        build_list=build_list,
+        volume=volume,
+        peak=peak,
+        rms_level=rms_level,
+        loudness_range_target=loudness_range_target,
+    )
+
+    status, out, er = execute_command(
+        concat_loudnorm_measure_ffmpeg_command, **command_kwargs, **execution_options(threads, timeout, cancel_token)
+    )
+
+    if status:
+        command = concat_loudnorm_measure_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return parse_loudnorm(er)
+
+
+def normalize(
+    input_path: str,
+    output_path: str,
+    peak: float = -3.0,
+    rms_level: float = -18.0,
+    loudness_range_target: float = 18.0,
+    sampling_frequency: int = 48000,
+    two_pass: bool = True,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Normalize loudness of audio file.
 
     :param input_path: path where input file is
     :param output_path: path to output file
@@ -341,80 +1649,157 @@ def normalize_ffmpeg_command(
     :param rms_level: value of root mean square of loudness
     :param loudness_range_target: value of target loudness range
     :param sampling_frequency: frequency of sampling in Hz, for example 44100
-    :return: completed ffmpeg command for shell
+    :param two_pass: if flag is True then loudness is measured by separate pass and audio is normalized
+                     in linear mode, else loudnorm works in dynamic mode
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
     """
 
-    return [
-        "ffmpeg",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-i",
-        input_path,
-        "-af",
-        f"loudnorm=I={rms_level}:TP={peak}:LRA={loudness_range_target}",
-        "-ar",
-        f"{sampling_frequency}",
-        output_path,
-    ]
+    measured = None
+    if two_pass:
+        measured = measure_loudness(
+            input_path,
+            peak=peak,
+            rms_level=rms_level,
+            loudness_range_target=loudness_range_target,
+            threads=threads,
+            timeout=timeout,
+            cancel_token=cancel_token,
+        )
 
+    command_kwargs = dict(
+        input_path=input_path,
+        output_path=output_path,
+        peak=peak,
+        rms_level=rms_level,
+        loudness_range_target=loudness_range_target,
+        sampling_frequency=sampling_frequency,
+        measured=measured,
+    )
 
-def volume_detect_command(path_to_file: str) -> List[str]:
-    return [
-        "ffmpeg",
-        "-i",
-        path_to_file,
-        "-af",
-        "volumedetect",
-        "-vn",
-        "-sn",
-        "-dn",
-        "-f",
-        "null",
-        "/dev/null",
-    ]
+    status, out, er = execute_command(
+        normalize_ffmpeg_command, **command_kwargs, **execution_options(threads, timeout, cancel_token)
+    )
+
+    if status:
+        command = normalize_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return status, out, er
 
 
-def execute_command(command_func: Callable, *args, **kwargs) -> Tuple[int, str, str]:
+def total_duration(paths: BuildList) -> Optional[float]:
     """
-    Executor for all commands. Execute command in subprocess and wait complete task.
+    Return summed duration of audio files.
 
-    :param command_func: function will be executed in subprocess
-    :param args: values which transferred to command_func
-    :param kwargs: values which transferred to command_func
-    :return: tuple which contain return code, output and error message
+    :param paths: paths to audio files and pauses
+    :return: duration in seconds or None if duration of any file is unknown
     """
-    cwd = kwargs.pop("cwd", None)
-    command = command_func(*args, **kwargs)
 
-    try:
-        process_handle = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            cwd=cwd,
-        )
-        out, err = process_handle.communicate()
-        out_str: str = out.decode("utf-8", "ignore")
-        err_str: str = err.decode("utf-8", "ignore")
-        status = process_handle.returncode
-    except CalledProcessError as cpe:
-        stdout = getattr(cpe, "stdout", None)
-        stderr = getattr(cpe, "stderr", None)
-        if isinstance(stdout, bytes):
-            stdout = stdout.decode("utf-8", "ignore")
-        if isinstance(stderr, bytes):
-            stderr = stderr.decode("utf-8", "ignore")
-        raise FFMPEGWrapperException(out=stdout, er=stderr, return_code=cpe.returncode, command=command)
-    except OSError as exc:
-        raise FFMPEGWrapperException(er=str(exc), return_code=getattr(exc, "errno", None), command=command) from exc
+    results = durations([path for path in paths if not isinstance(path, Silence)])
+    if any(result.error is not None for result in results):
+        return None
 
-    return status, out_str, err_str
+    pauses = sum(path.duration for path in paths if isinstance(path, Silence))
+    return sum(result.duration for result in results) + pauses
+
+
+def _concatenate_group(
+    group: BuildList,
+    output_path: str,
+    channels: int,
+    sample_rate: int,
+    execution_kwargs: Dict[str, Any],
+) -> None:
+    command_kwargs = dict(
+        build_list=group,
+        output_path=output_path,
+        channels=channels,
+        sample_rate=sample_rate,
+        codec=INTERMEDIATE_CODEC,
+    )
+
+    status, out, er = execute_command(concat_ffmpeg_command, **command_kwargs, **execution_kwargs)
+    if status:
+        command = concat_ffmpeg_command(**command_kwargs)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+
+@contextmanager
+def tree_concatenated(
+    build_list: BuildList,
+    channels: int = 2,
+    sample_rate: int = 48000,
+    fan_in: int = CONCAT_FAN_IN,
+    max_workers: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Iterator[BuildList]:
+    """
+    Reduce long build list to at most fan_in parts. Parts are split to groups of fan_in, groups are concatenated
+    concurrently to lossless intermediate audios and it is repeated while there are more than fan_in of them.
+    Intermediate audios are removed on exit.
+
+    :param build_list: list book parts audio path
+    :param channels: the number of channels for the completed audio
+    :param sample_rate: sample rate
+    :param fan_in: maximum number of parts concatenated by one ffmpeg process
+    :param max_workers: maximum number of concurrently running ffmpeg processes, by default the number of CPUs
+    :param tmp_dir: directory for intermediate audios, by default system temporary directory
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: reduced build list
+    """
+
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+
+    if len(build_list) <= fan_in:
+        yield build_list
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        execution_kwargs = execution_options(threads, timeout, cancel_token, directory)
+        level = 0
+        while len(build_list) > fan_in:
+            groups = [build_list[i : i + fan_in] for i in range(0, len(build_list), fan_in)]
+            outputs = [
+                os.path.join(directory, f"{level}_{index}.{INTERMEDIATE_EXTENSION}") for index in range(len(groups))
+            ]
+
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups)))) as executor:
+                futures = [
+                    executor.submit(_concatenate_group, group, output, channels, sample_rate, execution_kwargs)
+                    for group, output in zip(groups, outputs)
+                ]
+                for future in futures:
+                    future.result()
+
+            # intermediate audios of previous level aren't needed anymore
+            if level:
+                for path in build_list:
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            build_list = outputs
+            level += 1
+
+        yield build_list
 
 
 def concatenate(
-    build_list: List[str],
+    build_list: BuildList,
     output_path: str,
     channels: int = 2,
     background_path: Optional[str] = None,
@@ -427,8 +1812,19 @@ def concatenate(
     loudness_range_target: float = 18.0,
     is_normalize: bool = True,
     is_short: bool = False,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    two_pass_normalization: bool = False,
+    loudnorm_measured: Optional[Dict[str, float]] = None,
+    fan_in: int = CONCAT_FAN_IN,
+    max_workers: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
 ) -> Tuple[int, str, str]:
     """
+    Concatenate book parts to book. If build list is longer than fan_in then parts are concatenated
+    by groups to intermediate audios first (see tree_concatenated).
 
     :param sample_rate: sample rate
     :param build_list: list book parts audio path
@@ -443,28 +1839,49 @@ def concatenate(
     :param loudness_range_target: value of target loudness range
     :param is_normalize: flag for normalize or not audio
     :param is_short: if flag is True then we add 30 second to beginning and after normalize delete it
+    :param on_progress: callback which is called with progress of ffmpeg, percentage is calculated against
+                        summed duration of build_list, only the final pass is reported, groups of long build list
+                        and measurement of loudness don't report progress
+    :param two_pass_normalization: if flag is True and use_normalization is True then loudness is measured
+                                   by separate pass and audio is normalized in linear mode
+    :param loudnorm_measured: loudness of book measured beforehand, for example by
+                              ffmpeg_wrapper.loudness.measure_book_loudness, if it is set and use_normalization is True
+                              then audio is normalized in linear mode without measurement pass
+    :param fan_in: maximum number of parts concatenated by one ffmpeg process
+    :param max_workers: maximum number of concurrently running ffmpeg processes for groups of parts,
+                        by default the number of CPUs
+    :param tmp_dir: directory for intermediate audios and scripts of huge filter graphs,
+                    by default system temporary directory
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
     :return: tuple which contain return code, output and error message
     """
 
-    res: Tuple[int, str, str] = execute_command(
-        concat_ffmpeg_command,
-        build_list=build_list,
-        output_path=output_path,
-        channels=channels,
-        background_path=background_path,
-        background_volume=background_volume,
-        volume=volume,
-        sample_rate=sample_rate,
-        use_normalization=use_normalization,
-        peak=peak,
-        rms_level=rms_level,
-        loudness_range_target=loudness_range_target,
-        is_normalize=is_normalize,
-        is_short=is_short,
-    )
-    status, file_path, er = res
-    if status:
-        command = concat_ffmpeg_command(
+    execution_kwargs = execution_options(threads, timeout, cancel_token, tmp_dir)
+    if on_progress is not None:
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, total_duration(build_list)).feed_line
+
+    with tree_concatenated(
+        build_list, channels, sample_rate, fan_in, max_workers, tmp_dir, threads, timeout, cancel_token
+    ) as build_list:
+        if not use_normalization:
+            loudnorm_measured = None
+        elif two_pass_normalization and loudnorm_measured is None:
+            loudnorm_measured = measure_concat_loudness(
+                build_list,
+                volume=volume,
+                peak=peak,
+                rms_level=rms_level,
+                loudness_range_target=loudness_range_target,
+                threads=threads,
+                timeout=timeout,
+                cancel_token=cancel_token,
+            )
+
+        command_kwargs = dict(
             build_list=build_list,
             output_path=output_path,
             channels=channels,
@@ -478,16 +1895,27 @@ def concatenate(
             loudness_range_target=loudness_range_target,
             is_normalize=is_normalize,
             is_short=is_short,
+            progress=on_progress is not None,
+            loudnorm_measured=loudnorm_measured,
         )
-        raise FFMPEGWrapperException(file_path, er, return_code=status, command=command)
 
-    return status, file_path, er
+        res: Tuple[int, str, str] = execute_command(concat_ffmpeg_command, **command_kwargs, **execution_kwargs)
+        status, file_path, er = res
+        if status:
+            command = concat_ffmpeg_command(**command_kwargs)
+            raise FFMPEGWrapperException(file_path, er, return_code=status, command=command)
+
+        return status, file_path, er
 
 
 def convert(
     input_info: Tuple[str, str, str],
     output_info: Tuple[str, str, str],
     bit_rate: int,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
 ) -> Tuple[int, str, str]:
     """
     Convert audio to chosen format with selected bit rate.
@@ -495,33 +1923,109 @@ def convert(
     :param input_info: tuple with info about completed book (file_name, file_path, file_format,)
     :param output_info: tuple with info about completed book after convert (file_name, file_path, file_format,)
     :param bit_rate: selected bit rate value
+    :param on_progress: callback which is called with progress of ffmpeg
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
     :return: tuple which contain return code, output and error message
     """
 
+    execution_kwargs = execution_options(threads, timeout, cancel_token)
+    if on_progress is not None:
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, total_duration([input_info[1]])).feed_line
+
     res: Tuple[int, str, str] = execute_command(
         convert_ffmpeg_command,
         input_info=input_info,
         output_info=output_info,
         bit_rate=bit_rate,
+        progress=on_progress is not None,
+        **execution_kwargs,
+    )
+
+    status, out, er = res
+
+    if status:
+        command = convert_ffmpeg_command(
+            input_info=input_info,
+            output_info=output_info,
+            bit_rate=bit_rate,
+            progress=on_progress is not None,
+        )
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return status, out, er
+
+
+def convert_many(
+    input_info: Tuple[str, str, str],
+    outputs: Sequence[Tuple[Tuple[str, str, str], int]],
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    threads: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Convert audio to several formats with selected bit rates by one ffmpeg process.
+
+    :param input_info: tuple with info about completed book (file_name, file_path, file_format,)
+    :param outputs: pairs of tuple with info about completed book after convert (file_name, file_path, file_format,)
+                    and selected bit rate value
+    :param on_progress: callback which is called with progress of ffmpeg
+    :param threads: the number of threads of every ffmpeg process, by default ffmpeg chooses it
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    execution_kwargs = execution_options(threads, timeout, cancel_token)
+    if on_progress is not None:
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, total_duration([input_info[1]])).feed_line
+
+    res: Tuple[int, str, str] = execute_command(
+        convert_many_ffmpeg_command,
+        input_info=input_info,
+        outputs=outputs,
+        progress=on_progress is not None,
+        **execution_kwargs,
     )
 
     status, out, er = res
 
     if status:
-        command = convert_ffmpeg_command(input_info=input_info, output_info=output_info, bit_rate=bit_rate)
+        command = convert_many_ffmpeg_command(
+            input_info=input_info,
+            outputs=outputs,
+            progress=on_progress is not None,
+        )
         raise FFMPEGWrapperException(out, er, return_code=status, command=command)
 
     return status, out, er
 
 
-def duration(file_path: str) -> float:
+def duration(file_path: str, cache: Optional[MetadataCache] = None) -> float:
     """
-    Return duration for selected audio file in seconds.
+    Return duration for selected audio file in seconds. Duration of PCM WAV file is read from its header,
+    ffprobe is executed only for other files.
 
     :param file_path: path to audio file
+    :param cache: cache of metadata, if it has duration of unchanged file then ffprobe isn't executed
     :return: if command success complete then return audio duration else return None
     """
 
+    value = wav_duration(file_path)
+    if value is not None:
+        return value
+
+    if cache is not None:
+        cached = cache.get(file_path, DURATION_CACHE_KIND)
+        if cached is not None:
+            return cached
+
     res: Tuple[int, str, str] = execute_command(duration_ffmpeg_command, file_path=file_path)
 
     status, out, er = res
@@ -530,57 +2034,290 @@ def duration(file_path: str) -> float:
         command = duration_ffmpeg_command(file_path)
         raise FFMPEGWrapperException(out, er, return_code=status, command=command)
 
+    value = parse_duration(out)
+
+    if cache is not None:
+        cache.set(file_path, DURATION_CACHE_KIND, value)
+
+    return value
+
+
+def _duration_result(file_path: str) -> DurationResult:
     try:
-        return float(out)
-    except ValueError:
-        return 0.0
+        return DurationResult(file_path, duration(file_path), None)
+    except (FFMPEGWrapperException, FFMPEGWrapperParsingException) as e:
+        return DurationResult(file_path, None, e)
+
+
+def _chunk_duration_results(paths: List[str]) -> List[DurationResult]:
+    results = []
+
+    while paths:
+        # every input is dumped by several lines, all of them are needed, not only the tail
+        _, _, er = execute_command(probe_durations_ffmpeg_command, paths=paths, stderr_tail_lines=None)
+        parsed = parse_probe_durations(er)
+
+        # ffmpeg opens inputs one by one and stops on the first one which can't be opened
+        opened = max(parsed, default=-1) + 1
+        for index, path in enumerate(paths[:opened]):
+            value = parsed.get(index)
+            if value is None:
+                results.append(_duration_result(path))
+            else:
+                results.append(DurationResult(path, value, None))
+
+        if opened < len(paths):
+            # probe failed file separately to get its own diagnostics
+            results.append(_duration_result(paths[opened]))
+            opened += 1
+
+        paths = paths[opened:]
+
+    return results
+
+
+def _probe_durations(paths: List[str], max_workers: int, chunk_size: int) -> List[DurationResult]:
+    if chunk_size > 1:
+        chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+        max_workers = max(1, min(max_workers, len(chunks)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return [result for chunk in executor.map(_chunk_duration_results, chunks) for result in chunk]
+
+    max_workers = max(1, min(max_workers, len(paths)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_duration_result, paths))
+
+
+def durations(
+    paths: Iterable[str],
+    max_workers: Optional[int] = None,
+    chunk_size: int = 1,
+    cache: Optional[MetadataCache] = None,
+) -> List[DurationResult]:
+    """
+    Return durations for many audio files. Files are probed concurrently by bounded pool of threads,
+    each of them drives its own ffprobe process.
+
+    If chunk_size is greater than 1 then every process probes chunk of files at once (see
+    probe_durations_ffmpeg_command), so process start-up cost is shared by chunk. In this mode durations have
+    precision of ffmpeg info dump which is 0.01 second. Files which can't be probed in chunk are probed one by one.
+
+    :param paths: paths to audio files
+    :param max_workers: maximum number of concurrently running processes, by default the number of CPUs
+    :param chunk_size: the number of files probed by one process
+    :param cache: cache of metadata, only files which durations aren't cached are probed,
+                  durations of PCM WAV files are always read from their headers
+    :return: list of results in the same order as paths, failed files have error instead of duration
+    """
+
+    paths = list(paths)
+    if not paths:
+        return []
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    cached: Dict[str, float] = {}
+    for path in paths:
+        value = wav_duration(path)
+        if value is None and cache is not None:
+            value = cache.get(path, DURATION_CACHE_KIND)
+        if value is not None:
+            cached[path] = value
+
+    missing = [path for path in paths if path not in cached]
+    probed = iter(_probe_durations(missing, max_workers, chunk_size) if missing else [])
+
+    results = []
+    for path in paths:
+        if path in cached:
+            results.append(DurationResult(path, cached[path], None))
+            continue
+
+        result = next(probed)
+        if cache is not None and result.error is None:
+            cache.set(path, DURATION_CACHE_KIND, result.duration)
+        results.append(result)
+
+    return results
+
+
+def stream_info(file_path: str) -> Optional[StreamInfo]:
+    """
+    Return codec, sample rate and the number of channels of audio file. Info about PCM WAV file is read from
+    its header, ffprobe is executed only for other files.
+
+    :param file_path: path to audio file
+    :return: info about the first audio stream or None if it can't be probed
+    """
+
+    wav_info = read_wav_info(file_path)
+    if wav_info is not None:
+        return StreamInfo(wav_info.codec_name, wav_info.sample_rate, wav_info.channels)
+
+    status, out, _ = execute_command(stream_info_ffmpeg_command, file_path=file_path)
+    if status:
+        return None
+
+    return parse_stream_info(out)
+
+
+def _is_stream_copy_possible(build_list: List[str], output_path: str, channels: int, max_workers: int) -> bool:
+    # stream can be copied only to container of the same type
+    extension = os.path.splitext(output_path)[1].lower()
+    if not extension or any(os.path.splitext(path)[1].lower() != extension for path in build_list):
+        return False
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(build_list)))) as executor:
+        infos = set(executor.map(stream_info, build_list))
+
+    if len(infos) != 1:
+        return False
+
+    info = infos.pop()
+    return info is not None and info.channels == channels
+
+
+def simple_concatenate(
+    build_list: List[str],
+    output_path: str,
+    channels: int = 2,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
+    """
+    Simple concatenate audios. If all audios have the same container, codec, sample rate and the number of channels
+    then they are joined by concat demuxer with stream copy, else they are decoded and encoded again.
+
+    :param build_list: list book parts audio path
+    :param output_path: path to completed audio
+    :param channels: the number of channels for the completed audio
+    :param max_workers: maximum number of concurrently running ffprobe processes, by default the number of CPUs
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: tuple which contain return code, output and error message
+    """
+
+    max_workers = max_workers or os.cpu_count() or 1
+    execution_kwargs = execution_options(timeout=timeout, cancel_token=cancel_token)
+
+    if build_list and _is_stream_copy_possible(build_list, output_path, channels, max_workers):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            list_path = os.path.join(tmp_dir, "concat.txt")
+            write_concat_list(build_list, list_path)
+
+            command_kwargs = dict(list_path=list_path, output_path=output_path)
+            status, out, er = execute_command(demux_concat_ffmpeg_command, **command_kwargs, **execution_kwargs)
+            if status:
+                command = demux_concat_ffmpeg_command(**command_kwargs)
+                raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+            return status, out, er
+
+    status, out, er = execute_command(
+        simple_concat_ffmpeg_command,
+        build_list=build_list,
+        output_path=output_path,
+        channels=channels,
+        **execution_kwargs,
+    )
+    if status:
+        command = simple_concat_ffmpeg_command(build_list=build_list, output_path=output_path, channels=channels)
+        raise FFMPEGWrapperException(out, er, return_code=status, command=command)
+
+    return status, out, er
 
 
-def silent(duration_value: float, output_path: str) -> Tuple[int, str, str]:
+def silent(
+    duration_value: float,
+    output_path: str,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Tuple[int, str, str]:
     """
-    Create silent audio with selected duration.
+    Create silent audio with selected duration. WAV file is written without ffmpeg
+    (see ffmpeg_wrapper.wav.write_silence) with the same parameters as silent_ffmpeg_command,
+    other formats are encoded by ffmpeg.
 
     :param duration_value: duration for silent audio
     :param output_path: path to result
+    :param on_progress: callback which is called with progress of ffmpeg
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
     :return: tuple which contain return code, output and error message
     """
 
+    if output_path.lower().endswith(".wav"):
+        write_silence(output_path, duration_value)
+        if on_progress is not None:
+            on_progress(Progress(duration_value, duration_value, 100.0, None, 0.0, True))
+        return 0, "", ""
+
+    execution_kwargs = execution_options(timeout=timeout, cancel_token=cancel_token)
+    if on_progress is not None:
+        execution_kwargs["on_stdout_line"] = ProgressParser(on_progress, duration_value).feed_line
+
     res: Tuple[int, str, str] = execute_command(
         silent_ffmpeg_command,
         duration_value=duration_value,
         output_path=output_path,
+        progress=on_progress is not None,
+        **execution_kwargs,
     )
 
     status, out, er = res
 
     if status:
-        command = silent_ffmpeg_command(duration_value, output_path)
+        command = silent_ffmpeg_command(duration_value, output_path, progress=on_progress is not None)
         raise FFMPEGWrapperException(out, er, return_code=status, command=command)
 
     return status, out, er
 
 
-def volume_detect(path_to_file: str) -> Dict[str, float]:
-    status, out, er = execute_command(volume_detect_command, path_to_file=path_to_file)
+def volume_detect(
+    path_to_file: str,
+    cache: Optional[MetadataCache] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Dict[str, float]:
+    """
+    Return mean and max volume of audio file.
+
+    :param path_to_file: path to audio file
+    :param cache: cache of metadata, if it has volume of unchanged file then ffmpeg isn't executed
+    :param timeout: seconds after which every ffmpeg process is terminated
+                    and FFMPEGWrapperTimeoutException is raised
+    :param cancel_token: token which terminates running ffmpeg process when it is cancelled,
+                         then FFMPEGWrapperCancelledException is raised
+    :return: dict with root_mean_square and max_volume of audio in dB
+    """
+
+    if cache is not None:
+        cached = cache.get(path_to_file, VOLUME_DETECT_CACHE_KIND)
+        if cached is not None:
+            return cached
+
+    rows: List[str] = []
+    status, out, er = execute_command(
+        volume_detect_command,
+        path_to_file=path_to_file,
+        on_stderr_line=volume_detect_line_collector(rows),
+        **execution_options(timeout=timeout, cancel_token=cancel_token),
+    )
     if status:
         command = volume_detect_command(path_to_file=path_to_file)
         raise FFMPEGWrapperException(out, er, return_code=status, command=command)
 
-    rows = (r for r in er.split("\n") if "Parsed_volumedetect" in r)
-    result = {}
-    try:
-        for r in rows:
-            if "mean_volume:" in r:
-                # line looks like '[Parsed_volumedetect_0 @ 0x153e3a880] mean_volume: -16.7 dB'
-                result["root_mean_square"] = float(r.split(" ")[-2])
-            if "max_volume:" in r:
-                # line looks like '[Parsed_volumedetect_0 @ 0x153e3a880] max_volume: -0.0 dB'
-                result["max_volume"] = float(r.split(" ")[-2])
-    except (
-        KeyError,
-        IndexError,
-        AttributeError,
-    ) as e:
-        raise FFMPEGWrapperParsingException("Error occurred while parsing FFMPEG output") from e
+    result = parse_volume_detect("\n".join(rows))
+
+    if cache is not None:
+        cache.set(path_to_file, VOLUME_DETECT_CACHE_KIND, result)
 
     return result
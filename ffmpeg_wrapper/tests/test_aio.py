@@ -0,0 +1,277 @@
+import asyncio
+import os
+import sys
+import threading
+
+from ffmpeg_wrapper import aio
+from ffmpeg_wrapper.simple import (
+    CancellationToken,
+    FFMPEGWrapperCancelledException,
+    FFMPEGWrapperException,
+    FFMPEGWrapperTimeoutException,
+)
+
+
+def python_command(code: str):
+    return [sys.executable, "-c", code]
+
+
+def writing_command(output_path: str):
+    return python_command(f"import time; open({output_path!r}, 'w').write('partial'); time.sleep(30)")
+
+
+def test_execute_command_returns_status_output_and_error():
+    code = "import sys; sys.stdout.write('12.5'); sys.stderr.write('warning'); sys.exit(0)"
+
+    status, out, er = asyncio.run(aio.execute_command(python_command, code))
+
+    assert status == 0
+    assert out == "12.5"
+    assert er == "warning"
+
+
+def test_execute_command_wraps_process_startup_failures():
+    async def run():
+        await aio.execute_command(lambda: ["/nonexistent/ffmpeg", "-version"])
+
+    try:
+        asyncio.run(run())
+    except FFMPEGWrapperException as exc:
+        assert exc.command == ["/nonexistent/ffmpeg", "-version"]
+        assert "/nonexistent/ffmpeg -version" in str(exc)
+    else:
+        raise AssertionError("FFMPEGWrapperException was not raised")
+
+
+def test_execute_command_timeout():
+    code = "import sys, time; sys.stderr.write('started'); sys.stderr.flush(); time.sleep(30)"
+
+    try:
+        asyncio.run(aio.execute_command(python_command, code, timeout=0.5))
+    except FFMPEGWrapperTimeoutException as exc:
+        assert exc.timeout == 0.5
+        assert exc.stderr == "started"
+        assert exc.return_code is not None
+    else:
+        raise AssertionError("FFMPEGWrapperTimeoutException was not raised")
+
+
+def test_execute_command_kills_process_on_cancel(monkeypatch):
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def mock_create_subprocess_exec(*args, **kwargs):
+        process_handle = await create_subprocess_exec(*args, **kwargs)
+        processes.append(process_handle)
+        return process_handle
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", mock_create_subprocess_exec)
+
+    async def run():
+        task = asyncio.ensure_future(aio.execute_command(python_command, "import time; time.sleep(30)"))
+        while not processes:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("task was not cancelled")
+
+    asyncio.run(run())
+
+    assert processes[0].returncode is not None
+
+
+def test_execute_command_removes_partial_output_on_cancel(tmp_path):
+    output_path = str(tmp_path / "book.wav")
+
+    async def run():
+        task = asyncio.ensure_future(aio.execute_command(writing_command, output_path=output_path))
+        while not os.path.exists(output_path):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("task was not cancelled")
+
+    asyncio.run(run())
+
+    assert not os.path.exists(output_path)
+
+
+def test_execute_command_cancel_token(tmp_path):
+    output_path = str(tmp_path / "book.wav")
+    token = CancellationToken()
+
+    async def run():
+        task = asyncio.ensure_future(aio.execute_command(writing_command, output_path=output_path, cancel_token=token))
+        while not os.path.exists(output_path):
+            await asyncio.sleep(0.01)
+        token.cancel()
+        await task
+
+    try:
+        asyncio.run(run())
+    except FFMPEGWrapperCancelledException as exc:
+        assert exc.return_code is not None
+    else:
+        raise AssertionError("FFMPEGWrapperCancelledException was not raised")
+
+    assert not os.path.exists(output_path)
+
+    try:
+        asyncio.run(aio.execute_command(writing_command, output_path=output_path, cancel_token=token))
+    except FFMPEGWrapperCancelledException:
+        pass
+    else:
+        raise AssertionError("FFMPEGWrapperCancelledException was not raised")
+
+    assert not os.path.exists(output_path)
+
+
+def test_execute_command_passes_huge_graph_by_script(tmp_path):
+    graph = "anull" + ",anull" * 20000
+    code = "import sys; sys.stdout.write(sys.argv[1] + ' ' + open(sys.argv[2]).read()[:11])"
+    command = python_command(code) + ["-filter_complex", graph]
+
+    status, out, er = asyncio.run(aio.execute_command(lambda: command, script_dir=str(tmp_path)))
+
+    assert status == 0
+    assert out == "-filter_complex_script anull,anull"
+    assert os.listdir(tmp_path) == []
+
+
+def test_duration_failure_raises_exception_with_diagnostics(monkeypatch):
+    async def mock_execute_command(*args, **kwargs):
+        return 1, "", "No such file or directory"
+
+    monkeypatch.setattr(aio, "execute_command", mock_execute_command)
+
+    try:
+        asyncio.run(aio.duration("/tmp/missing.wav"))
+    except FFMPEGWrapperException as exc:
+        assert exc.return_code == 1
+        assert exc.stderr == "No such file or directory"
+        assert "/tmp/missing.wav" in str(exc)
+    else:
+        raise AssertionError("FFMPEGWrapperException was not raised")
+
+
+def test_volume_detect_parses_error_output(monkeypatch):
+    async def mock_execute_command(*args, **kwargs):
+        kwargs["on_stderr_line"]("size=N/A time=00:00:01.00 bitrate=N/A speed= 512x")
+        kwargs["on_stderr_line"]("[Parsed_volumedetect_0 @ 0x153e3a880] mean_volume: -16.7 dB")
+        kwargs["on_stderr_line"]("[Parsed_volumedetect_0 @ 0x153e3a880] max_volume: -0.5 dB")
+        return 0, "", ""
+
+    monkeypatch.setattr(aio, "execute_command", mock_execute_command)
+
+    assert asyncio.run(aio.volume_detect("a.wav")) == {"root_mean_square": -16.7, "max_volume": -0.5}
+
+
+def test_concatenate_long_build_list_by_groups(monkeypatch):
+    commands = []
+    running = []
+
+    token = CancellationToken()
+
+    async def mock_execute_command(command_func, **kwargs):
+        running.append(1)
+        assert len(running) <= 2
+        await asyncio.sleep(0)
+        script_dir = kwargs.pop("script_dir", None)
+        assert (kwargs.pop("threads"), kwargs.pop("timeout"), kwargs.pop("cancel_token")) == (2, 60.0, token)
+        command = command_func(**kwargs)
+        # scripts of group graphs are written beside intermediate audios
+        assert script_dir == (os.path.dirname(command[-1]) if command[-1].endswith(".mka") else None)
+        commands.append(command)
+        running.pop()
+        return 0, "", ""
+
+    monkeypatch.setattr(aio, "execute_command", mock_execute_command)
+
+    build_list = [f"{i}.wav" for i in range(10)]
+    asyncio.run(
+        aio.concatenate(build_list, "book.wav", fan_in=3, max_workers=2, threads=2, timeout=60.0, cancel_token=token)
+    )
+
+    # 10 parts -> 4 groups -> 2 groups -> final command
+    assert len(commands) == 7
+    final = commands[-1]
+    assert final[-1] == "book.wav"
+    assert final.count("-i") == 2
+    for command in commands[:-1]:
+        assert command[command.index("-c:a") + 1] == "pcm_f32le"
+        assert command[-1].endswith(".mka")
+    first_level_inputs = [path for command in commands[:4] for path in command if path.endswith(".wav")]
+    assert sorted(first_level_inputs) == sorted(build_list)
+
+
+def test_silent_writes_wav_outside_event_loop_thread(tmp_path, monkeypatch):
+    threads = []
+    write_silence = aio.write_silence
+
+    def mock_write_silence(*args):
+        threads.append(threading.current_thread())
+        return write_silence(*args)
+
+    monkeypatch.setattr(aio, "write_silence", mock_write_silence)
+    output_path = str(tmp_path / "pause.wav")
+
+    assert asyncio.run(aio.silent(0.5, output_path)) == (0, "", "")
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert os.path.getsize(output_path) > 44
+
+
+def test_convert_stream_yields_fixed_size_chunks(monkeypatch):
+    code = "import sys; sys.stdout.buffer.write(b'x' * 2500)"
+    monkeypatch.setattr(aio, "convert_stream_ffmpeg_command", lambda *args: python_command(code))
+
+    async def run():
+        return [chunk async for chunk in aio.convert_stream(("book", "book.wav", "wav"), "mp3", 64, chunk_size=1000)]
+
+    assert [len(chunk) for chunk in asyncio.run(run())] == [1000, 1000, 500]
+
+
+def test_convert_passes_timeout_and_cancel_token(monkeypatch):
+    options = []
+    token = CancellationToken()
+
+    async def mock_execute_command(command_func, **kwargs):
+        options.append((kwargs["timeout"], kwargs["cancel_token"]))
+        return 0, "", ""
+
+    monkeypatch.setattr(aio, "execute_command", mock_execute_command)
+
+    asyncio.run(
+        aio.convert(("book", "book.wav", "wav"), ("book", "book.mp3", "mp3"), 64, timeout=60.0, cancel_token=token)
+    )
+    asyncio.run(aio.volume_detect("book.wav", timeout=60.0, cancel_token=token))
+
+    assert options == [(60.0, token), (60.0, token)]
+
+
+def test_convert_stream_terminates_stuck_process_after_timeout(monkeypatch):
+    code = "import sys, time; sys.stdout.buffer.write(b'x' * 1500); sys.stdout.flush(); time.sleep(30)"
+    monkeypatch.setattr(aio, "convert_stream_ffmpeg_command", lambda *args: python_command(code))
+    chunks = []
+
+    async def run():
+        async for chunk in aio.convert_stream(("book", "book.wav", "wav"), "mp3", 64, chunk_size=1000, timeout=0.5):
+            chunks.append(chunk)
+
+    try:
+        asyncio.run(run())
+    except FFMPEGWrapperTimeoutException as exc:
+        assert exc.timeout == 0.5
+        assert exc.return_code is not None
+    else:
+        raise AssertionError("FFMPEGWrapperTimeoutException was not raised")
+
+    assert chunks == [b"x" * 1000]
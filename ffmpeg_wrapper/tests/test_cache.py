@@ -0,0 +1,123 @@
+import os
+
+from ffmpeg_wrapper.cache import MetadataCache
+from ffmpeg_wrapper.simple import duration, durations, volume_detect
+
+
+def write_file(path, content: bytes = b"RIFF") -> str:
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+def test_memory_tier_is_bounded_lru(tmp_path):
+    cache = MetadataCache(max_size=2)
+    paths = [write_file(tmp_path / f"{i}.wav") for i in range(3)]
+
+    cache.set(paths[0], "duration", 1.0)
+    cache.set(paths[1], "duration", 2.0)
+    assert cache.get(paths[0], "duration") == 1.0
+    cache.set(paths[2], "duration", 3.0)
+
+    assert cache.get(paths[0], "duration") == 1.0
+    assert cache.get(paths[1], "duration") is None
+    assert cache.get(paths[2], "duration") == 3.0
+
+
+def test_changed_file_misses_cache(tmp_path):
+    cache = MetadataCache()
+    path = write_file(tmp_path / "a.wav")
+    cache.set(path, "duration", 1.0)
+
+    write_file(path, b"RIFF but longer")
+
+    assert cache.get(path, "duration") is None
+
+
+def test_disk_tier_survives_restart_and_invalidation(tmp_path):
+    database = str(tmp_path / "metadata.sqlite")
+    path = write_file(tmp_path / "a.wav")
+    other_path = write_file(tmp_path / "b.wav")
+
+    cache = MetadataCache(database)
+    cache.set(path, "volume_detect", {"root_mean_square": -16.7, "max_volume": -0.5})
+    cache.set(other_path, "duration", 2.0)
+    cache.close()
+
+    cache = MetadataCache(database)
+    assert cache.get(path, "volume_detect") == {"root_mean_square": -16.7, "max_volume": -0.5}
+
+    cache.invalidate(path)
+    assert cache.get(path, "volume_detect") is None
+    assert cache.get(other_path, "duration") == 2.0
+
+    cache.invalidate()
+    assert cache.get(other_path, "duration") is None
+
+
+def test_disk_tier_keeps_only_current_version_of_file(tmp_path):
+    database = str(tmp_path / "metadata.sqlite")
+    path = write_file(tmp_path / "a.mp3")
+    cache = MetadataCache(database)
+
+    cache.set(path, "duration", 1.0)
+    write_file(path, b"RIFF but longer")
+    cache.set(path, "duration", 2.0)
+    cache.set(path, "volume_detect", {"root_mean_square": -16.7, "max_volume": -0.5})
+
+    rows = cache._connection.execute("SELECT kind, value FROM metadata ORDER BY kind").fetchall()
+    assert rows == [("duration", "2.0"), ("volume_detect", '{"root_mean_square": -16.7, "max_volume": -0.5}')]
+    assert len(cache._memory) == 2
+
+
+def test_changing_returned_value_does_not_change_cache(tmp_path):
+    database = str(tmp_path / "metadata.sqlite")
+    path = write_file(tmp_path / "a.mp3")
+    value = {"root_mean_square": -16.7, "max_volume": -0.5}
+    cache = MetadataCache(database)
+
+    cache.set(path, "volume_detect", value)
+    value["max_volume"] = 0.0
+    cache.get(path, "volume_detect")["root_mean_square"] = 0.0
+    assert cache.get(path, "volume_detect") == {"root_mean_square": -16.7, "max_volume": -0.5}
+
+    cache.close()
+    cache = MetadataCache(database)
+    cache.get(path, "volume_detect")["root_mean_square"] = 0.0
+    assert cache.get(path, "volume_detect") == {"root_mean_square": -16.7, "max_volume": -0.5}
+
+
+def test_content_hash_key_ignores_path_and_mtime(tmp_path):
+    cache = MetadataCache(use_content_hash=True)
+    path = write_file(tmp_path / "a.wav", b"same content")
+    copy_path = write_file(tmp_path / "b.wav", b"same content")
+    os.utime(copy_path, (0, 0))
+
+    cache.set(path, "duration", 5.0)
+
+    assert cache.get(copy_path, "duration") == 5.0
+
+
+def test_duration_and_volume_detect_skip_execution_for_cached_files(tmp_path, monkeypatch):
+    calls = []
+
+    def mock_execute_command(command_func, **kwargs):
+        calls.append(command_func.__name__)
+        if command_func.__name__ == "duration_ffmpeg_command":
+            return 0, "3.5\n", ""
+        kwargs["on_stderr_line"]("[Parsed_volumedetect_0 @ 0x1] mean_volume: -16.7 dB")
+        kwargs["on_stderr_line"]("[Parsed_volumedetect_0 @ 0x1] max_volume: -0.5 dB")
+        return 0, "", ""
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    cache = MetadataCache()
+    path = write_file(tmp_path / "a.wav")
+
+    assert duration(path, cache=cache) == 3.5
+    assert duration(path, cache=cache) == 3.5
+    assert volume_detect(path, cache=cache) == {"root_mean_square": -16.7, "max_volume": -0.5}
+    assert volume_detect(path, cache=cache) == {"root_mean_square": -16.7, "max_volume": -0.5}
+    assert [r.duration for r in durations([path, path], cache=cache)] == [3.5, 3.5]
+
+    assert calls == ["duration_ffmpeg_command", "volume_detect_command"]
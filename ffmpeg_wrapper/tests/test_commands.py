@@ -1,14 +1,42 @@
+import os
 import subprocess
+import sys
+import threading
+import time
 
-
+from ffmpeg_wrapper import simple
 from ffmpeg_wrapper.simple import (
+    CancellationToken,
+    DurationResult,
+    FFMPEGWrapperCancelledException,
     FFMPEGWrapperException,
+    FFMPEGWrapperTimeoutException,
+    LineSplitter,
+    Silence,
+    StreamInfo,
     concat_ffmpeg_command,
+    concat_loudnorm_measure_ffmpeg_command,
+    concatenate,
     convert,
     convert_ffmpeg_command,
+    convert_many_ffmpeg_command,
+    demux_concat_ffmpeg_command,
     duration_ffmpeg_command,
+    durations,
+    execute_command,
+    loudnorm_is_linear,
+    loudnorm_measure_ffmpeg_command,
+    normalize,
     normalize_ffmpeg_command,
+    parse_loudnorm,
+    parse_probe_durations,
+    parse_stream_info,
+    probe_durations_ffmpeg_command,
     silent_ffmpeg_command,
+    simple_concat_ffmpeg_command,
+    simple_concatenate,
+    thread_options,
+    total_duration,
 )
 
 
@@ -191,6 +219,24 @@ def test_convert_command():
     assert " ".join(command) == test_command
 
 
+def test_convert_many_command():
+    input_info = ("complete_book.wav", "/tmp/complete_book.wav", "wav")
+    outputs = [
+        (("book_64.mp3", "/tmp/book_64.mp3", "mp3"), 64),
+        (("book_128.mp3", "/tmp/book_128.mp3", "mp3"), 128),
+        (("book.m4b", "/tmp/book.m4b", "m4b"), 96),
+    ]
+
+    test_command = (
+        "ffmpeg -hide_banner -loglevel error -i /tmp/complete_book.wav -y "
+        "-ab 64k /tmp/book_64.mp3 -ab 128k /tmp/book_128.mp3 -ab 96k /tmp/book.m4b"
+    )
+
+    command = convert_many_ffmpeg_command(input_info=input_info, outputs=outputs)
+
+    assert " ".join(command) == test_command
+
+
 def test_duration_command():
     file_path: str = "/tmp/audio.wav"
 
@@ -240,6 +286,46 @@ def test_normalize_command():
     assert " ".join(command) == expected_command
 
 
+def test_thread_options_of_simple_filter():
+    command = normalize_ffmpeg_command("a.wav", "b.wav", -3.0, -18.0, 18, 44100)
+
+    assert " ".join(thread_options(command, 2, ["b.wav"])) == (
+        "ffmpeg -filter_threads 2 -hide_banner -loglevel error -i a.wav -af loudnorm=I=-18.0:TP=-3.0:LRA=18 "
+        "-ar 44100 -threads 2 b.wav"
+    )
+
+
+def test_normalize_passes_threads_to_every_command(monkeypatch):
+    executed = []
+
+    def mock_execute_command(command_func, **kwargs):
+        executed.append((command_func, kwargs.pop("threads", None)))
+        return 0, "", LOUDNORM_OUTPUT
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    normalize("a.wav", "b.wav", threads=2)
+
+    assert executed == [(loudnorm_measure_ffmpeg_command, 2), (normalize_ffmpeg_command, 2)]
+
+
+def test_concatenate_passes_timeout_and_cancel_token_to_every_command(monkeypatch):
+    token = CancellationToken()
+    executed = []
+
+    def mock_execute_command(command_func, **kwargs):
+        executed.append((kwargs.pop("timeout", None), kwargs.pop("cancel_token", None)))
+        return 0, "", ""
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    build_list = [f"{i}.wav" for i in range(10)]
+    concatenate(build_list, "book.wav", fan_in=3, max_workers=2, timeout=60.0, cancel_token=token)
+
+    assert len(executed) == 7
+    assert set(executed) == {(60.0, token)}
+
+
 def test_exception_stores_diagnostics():
     command = ["ffmpeg", "-i", "broken.wav"]
 
@@ -291,8 +377,6 @@ def test_convert_failure_raises_exception_with_diagnostics(monkeypatch):
 
 
 def test_execute_command_wraps_process_startup_failures(monkeypatch):
-    from ffmpeg_wrapper.simple import execute_command
-
     def mock_popen(*args, **kwargs):
         raise FileNotFoundError(2, "No such file or directory", "ffmpeg")
 
@@ -307,3 +391,427 @@ def test_execute_command_wraps_process_startup_failures(monkeypatch):
         assert "ffmpeg -version" in str(exc)
     else:
         raise AssertionError("FFMPEGWrapperException was not raised")
+
+
+def test_durations_keeps_order_and_reports_failures(monkeypatch):
+    def mock_execute_command(command_func, file_path):
+        if file_path == "broken.wav":
+            return 1, "", "Invalid data found when processing input"
+        return 0, f"{len(file_path)}.5\n", ""
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    result = durations(["a.wav", "broken.wav", "long_name.wav"], max_workers=2)
+
+    assert [r.path for r in result] == ["a.wav", "broken.wav", "long_name.wav"]
+    assert result[0].duration == 5.5
+    assert result[0].error is None
+    assert result[1].duration is None
+    assert isinstance(result[1].error, FFMPEGWrapperException)
+    assert result[1].error.return_code == 1
+    assert result[2].duration == 13.5
+
+
+def test_probe_durations_command():
+    command = probe_durations_ffmpeg_command(BUILD_LIST)
+
+    assert " ".join(command) == "ffmpeg -hide_banner -nostdin -i 1.wav -i 2.wav -i 3.wav -i 4.wav"
+
+
+PROBE_OUTPUT = """Guessed Channel Layout for Input Stream #0.0 : mono
+Input #0, wav, from '1.wav':
+  Duration: 00:00:01.25, bitrate: 768 kb/s
+  Stream #0:0: Audio: pcm_s16le ([1][0][0][0] / 0x0001), 48000 Hz, mono, s16, 768 kb/s
+Input #1, mp3, from '2.wav':
+  Duration: N/A, start: 0.000000, bitrate: N/A
+  Stream #1:0: Audio: mp3, 44100 Hz, stereo, fltp, 128 kb/s
+Input #2, wav, from '3.wav':
+  Metadata:
+    encoder         : Lavf58.76.100
+  Duration: 01:02:03.50, bitrate: 1536 kb/s
+  Stream #2:0: Audio: pcm_s16le ([1][0][0][0] / 0x0001), 48000 Hz, stereo, s16, 1536 kb/s
+4.wav: No such file or directory
+"""
+
+
+def test_parse_probe_durations():
+    assert parse_probe_durations(PROBE_OUTPUT) == {0: 1.25, 1: None, 2: 3723.5}
+
+
+def test_chunked_durations_falls_back_to_single_probe(monkeypatch):
+    probed = []
+
+    def mock_execute_command(command_func, **kwargs):
+        if command_func is probe_durations_ffmpeg_command:
+            probed.append(kwargs["paths"])
+            if kwargs["paths"] == BUILD_LIST:
+                return 1, "", PROBE_OUTPUT
+            return 1, "", "Input #0, wav, from '5.wav':\n  Duration: 00:00:02.00, bitrate: 768 kb/s\n"
+        if kwargs["file_path"] == "2.wav":
+            return 0, "7.000000\n", ""
+        return 1, "", "Invalid data found when processing input"
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    result = durations(BUILD_LIST + ["5.wav"], max_workers=1, chunk_size=4)
+
+    assert probed == [BUILD_LIST, ["5.wav"]]
+    assert [r.path for r in result] == BUILD_LIST + ["5.wav"]
+    assert [r.duration for r in result] == [1.25, 7.0, 3723.5, None, 2.0]
+    assert isinstance(result[3].error, FFMPEGWrapperException)
+
+
+def test_chunked_durations_keeps_dump_of_every_input(monkeypatch):
+    code = (
+        "import sys\n"
+        "for index, path in enumerate(sys.argv[1:]):\n"
+        "    sys.stderr.write(f\"Input #{index}, mp3, from '{path}':\\n\")\n"
+        "    sys.stderr.write('  Metadata:\\n' + '    title : chapter\\n' * 5)\n"
+        "    sys.stderr.write(f'  Duration: 00:00:{index % 60:02d}.00, bitrate: 128 kb/s\\n')\n"
+        "    sys.stderr.write('  Stream #0:0: Audio: mp3, 44100 Hz, stereo, fltp, 128 kb/s\\n')\n"
+    )
+
+    def fake_probe(paths):
+        return [sys.executable, "-c", code, *paths]
+
+    def single_probe(path):
+        raise AssertionError(f"{path} is probed separately")
+
+    monkeypatch.setattr(simple, "probe_durations_ffmpeg_command", fake_probe)
+    monkeypatch.setattr(simple, "_duration_result", single_probe)
+    paths = [f"{index}.mp3" for index in range(300)]
+
+    result = simple.durations(paths, max_workers=1, chunk_size=300)
+
+    assert [r.duration for r in result] == [float(index % 60) for index in range(300)]
+
+
+def test_line_splitter_handles_carriage_returns_split_between_chunks():
+    lines = []
+    splitter = LineSplitter(lines.append)
+
+    for chunk in [b"size=1\rsize=2\r", b"size=3\r", b"\nfirst", b" line\r\nsecond\n", b"last"]:
+        splitter.feed(chunk)
+    splitter.close()
+
+    assert lines == ["size=1", "size=2", "size=3", "first line", "second", "last"]
+
+
+def test_execute_command_keeps_only_stderr_tail(monkeypatch):
+    code = "import sys\nfor i in range(5000): sys.stderr.write(f'frame={i}\\r')\nsys.stdout.write('12.5\\n')"
+    stderr_lines = []
+
+    status, out, er = execute_command(
+        lambda: [sys.executable, "-c", code],
+        on_stderr_line=stderr_lines.append,
+        stderr_tail_lines=3,
+    )
+
+    assert status == 0
+    assert out == "12.5\n"
+    assert er == "frame=4997\nframe=4998\nframe=4999"
+    assert len(stderr_lines) == 5000
+
+
+def test_execute_command_keeps_only_stdout_tail_consumed_by_callback():
+    code = "import sys\nfor i in range(5000): sys.stdout.write(f'out_time_us={i}\\nprogress=continue\\n')"
+    stdout_lines = []
+
+    status, out, er = execute_command(
+        lambda: [sys.executable, "-c", code],
+        on_stdout_line=stdout_lines.append,
+        stderr_tail_lines=2,
+    )
+
+    assert status == 0
+    assert out == "out_time_us=4999\nprogress=continue"
+    assert len(stdout_lines) == 10000
+
+
+LOUDNORM_OUTPUT = """[Parsed_loudnorm_0 @ 0x7f8b5c004a80]
+{
+    "input_i" : "-27.61",
+    "input_tp" : "-4.47",
+    "input_lra" : "18.06",
+    "input_thresh" : "-39.20",
+    "output_i" : "-18.02",
+    "output_tp" : "-3.00",
+    "output_lra" : "9.40",
+    "output_thresh" : "-28.56",
+    "normalization_type" : "dynamic",
+    "target_offset" : "0.02"
+}
+"""
+LOUDNORM_MEASURED = {
+    "input_i": -27.61,
+    "input_tp": -4.47,
+    "input_lra": 18.06,
+    "input_thresh": -39.2,
+    "target_offset": 0.02,
+}
+
+
+def test_parse_loudnorm():
+    measured = parse_loudnorm(LOUDNORM_OUTPUT)
+
+    assert {key: measured[key] for key in LOUDNORM_MEASURED} == LOUDNORM_MEASURED
+    assert measured["output_i"] == -18.02
+
+
+def test_concat_loudnorm_measure_command():
+    command = concat_loudnorm_measure_ffmpeg_command(
+        BUILD_LIST, volume=2.0, peak=-4, rms_level=-20, loudness_range_target=7
+    )
+
+    test_command = """ffmpeg -hide_banner -nostdin -nostats -i 1.wav -i 2.wav -i 3.wav -i 4.wav -filter_complex concat=n=4:v=0:a=1,volume=2.0,loudnorm=I=-20:TP=-4:LRA=7:print_format=json[book] -map [book] -f null -"""
+
+    assert " ".join(command) == test_command
+
+
+def test_short_concatenate_two_pass_loudnorm_command():
+    command = concat_ffmpeg_command(
+        build_list=BUILD_LIST,
+        output_path=OUTPUT_PATH,
+        use_normalization=True,
+        peak=-4,
+        rms_level=-20,
+        loudness_range_target=7,
+        is_short=True,
+        loudnorm_measured=LOUDNORM_MEASURED,
+    )
+
+    # measured LRA is above target, so loudnorm reverts to dynamic mode which needs padding
+    test_command = """ffmpeg -hide_banner -loglevel error -i 1.wav -i 2.wav -i 3.wav -i 4.wav -filter_complex concat=n=4:v=0:a=1,volume=1.0,adelay=30s,loudnorm=I=-20:TP=-4:LRA=7:measured_I=-27.61:measured_TP=-4.47:measured_LRA=18.06:measured_thresh=-39.2:offset=0.02:linear=true,atrim=start=30[book] -map [book] -ac 2 -ar 48000 -y complete_book.wav"""
+
+    assert " ".join(command) == test_command
+
+
+def test_short_concatenate_linear_loudnorm_command_skips_padding():
+    measured = {"input_i": -20.5, "input_tp": -6.0, "input_lra": 5.0, "input_thresh": -31.0, "target_offset": 0.1}
+
+    command = concat_ffmpeg_command(
+        build_list=BUILD_LIST,
+        output_path=OUTPUT_PATH,
+        use_normalization=True,
+        peak=-4,
+        rms_level=-20,
+        loudness_range_target=7,
+        is_short=True,
+        loudnorm_measured=measured,
+    )
+
+    test_command = """ffmpeg -hide_banner -loglevel error -i 1.wav -i 2.wav -i 3.wav -i 4.wav -filter_complex concat=n=4:v=0:a=1,volume=1.0,loudnorm=I=-20:TP=-4:LRA=7:measured_I=-20.5:measured_TP=-6.0:measured_LRA=5.0:measured_thresh=-31.0:offset=0.1:linear=true[book] -map [book] -ac 2 -ar 48000 -y complete_book.wav"""
+
+    assert " ".join(command) == test_command
+
+
+def test_loudnorm_is_linear():
+    measured = {"input_i": -20.5, "input_tp": -6.0, "input_lra": 5.0, "input_thresh": -31.0, "target_offset": 0.1}
+
+    assert loudnorm_is_linear(measured, -20, -4, 7)
+    assert not loudnorm_is_linear(None, -20, -4, 7)
+    assert not loudnorm_is_linear(measured, -20, -4, 4)
+    assert not loudnorm_is_linear(measured, -12, -4, 7)
+    assert not loudnorm_is_linear({**measured, "input_thresh": -70.0}, -20, -4, 7)
+
+
+def test_two_pass_normalize_command():
+    command = normalize_ffmpeg_command(
+        input_path="a.wav",
+        output_path="b.wav",
+        peak=-3.0,
+        rms_level=-18.0,
+        loudness_range_target=18,
+        sampling_frequency=44100,
+        measured=LOUDNORM_MEASURED,
+    )
+
+    expected_command = "ffmpeg -hide_banner -loglevel error -i a.wav -af loudnorm=I=-18.0:TP=-3.0:LRA=18:measured_I=-27.61:measured_TP=-4.47:measured_LRA=18.06:measured_thresh=-39.2:offset=0.02:linear=true -ar 44100 b.wav"
+
+    assert " ".join(command) == expected_command
+
+
+def test_concatenate_two_pass_normalization_measures_first(monkeypatch):
+    commands = []
+
+    def mock_execute_command(command_func, **kwargs):
+        commands.append(command_func(**kwargs))
+        return 0, "", LOUDNORM_OUTPUT
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    concatenate(BUILD_LIST, OUTPUT_PATH, use_normalization=True, two_pass_normalization=True, is_short=True)
+
+    assert "print_format=json" in " ".join(commands[0])
+    assert "linear=true" in " ".join(commands[1])
+    # measured values of LOUDNORM_OUTPUT don't allow linear mode, so short book is still padded
+    assert "adelay=30s" in " ".join(commands[1])
+
+
+def test_parse_stream_info():
+    assert parse_stream_info("mp3,44100,2\n") == StreamInfo("mp3", 44100, 2)
+    assert parse_stream_info("") is None
+
+
+def test_simple_concatenate_copies_homogeneous_streams(monkeypatch):
+    commands = []
+
+    def mock_execute_command(command_func, **kwargs):
+        commands.append(command_func)
+        return 0, "", ""
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+    monkeypatch.setattr("ffmpeg_wrapper.simple.stream_info", lambda path: StreamInfo("pcm_s16le", 48000, 2))
+
+    simple_concatenate(BUILD_LIST, OUTPUT_PATH)
+    simple_concatenate(BUILD_LIST, "complete_book.mp3")
+    simple_concatenate(BUILD_LIST, OUTPUT_PATH, channels=1)
+
+    assert commands == [demux_concat_ffmpeg_command, simple_concat_ffmpeg_command, simple_concat_ffmpeg_command]
+
+
+def test_simple_concat_command_concatenates_every_input():
+    command = simple_concat_ffmpeg_command(BUILD_LIST, OUTPUT_PATH, channels=1)
+
+    test_command = """ffmpeg -hide_banner -loglevel error -i 1.wav -i 2.wav -i 3.wav -i 4.wav -filter_complex concat=n=4:v=0:a=1[book] -map [book] -ac 1 -y complete_book.wav"""
+
+    assert " ".join(command) == test_command
+
+
+def test_simple_concatenate_encodes_mixed_streams(monkeypatch):
+    commands = []
+
+    def mock_execute_command(command_func, **kwargs):
+        commands.append(command_func)
+        return 0, "", ""
+
+    def mock_stream_info(path):
+        return StreamInfo("pcm_s16le", 44100 if path == "3.wav" else 48000, 2)
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+    monkeypatch.setattr("ffmpeg_wrapper.simple.stream_info", mock_stream_info)
+
+    simple_concatenate(BUILD_LIST, OUTPUT_PATH)
+
+    assert commands == [simple_concat_ffmpeg_command]
+
+
+def test_concatenate_long_build_list_by_groups(monkeypatch):
+    commands = []
+    lock = threading.Lock()
+
+    def mock_execute_command(command_func, **kwargs):
+        script_dir = kwargs.pop("script_dir", None)
+        command = command_func(**kwargs)
+        # scripts of group graphs are written beside intermediate audios
+        assert script_dir == (os.path.dirname(command[-1]) if command[-1].endswith(".mka") else None)
+        with lock:
+            commands.append(command)
+        return 0, "", ""
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    build_list = [f"{i}.wav" for i in range(10)]
+    concatenate(build_list, OUTPUT_PATH, fan_in=3, max_workers=2)
+
+    # 10 parts -> 4 groups -> 2 groups -> final command
+    assert len(commands) == 7
+    final = commands[-1]
+    assert final[-1] == OUTPUT_PATH
+    assert final.count("-i") == 2
+    for command in commands[:-1]:
+        assert command[command.index("-c:a") + 1] == "pcm_f32le"
+        assert command[-1].endswith(".mka")
+    first_level_inputs = [path for command in commands[:4] for path in command if path.endswith(".wav")]
+    assert sorted(first_level_inputs) == sorted(build_list)
+
+
+def test_execute_command_passes_huge_graph_by_script(tmp_path):
+    graph = "anull" + ",anull" * 20000
+    code = "import sys; sys.stdout.write(sys.argv[1] + ' ' + open(sys.argv[2]).read()[:11])"
+
+    status, out, er = execute_command(
+        lambda: [sys.executable, "-c", code, "-filter_complex", graph], script_dir=str(tmp_path)
+    )
+
+    assert status == 0
+    assert out == "-filter_complex_script anull,anull"
+    assert os.listdir(tmp_path) == []
+
+
+def test_concatenate_command_with_pauses():
+    build_list = ["1.wav", Silence(0.85), "2.wav", Silence(2)]
+
+    command = concat_ffmpeg_command(build_list, OUTPUT_PATH, channels=1, sample_rate=44100)
+
+    assert command[command.index("-filter_complex") - 4 : command.index("-filter_complex")] == [
+        "-i",
+        "1.wav",
+        "-i",
+        "2.wav",
+    ]
+    assert command[command.index("-filter_complex") + 1] == (
+        "anullsrc=r=44100:cl=mono,atrim=duration=0.850[s1];anullsrc=r=44100:cl=mono,atrim=duration=2.000[s3];"
+        "[0:a][s1][1:a][s3]concat=n=4:v=0:a=1,volume=1.0[book]"
+    )
+
+
+def test_total_duration_counts_pauses(monkeypatch):
+    def mock_durations(paths):
+        return [DurationResult(path, 10.0, None) for path in paths]
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.durations", mock_durations)
+
+    assert total_duration(["1.wav", Silence(0.5), "2.wav"]) == 20.5
+
+
+def _sleeping_command(output_path=None):
+    code = "import sys, time\nsys.stderr.write('started\\n')\nsys.stderr.flush()\n"
+    if output_path:
+        code += f"open({output_path!r}, 'wb').write(b'partial')\n"
+    code += "time.sleep(30)"
+    return [sys.executable, "-c", code]
+
+
+def test_execute_command_timeout_kills_process(tmp_path):
+    output_path = str(tmp_path / "book.mp3")
+    started = time.monotonic()
+    try:
+        execute_command(_sleeping_command, output_path=output_path, timeout=0.5)
+    except FFMPEGWrapperTimeoutException as e:
+        assert e.timeout == 0.5
+        assert e.stderr == "started"
+        assert e.return_code != 0
+    else:
+        raise AssertionError("timeout isn't raised")
+
+    assert time.monotonic() - started < 10
+    assert not (tmp_path / "book.mp3").exists()
+
+
+def test_execute_command_cancel_token():
+    token = CancellationToken()
+    timer = threading.Timer(0.3, token.cancel)
+    timer.start()
+    try:
+        execute_command(_sleeping_command, cancel_token=token)
+    except FFMPEGWrapperCancelledException as e:
+        assert "cancelled" in str(e)
+    else:
+        raise AssertionError("cancellation isn't raised")
+    finally:
+        timer.cancel()
+
+    try:
+        execute_command(_sleeping_command, cancel_token=token)
+    except FFMPEGWrapperCancelledException as e:
+        assert e.return_code is None
+    else:
+        raise AssertionError("cancelled token doesn't prevent start")
+
+
+def test_execute_command_finishes_before_timeout():
+    status, out, er = execute_command(lambda: [sys.executable, "-c", "print('done')"], timeout=30)
+
+    assert status == 0
+    assert out.strip() == "done"
@@ -0,0 +1,78 @@
+import os
+
+from ffmpeg_wrapper.filtergraph import Chain, FilterGraph, filter_complex_options, filter_scripts, node, render
+from ffmpeg_wrapper.simple import Silence, background_graph, concat_ffmpeg_command, concat_graph
+
+
+def test_node_serializes_values_and_options_in_order():
+    assert str(node("asetpts", "N/SR/TB")) == "asetpts=N/SR/TB"
+    assert str(node("amovie", "bg.wav", loop=0)) == "amovie=bg.wav:loop=0"
+    assert str(node("loudnorm", I=-18.0, TP=-3.0, LRA=18.0)) == "loudnorm=I=-18.0:TP=-3.0:LRA=18.0"
+    assert str(node("anull")) == "anull"
+
+
+def test_graph_connects_chains_by_labels():
+    graph = FilterGraph((Chain((node("volume", "2.0"), node("atrim", start=30)), ("0:a",), ("book",)),))
+    graph = graph.extend(Chain((node("asplit", 2),), ("book",), ("out0", "out1")))
+
+    assert str(graph) == "[0:a]volume=2.0,atrim=start=30[book];[book]asplit=2[out0][out1]"
+
+
+def test_concat_graph_is_cached():
+    build_list = ["1.wav", Silence(0.5), "2.wav"]
+
+    first = concat_graph(build_list, 2.0, True, -18.0, -3.0, 18.0, True)
+    second = concat_graph(list(build_list), 2.0, True, -18.0, -3.0, 18.0, True)
+
+    assert first is second
+    assert str(first) is str(second)
+    assert str(first) == (
+        "anullsrc=r=48000:cl=stereo,atrim=duration=0.500[s1];"
+        "[0:a][s1][1:a]concat=n=3:v=0:a=1,volume=2.0,adelay=30s,loudnorm=I=-18.0:TP=-3.0:LRA=18.0,atrim=start=30[book]"
+    )
+
+
+def test_background_graph_with_output_label():
+    graph = background_graph("bg.wav", 0.3, False, output="out")
+
+    assert str(graph) == (
+        "amovie=bg.wav:loop=0,asetpts=N/SR/TB,volume=0.3[background];"
+        "[book][background]amix=duration=shortest:normalize=0[out]"
+    )
+
+
+def test_filter_scripts_writes_huge_graph_to_script_and_removes_it(tmp_path):
+    graph = FilterGraph((Chain((node("volume", "2.0"),), ("0:a",), ("book",)),))
+    command = ["ffmpeg", "-i", "a.wav", *filter_complex_options(graph), "-y", "b.wav"]
+
+    assert filter_complex_options(graph) == ["-filter_complex", "[0:a]volume=2.0[book]"]
+
+    with filter_scripts(command, str(tmp_path)) as short_command:
+        assert short_command == command
+
+    with filter_scripts(command, str(tmp_path), threshold=10) as script_command:
+        script_path = script_command[script_command.index("-filter_complex_script") + 1]
+        assert "-filter_complex" not in script_command
+        assert os.path.dirname(script_path) == str(tmp_path)
+        with open(script_path) as f:
+            assert f.read() == render(graph)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_concat_command_of_long_build_list_uses_script(tmp_path):
+    build_list = [f"/books/long/part_{index:05d}.wav" for index in range(5000)]
+    build_list[1::2] = [Silence(0.25)] * 2500
+
+    command = concat_ffmpeg_command(build_list, "book.wav")
+
+    assert "-filter_complex_script" not in command
+    with filter_scripts(command, str(tmp_path)) as command:
+        assert "-filter_complex" not in command
+        script_path = command[command.index("-filter_complex_script") + 1]
+        with open(script_path) as f:
+            script = f.read()
+        assert script.endswith("concat=n=5000:v=0:a=1,volume=1.0[book]")
+        assert all(len(argument) < 64 * 1024 for argument in command)
+
+    assert not os.path.exists(script_path)
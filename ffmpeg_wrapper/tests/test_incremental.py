@@ -0,0 +1,114 @@
+import os
+
+from ffmpeg_wrapper import incremental
+from ffmpeg_wrapper.simple import demux_concat_ffmpeg_command, segment_ffmpeg_command, write_concat_list
+
+
+def test_segment_command():
+    command = segment_ffmpeg_command("1.wav", "segment.wav", channels=2, volume=2.0, sample_rate=44100)
+
+    assert " ".join(command) == (
+        "ffmpeg -hide_banner -loglevel error -i 1.wav -af volume=2.0 -ac 2 -ar 44100 -c:a pcm_s16le -y segment.wav"
+    )
+
+
+def test_write_concat_list_escapes_quotes(tmp_path):
+    list_path = tmp_path / "list.txt"
+
+    write_concat_list(["/books/it's.wav", "/books/2.wav"], str(list_path))
+
+    assert list_path.read_text() == "file '/books/it'\\''s.wav'\nfile '/books/2.wav'\n"
+
+
+def test_demux_concat_command():
+    command = demux_concat_ffmpeg_command("list.txt", "complete_book.wav")
+
+    test_command = "ffmpeg -hide_banner -loglevel error -f concat -safe 0 -i list.txt -c copy -y complete_book.wav"
+
+    assert " ".join(command) == test_command
+
+
+def test_incremental_concatenate_renders_only_changed_parts(tmp_path, monkeypatch):
+    rendered = []
+    lists = []
+
+    def mock_execute_command(command_func, **kwargs):
+        if command_func is segment_ffmpeg_command:
+            rendered.append(os.path.basename(kwargs["input_path"]))
+        else:
+            with open(kwargs["list_path"]) as f:
+                lists.append(f.read())
+        with open(kwargs["output_path"], "wb") as f:
+            f.write(b"RIFF")
+        return 0, "", ""
+
+    monkeypatch.setattr(incremental, "execute_command", mock_execute_command)
+
+    build_list = []
+    for name in ("1.wav", "2.wav", "3.wav"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        build_list.append(str(path))
+
+    segments_dir = str(tmp_path / "segments")
+    output_path = str(tmp_path / "book.wav")
+
+    incremental.incremental_concatenate(build_list, output_path, segments_dir, volume=2.0)
+    (tmp_path / "2.wav").write_bytes(b"changed chapter")
+    incremental.incremental_concatenate(build_list, output_path, segments_dir, volume=2.0)
+    incremental.incremental_concatenate(build_list, output_path, segments_dir, volume=1.0, max_workers=1)
+
+    assert sorted(rendered[:3]) == ["1.wav", "2.wav", "3.wav"]
+    assert rendered[3:4] == ["2.wav"]
+    assert sorted(rendered[4:]) == ["1.wav", "2.wav", "3.wav"]
+    assert len(lists) == 3
+    assert lists[0].count("file '") == 3
+    assert os.path.exists(output_path)
+    assert len([name for name in os.listdir(segments_dir) if name.endswith(".wav")]) == 7
+
+
+def test_demux_concat_command_encodes_without_stream_copy():
+    command = demux_concat_ffmpeg_command("list.txt", "complete_book.mp3", stream_copy=False)
+
+    test_command = "ffmpeg -hide_banner -loglevel error -f concat -safe 0 -i list.txt -y complete_book.mp3"
+
+    assert " ".join(command) == test_command
+
+
+def test_incremental_concatenate_encodes_compressed_book_and_joins_to_matroska(tmp_path, monkeypatch):
+    joins = []
+
+    def mock_execute_command(command_func, **kwargs):
+        if command_func is demux_concat_ffmpeg_command:
+            joins.append((os.path.basename(kwargs["output_path"]), kwargs["stream_copy"]))
+        with open(kwargs["output_path"], "wb") as f:
+            f.write(b"RIFF")
+        return 0, "", ""
+
+    monkeypatch.setattr(incremental, "execute_command", mock_execute_command)
+    monkeypatch.setattr(incremental, "concatenate", lambda *args, **kwargs: (0, "", ""))
+
+    part = tmp_path / "1.wav"
+    part.write_bytes(b"chapter")
+    segments_dir = str(tmp_path / "segments")
+
+    incremental.incremental_concatenate([str(part)], str(tmp_path / "book.wav"), segments_dir)
+    incremental.incremental_concatenate([str(part)], str(tmp_path / "book.mp3"), segments_dir)
+    incremental.incremental_concatenate([str(part)], str(tmp_path / "book.m4b"), segments_dir, use_normalization=True)
+
+    assert joins == [("book.wav", True), ("book.mp3", False), ("book.mka", True)]
+
+
+def test_prune_segments_removes_only_old_unused_segments(tmp_path):
+    old_segment = tmp_path / ("a" * 64 + ".wav")
+    used_segment = tmp_path / ("b" * 64 + ".wav")
+    fresh_segment = tmp_path / "silence_500ms_2_48000_pcm_s16le.wav"
+    other_file = tmp_path / "notes.wav"
+    for path in (old_segment, used_segment, fresh_segment, other_file):
+        path.write_bytes(b"RIFF")
+    for path in (old_segment, used_segment, other_file):
+        os.utime(path, (0, 0))
+
+    incremental.prune_segments(str(tmp_path), [str(used_segment)], max_age=3600)
+
+    assert sorted(os.listdir(tmp_path)) == sorted([used_segment.name, fresh_segment.name, other_file.name])
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import sys
+
+from ffmpeg_wrapper import aio
+from ffmpeg_wrapper.instrumentation import (
+    CommandCounters,
+    CommandStats,
+    add_hook,
+    command_paths,
+    logging_hook,
+    remove_hook,
+    span_hook,
+)
+from ffmpeg_wrapper.simple import execute_command
+
+
+def copy_command(input_path: str, output_path: str):
+    code = (
+        "import sys\n"
+        "data = open(sys.argv[2], 'rb').read()\n"
+        "buffer = bytearray(32 * 1024 * 1024)\n"
+        "sum(range(200000))\n"
+        "open(sys.argv[3], 'wb').write(data * 2)\n"
+    )
+    return [sys.executable, "-c", code, "-i", input_path, output_path]
+
+
+def make_stats(kind="convert_ffmpeg_command", return_code=0, max_rss=1024):
+    return CommandStats(kind, ["ffmpeg"], return_code, 1000.0, 2.5, 1.5, 0.25, max_rss, 10, 20)
+
+
+def test_command_paths():
+    command = ["ffmpeg", "-i", "1.wav", "-i", "2.wav", "-filter_complex", "concat", "-y", "book.wav"]
+
+    assert command_paths(command) == (["1.wav", "2.wav"], ["book.wav"])
+    assert command_paths(command, ["book.mp3", "book.m4b"]) == (["1.wav", "2.wav"], ["book.mp3", "book.m4b"])
+
+
+def test_execute_command_reports_stats(tmp_path):
+    input_path = tmp_path / "in.wav"
+    input_path.write_bytes(b"x" * 1000)
+    output_path = str(tmp_path / "out.wav")
+    stats = []
+
+    status, _, _ = execute_command(copy_command, str(input_path), output_path=output_path, on_stats=stats.append)
+
+    assert status == 0
+    assert len(stats) == 1
+    assert stats[0].kind == "copy_command"
+    assert stats[0].return_code == 0
+    assert stats[0].input_size == 1000
+    assert stats[0].output_size == 2000
+    assert stats[0].wall_time > 0
+    assert stats[0].user_time is not None and stats[0].user_time > 0
+    assert stats[0].system_time is not None
+    assert stats[0].max_rss >= 32 * 1024 * 1024
+
+
+def test_registered_hooks_get_stats_of_every_command(tmp_path):
+    input_path = tmp_path / "in.wav"
+    input_path.write_bytes(b"x" * 10)
+    counters = add_hook(CommandCounters())
+    try:
+        execute_command(copy_command, str(input_path), output_path=str(tmp_path / "1.wav"))
+        execute_command(copy_command, str(input_path), output_path=str(tmp_path / "2.wav"))
+    finally:
+        remove_hook(counters)
+    execute_command(copy_command, str(input_path), output_path=str(tmp_path / "3.wav"))
+
+    snapshot = counters.snapshot()["copy_command"]
+    assert snapshot["count"] == 2
+    assert snapshot["failures"] == 0
+    assert snapshot["input_size"] == 20
+    assert snapshot["output_size"] == 40
+    assert snapshot["max_rss"] > 0
+
+
+def test_aio_execute_command_reports_wall_time(tmp_path):
+    input_path = tmp_path / "in.wav"
+    input_path.write_bytes(b"x" * 10)
+    stats = []
+
+    asyncio.run(
+        aio.execute_command(
+            copy_command, str(input_path), output_path=str(tmp_path / "out.wav"), on_stats=stats.append
+        )
+    )
+
+    assert stats[0].output_size == 20
+    assert stats[0].wall_time > 0
+    assert stats[0].user_time is None
+
+
+def test_counters_count_failures():
+    counters = CommandCounters()
+    counters(make_stats(max_rss=1024))
+    counters(make_stats(return_code=1, max_rss=4096))
+
+    assert counters.snapshot()["convert_ffmpeg_command"] == {
+        "count": 2,
+        "failures": 1,
+        "wall_time": 5.0,
+        "user_time": 3.0,
+        "system_time": 0.5,
+        "input_size": 20,
+        "output_size": 40,
+        "max_rss": 4096,
+    }
+
+
+def test_logging_hook(caplog):
+    with caplog.at_level(logging.INFO):
+        logging_hook()(make_stats())
+
+    assert "convert_ffmpeg_command exited with 0 in 2.500s" in caplog.text
+
+
+def test_span_hook():
+    spans = []
+
+    class Span:
+        def __init__(self, name, start_time, attributes):
+            self.name = name
+            self.start_time = start_time
+            self.attributes = attributes
+            spans.append(self)
+
+        def end(self, end_time):
+            self.end_time = end_time
+
+    class Tracer:
+        def start_span(self, name, start_time, attributes):
+            return Span(name, start_time, attributes)
+
+    span_hook(Tracer())(make_stats())
+
+    assert spans[0].name == "convert_ffmpeg_command"
+    assert spans[0].end_time - spans[0].start_time == 2_500_000_000
+    assert spans[0].attributes["ffmpeg.max_rss"] == 1024
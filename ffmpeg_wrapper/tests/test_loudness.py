@@ -0,0 +1,84 @@
+import math
+
+from ffmpeg_wrapper.cache import MetadataCache
+from ffmpeg_wrapper import loudness
+from ffmpeg_wrapper.loudness import FragmentLoudness, combine_loudness, measure_book_loudness
+import pytest
+
+
+def fragment(path, duration, input_i, input_tp=-3.0, input_lra=5.0):
+    return FragmentLoudness(path, duration, input_i, input_tp, input_lra, input_i - 10)
+
+
+def test_combine_loudness_of_equal_parts():
+    combined = combine_loudness([fragment("1.wav", 10, -20.0), fragment("2.wav", 30, -20.0, input_tp=-1.5)])
+
+    assert combined == {
+        "input_i": -20.0,
+        "input_tp": -1.5,
+        "input_lra": 5.0,
+        "input_thresh": -30.0,
+        "target_offset": 0.0,
+    }
+
+
+def test_combine_loudness_weights_by_duration_and_gates_quiet_parts():
+    fragments = [
+        fragment("1.wav", 10, -20.0),
+        fragment("2.wav", 10, -23.0),
+        fragment("3.wav", 100, -45.0),
+        fragment("silence.wav", 5, -math.inf),
+    ]
+
+    combined = combine_loudness(fragments, volume=2.0)
+
+    expected = 10 * math.log10((10**-2.0 + 10**-2.3) / 2) + 20 * math.log10(2.0)
+    assert combined["input_i"] == round(expected, 2)
+    assert combined["input_thresh"] == round(expected - 10, 2)
+
+
+def test_combine_loudness_uses_volume_of_filter():
+    combined = combine_loudness([fragment("1.wav", 10, -20.0)], volume=1.26)
+
+    assert f"{1.26:.1f}" == "1.3"
+    assert combined["input_i"] == round(-20.0 + 20 * math.log10(1.3), 2)
+
+
+@pytest.mark.parametrize("volume", [0.0, 0.04, -1.0])
+def test_combine_loudness_rejects_volume_which_mutes_book(volume):
+    with pytest.raises(ValueError):
+        combine_loudness([fragment("1.wav", 10, -20.0)], volume=volume)
+
+
+def test_combine_loudness_clamps_values_to_loudnorm_ranges():
+    combined = combine_loudness([fragment("1.wav", 10, -5.0, input_tp=80.0)], volume=100.0)
+
+    assert combined["input_i"] == 0.0
+    assert combined["input_tp"] == 99.0
+    assert combined["input_thresh"] == 0.0
+
+
+def test_measure_book_loudness_measures_only_changed_parts(tmp_path, monkeypatch):
+    paths = []
+    for name in ("1.bin", "2.bin"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+
+    measured = []
+
+    def mock_measure_loudness(path):
+        measured.append(path)
+        return {"input_i": -20.0, "input_tp": -3.0, "input_lra": 4.0, "input_thresh": -30.0, "target_offset": 0.0}
+
+    monkeypatch.setattr(loudness, "measure_loudness", mock_measure_loudness)
+    monkeypatch.setattr(loudness, "duration", lambda path, cache=None: 10.0)
+
+    cache = MetadataCache()
+    measure_book_loudness(paths, cache=cache)
+    (tmp_path / "2.bin").write_bytes(b"changed")
+    combined = measure_book_loudness(paths, cache=cache)
+
+    assert measured.count(paths[0]) == 1
+    assert measured.count(paths[1]) == 2
+    assert combined["input_i"] == -20.0
@@ -0,0 +1,84 @@
+from ffmpeg_wrapper import parallel
+from ffmpeg_wrapper.simple import CancellationToken, demux_concat_ffmpeg_command
+
+
+def test_chunk_ranges_split_only_at_boundaries():
+    assert parallel.chunk_ranges(1500.0, [700.0], 600.0) == [(0.0, 700.0), (700.0, None)]
+    assert parallel.chunk_ranges(1500.0, [], 600.0) == [(0.0, None)]
+    # boundaries closer than chunk_duration are skipped, short tail is joined to the last range
+    assert parallel.chunk_ranges(2000.0, [300.0, 650.0, 900.0, 1400.0, 1800.0], 600.0) == [
+        (0.0, 650.0),
+        (650.0, 750.0),
+        (1400.0, None),
+    ]
+
+
+def test_chunk_convert_command():
+    command = parallel.chunk_convert_ffmpeg_command("book.wav", "0.mp3", 600.0, 600.0, 64)
+
+    test_command = "ffmpeg -hide_banner -loglevel error -ss 600.000000 -t 600.000000 -i book.wav -ab 64k -y 0.mp3"
+
+    assert " ".join(command) == test_command
+
+
+def test_parallel_convert_joins_chunks_in_order(monkeypatch):
+    converted = []
+    lists = []
+
+    def mock_execute_command(command_func, **kwargs):
+        if command_func is demux_concat_ffmpeg_command:
+            with open(kwargs["list_path"]) as f:
+                lists.append(f.read())
+        else:
+            converted.append((kwargs["start"], kwargs["chunk_duration"]))
+        return 0, "", ""
+
+    monkeypatch.setattr(parallel, "execute_command", mock_execute_command)
+    monkeypatch.setattr(parallel, "duration", lambda path: 1900.0)
+
+    parallel.parallel_convert(
+        ("book", "book.wav", "wav"),
+        ("book", "book.mp3", "mp3"),
+        64,
+        max_workers=2,
+        boundaries=[650.0, 1300.0],
+    )
+
+    assert sorted(converted) == [(0.0, 650.0), (650.0, 650.0), (1300.0, None)]
+    assert [line.rsplit("/", 1)[-1] for line in lists[0].splitlines()] == ["0.mp3'", "1.mp3'", "2.mp3'"]
+
+
+def test_parallel_convert_without_boundaries_is_not_split(monkeypatch):
+    converted = []
+
+    monkeypatch.setattr(parallel, "convert", lambda *args, **kwargs: converted.append(args) or (0, "", ""))
+    monkeypatch.setattr(parallel, "duration", lambda path: 1900.0)
+
+    parallel.parallel_convert(("book", "book.wav", "wav"), ("book", "book.mp3", "mp3"), 64)
+
+    assert converted == [(("book", "book.wav", "wav"), ("book", "book.mp3", "mp3"), 64)]
+
+
+def test_parallel_convert_passes_timeout_and_cancel_token_to_every_process(monkeypatch):
+    options = []
+    token = CancellationToken()
+
+    def mock_execute_command(command_func, **kwargs):
+        options.append((command_func, kwargs["timeout"], kwargs["cancel_token"]))
+        return 0, "", ""
+
+    monkeypatch.setattr(parallel, "execute_command", mock_execute_command)
+    monkeypatch.setattr(parallel, "duration", lambda path: 1900.0)
+
+    parallel.parallel_convert(
+        ("book", "book.wav", "wav"),
+        ("book", "book.mp3", "mp3"),
+        64,
+        boundaries=[650.0, 1300.0],
+        timeout=60.0,
+        cancel_token=token,
+    )
+
+    assert len(options) == 4
+    assert all(option[1:] == (60.0, token) for option in options)
+    assert options[-1][0] is demux_concat_ffmpeg_command
@@ -0,0 +1,41 @@
+from ffmpeg_wrapper import pipeline
+from ffmpeg_wrapper.simple import concat_ffmpeg_command
+
+
+BUILD_LIST = ["1.wav", "2.wav"]
+MP3_64 = (("book_64.mp3", "book_64.mp3", "mp3"), 64)
+MP3_128 = (("book_128.mp3", "book_128.mp3", "mp3"), 128)
+
+
+def test_pipeline_command_with_one_output_matches_concatenate():
+    command = pipeline.pipeline_ffmpeg_command(BUILD_LIST, [MP3_64], volume=2.0)
+    concat = concat_ffmpeg_command(BUILD_LIST, "book_64.mp3", volume=2.0)
+
+    assert command[: command.index("-y")] == concat[: concat.index("-map")]
+    assert " ".join(command[command.index("-y") :]) == "-y -map [book] -ac 2 -ar 48000 -ab 64k book_64.mp3"
+
+
+def test_pipeline_command_splits_mixed_audio_to_outputs():
+    command = pipeline.pipeline_ffmpeg_command(BUILD_LIST, [MP3_64, MP3_128], background_path="bg.wav")
+
+    filter_complex = command[command.index("-filter_complex") + 1]
+
+    assert filter_complex.endswith("amix=duration=shortest:normalize=1[out];[out]asplit=2[out0][out1]")
+    assert " ".join(command[command.index("-y") :]) == (
+        "-y -map [out0] -ac 2 -ar 48000 -ab 64k book_64.mp3 -map [out1] -ac 2 -ar 48000 -ab 128k book_128.mp3"
+    )
+
+
+def test_build_book_runs_one_process(monkeypatch):
+    commands = []
+
+    def mock_execute_command(command_func, **kwargs):
+        commands.append(command_func(**kwargs))
+        return 0, "", ""
+
+    monkeypatch.setattr(pipeline, "execute_command", mock_execute_command)
+
+    pipeline.build_book(BUILD_LIST, [MP3_64, MP3_128], use_normalization=True)
+
+    assert len(commands) == 1
+    assert commands[0][-1] == "book_128.mp3"
@@ -0,0 +1,149 @@
+import io
+import sys
+import time
+
+from ffmpeg_wrapper import pipes
+from ffmpeg_wrapper.simple import (
+    CancellationToken,
+    FFMPEGWrapperCancelledException,
+    FFMPEGWrapperException,
+    FFMPEGWrapperTimeoutException,
+)
+
+
+REVERSE_STDIN = "import sys; sys.stdout.buffer.write(sys.stdin.buffer.read()[::-1])"
+CAT_FILES = "import sys\nfor path in sys.argv[1:]:\n    sys.stdout.buffer.write(open(path, 'rb').read())"
+
+
+def python_command(code: str, *args: str):
+    return [sys.executable, "-c", code, *args]
+
+
+def test_stream_command_writes_stdin_source():
+    chunks = pipes.stream_command(python_command, REVERSE_STDIN, stdin_source=b"abcdef", chunk_size=4)
+
+    assert list(chunks) == [b"fedc", b"ba"]
+
+
+def test_piped_inputs_passes_sources_through_stdin_and_named_pipes(tmp_path):
+    path = tmp_path / "1.wav"
+    path.write_bytes(b"path;")
+    sources = [str(path), b"bytes;", io.BytesIO(b"file;"), iter([b"iter", b"able"])]
+
+    with pipes.piped_inputs(sources) as (paths, stdin_source, fifo_sources):
+        assert paths[:2] == [str(path), pipes.PIPE_INPUT]
+        assert stdin_source == b"bytes;"
+
+        files = [p for p in paths if p != pipes.PIPE_INPUT]
+        out = b"".join(pipes.stream_command(python_command, CAT_FILES, *files, fifo_sources=fifo_sources))
+
+    assert out == b"path;file;iterable"
+
+
+def test_stream_command_raises_exception_with_stderr():
+    code = "import sys; sys.stderr.write('Invalid data found'); sys.exit(1)"
+
+    try:
+        list(pipes.stream_command(python_command, code, stdin_source=b"data"))
+    except FFMPEGWrapperException as exc:
+        assert exc.return_code == 1
+        assert exc.stderr == "Invalid data found"
+    else:
+        raise AssertionError("FFMPEGWrapperException was not raised")
+
+
+def test_convert_piped_writes_to_output(monkeypatch):
+    commands = []
+
+    def mock_stream_command(command_func, stdin_source, fifo_sources, **kwargs):
+        commands.append(command_func(**kwargs))
+        yield stdin_source
+
+    monkeypatch.setattr(pipes, "stream_command", mock_stream_command)
+    output = io.BytesIO()
+
+    assert pipes.convert_piped(b"audio", "mp3", 64, output=output) is None
+    assert output.getvalue() == b"audio"
+    assert " ".join(commands[0]) == "ffmpeg -hide_banner -loglevel error -i pipe:0 -ab 64k -f mp3 -y pipe:1"
+
+
+def test_convert_stream_command():
+    command = pipes.convert_stream_ffmpeg_command("book.wav", "ipod", 64)
+
+    test_command = (
+        "ffmpeg -hide_banner -loglevel error -i book.wav -ab 64k "
+        "-movflags empty_moov+default_base_moof -frag_duration 1000000 -f ipod pipe:1"
+    )
+
+    assert " ".join(command) == test_command
+
+
+def test_convert_stream_command_without_container_options():
+    command = pipes.convert_stream_ffmpeg_command("book.wav", "adts", 64)
+
+    assert " ".join(command) == "ffmpeg -hide_banner -loglevel error -i book.wav -ab 64k -f adts pipe:1"
+
+
+def test_stream_command_kills_process_when_consumer_stops(monkeypatch):
+    processes = []
+    popen = pipes.subprocess.Popen
+
+    def mock_popen(*args, **kwargs):
+        processes.append(popen(*args, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(pipes.subprocess, "Popen", mock_popen)
+
+    code = "import sys\nwhile True:\n    sys.stdout.buffer.write(b'x' * 65536)\n    sys.stdout.flush()"
+    chunks = pipes.stream_command(python_command, code, chunk_size=1024)
+
+    assert next(chunks) == b"x" * 1024
+    chunks.close()
+
+    assert processes[0].returncode is not None
+
+
+def test_stream_command_terminates_stuck_process_after_timeout():
+    code = "import sys, time; sys.stderr.write('started'); sys.stderr.flush(); time.sleep(30)"
+    started = time.monotonic()
+
+    try:
+        list(pipes.stream_command(python_command, code, timeout=0.5))
+    except FFMPEGWrapperTimeoutException as exc:
+        assert exc.timeout == 0.5
+        assert exc.stderr == "started"
+        assert exc.return_code is not None
+    else:
+        raise AssertionError("FFMPEGWrapperTimeoutException was not raised")
+
+    assert time.monotonic() - started < 10
+
+
+def test_stream_command_stops_yielding_when_token_is_cancelled():
+    token = CancellationToken()
+    code = "import sys\nwhile True:\n    sys.stdout.buffer.write(b'x' * 65536)\n    sys.stdout.flush()"
+    chunks = pipes.stream_command(python_command, code, chunk_size=1024, cancel_token=token)
+
+    assert next(chunks) == b"x" * 1024
+    token.cancel()
+
+    try:
+        for _ in chunks:
+            pass
+    except FFMPEGWrapperCancelledException as exc:
+        assert exc.return_code is not None
+    else:
+        raise AssertionError("FFMPEGWrapperCancelledException was not raised")
+
+
+def test_stream_command_with_cancelled_token_does_not_start_process(monkeypatch):
+    token = CancellationToken()
+    token.cancel()
+    monkeypatch.setattr(pipes.subprocess, "Popen", None)
+
+    try:
+        list(pipes.stream_command(python_command, "pass", cancel_token=token))
+    except FFMPEGWrapperCancelledException:
+        pass
+    else:
+        raise AssertionError("FFMPEGWrapperCancelledException was not raised")
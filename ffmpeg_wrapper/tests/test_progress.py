@@ -0,0 +1,91 @@
+import asyncio
+
+from ffmpeg_wrapper import aio
+from ffmpeg_wrapper.progress import Progress, ProgressParser
+from ffmpeg_wrapper.simple import convert_ffmpeg_command, silent
+
+
+PROGRESS_OUTPUT = """bitrate=N/A
+total_size=N/A
+out_time_us=30000000
+out_time_ms=30000000
+out_time=00:00:30.000000
+speed=  20x
+progress=continue
+out_time_us=N/A
+speed=N/A
+progress=continue
+out_time_us=120000000
+speed=24x
+progress=end
+"""
+
+
+def test_progress_parser_emits_event_per_block():
+    events = []
+    parser = ProgressParser(events.append, total=120.0)
+
+    for line in PROGRESS_OUTPUT.splitlines():
+        parser.feed_line(line)
+
+    assert events == [
+        Progress(out_time=30.0, total=120.0, percentage=25.0, speed=20.0, eta=4.5, is_end=False),
+        Progress(out_time=0.0, total=120.0, percentage=0.0, speed=None, eta=None, is_end=False),
+        Progress(out_time=120.0, total=120.0, percentage=100.0, speed=24.0, eta=0.0, is_end=True),
+    ]
+
+
+def test_progress_parser_without_total():
+    events = []
+    parser = ProgressParser(events.append)
+
+    for line in PROGRESS_OUTPUT.splitlines()[:7]:
+        parser.feed_line(line)
+
+    assert events == [Progress(out_time=30.0, total=None, percentage=None, speed=20.0, eta=None, is_end=False)]
+
+
+def test_progress_command():
+    input_info = ("complete_book.wav", "/tmp/complete_book.wav", "wav")
+    output_info = ("converted_book.mp3", "/tmp/converted_book.mp3", "mp3")
+
+    command = convert_ffmpeg_command(input_info=input_info, output_info=output_info, bit_rate=64, progress=True)
+
+    assert " ".join(command) == (
+        "ffmpeg -hide_banner -loglevel error -progress pipe:1 -nostats -i /tmp/complete_book.wav -ab 64k "
+        "-y /tmp/converted_book.mp3"
+    )
+
+
+def test_silent_reports_progress(monkeypatch):
+    def mock_execute_command(command_func, **kwargs):
+        assert "-progress" in command_func(**{k: v for k, v in kwargs.items() if k != "on_stdout_line"})
+        for line in ["out_time_us=500000", "speed=100x", "progress=end"]:
+            kwargs["on_stdout_line"](line)
+        return 0, "", ""
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+    events = []
+
+    silent(0.5, "/tmp/pause.mp3", on_progress=events.append)
+
+    assert events == [Progress(out_time=0.5, total=0.5, percentage=100.0, speed=100.0, eta=0.0, is_end=True)]
+
+
+def test_iter_progress_yields_events_and_raises_errors():
+    async def job(value, on_progress):
+        on_progress(Progress(value, None, None, None, None, False))
+        await asyncio.sleep(0)
+        on_progress(Progress(value * 2, None, None, None, None, True))
+        raise ValueError("failed")
+
+    async def run():
+        events = []
+        try:
+            async for event in aio.iter_progress(job, 1.0):
+                events.append(event.out_time)
+        except ValueError:
+            return events
+        raise AssertionError("ValueError was not raised")
+
+    assert asyncio.run(run()) == [1.0, 2.0]
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from ffmpeg_wrapper import scheduler
+from ffmpeg_wrapper.simple import (
+    concat_ffmpeg_command,
+    convert_ffmpeg_command,
+    convert_many_ffmpeg_command,
+    probe_durations_ffmpeg_command,
+)
+
+
+def test_threaded_command_sets_threads_before_output():
+    command = scheduler.threaded_command(concat_ffmpeg_command, 4)(["1.wav", "2.wav"], "book.wav")
+
+    assert command[:3] == ["ffmpeg", "-filter_complex_threads", "4"]
+    assert command[-3:] == ["-threads", "4", "book.wav"]
+    assert scheduler.job_weight(concat_ffmpeg_command) == 4
+
+
+def test_threaded_command_sets_threads_before_every_output():
+    outputs = [(("book", "book.mp3", "mp3"), 64), (("book", "book.m4a", "ipod"), 96)]
+
+    command = scheduler.threaded_command(convert_many_ffmpeg_command, 3)(("book", "book.wav", "wav"), outputs)
+
+    assert " ".join(command) == (
+        "ffmpeg -hide_banner -loglevel error -i book.wav -y -ab 64k -threads 3 book.mp3 -ab 96k -threads 3 book.m4a"
+    )
+
+
+def test_threaded_command_keeps_inputs_of_command_without_output():
+    command = scheduler.threaded_command(probe_durations_ffmpeg_command, 2)(["a.mp3", "b.mp3"])
+
+    assert " ".join(command) == "ffmpeg -hide_banner -nostdin -i a.mp3 -i b.mp3"
+
+
+def test_scheduler_limits_summed_weight():
+    lock = threading.Lock()
+    running = []
+    peaks = []
+
+    def job(weight):
+        with lock:
+            running.append(weight)
+            peaks.append(sum(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(weight)
+        return weight
+
+    with scheduler.Scheduler(capacity=4, max_workers=4) as executor:
+        futures = [executor.submit(job, weight, weight=weight) for weight in [1, 3, 2, 2, 4, 1, 1, 1, 1]]
+
+    assert [future.result() for future in futures] == [1, 3, 2, 2, 4, 1, 1, 1, 1]
+    assert max(peaks) <= 4
+
+
+def test_submit_command_executes_threaded_command(monkeypatch):
+    commands = []
+
+    def mock_execute_command(command_func, *args, threads=None, **kwargs):
+        commands.append(scheduler.threaded_command(command_func, threads)(*args, **kwargs))
+        return 0, "", ""
+
+    monkeypatch.setattr(scheduler, "execute_command", mock_execute_command)
+    input_info = ("book.wav", "book.wav", "wav")
+    output_info = ("book.mp3", "book.mp3", "mp3")
+
+    with scheduler.Scheduler(capacity=8) as executor:
+        future = executor.submit_command(convert_ffmpeg_command, input_info, output_info, 64)
+
+    assert future.result() == (0, "", "")
+    assert " ".join(commands[0]) == "ffmpeg -hide_banner -loglevel error -i book.wav -ab 64k -y -threads 2 book.mp3"
+
+
+def test_submit_passes_threads_to_functions_which_accept_them():
+    def concatenate(build_list, output_path, threads=None):
+        return threads
+
+    def volume_detect(path_to_file):
+        return path_to_file
+
+    with scheduler.Scheduler(capacity=2) as executor:
+        threaded = executor.submit(concatenate, ["1.wav"], "book.wav")
+        explicit = executor.submit(concatenate, ["1.wav"], "book.wav", threads=1)
+        plain = executor.submit(volume_detect, "book.wav")
+
+    assert threaded.result() == 2
+    assert explicit.result() == 1
+    assert plain.result() == "book.wav"
+
+
+def test_submit_passes_max_workers_to_functions_which_accept_them():
+    def convert_many(input_paths, output_paths, threads=None, max_workers=None):
+        return threads, max_workers
+
+    def measure_concat_loudness(build_list, max_workers=None):
+        return max_workers
+
+    with scheduler.Scheduler(capacity=2) as executor:
+        threaded = executor.submit(convert_many, ["1.wav"], ["1.mp3"], weight=4)
+        explicit = executor.submit(convert_many, ["1.wav"], ["1.mp3"], weight=4, max_workers=3)
+        unthreaded = executor.submit(measure_concat_loudness, ["1.wav"], weight=2)
+
+    assert threaded.result() == (2, 2)
+    assert explicit.result() == (2, 3)
+    assert unthreaded.result() == 1
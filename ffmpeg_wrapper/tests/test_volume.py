@@ -0,0 +1,67 @@
+import random
+import struct
+
+from ffmpeg_wrapper import volume
+import pytest
+
+
+def test_pcm_command():
+    command = volume.pcm_ffmpeg_command("book.mp3", start=12.5, window_duration=5.0)
+
+    test_command = (
+        "ffmpeg -hide_banner -loglevel error -ss 12.500 -t 5.000 -i book.mp3 -vn -f s16le -acodec pcm_s16le pipe:1"
+    )
+
+    assert " ".join(command) == test_command
+
+
+def test_levels_are_converted_like_volumedetect():
+    levels = volume.PcmLevels(4, 4 * 16384.0**2, 32768).merge(volume.PcmLevels(0, 0.0, 0))
+
+    assert levels.to_volume() == {"root_mean_square": -6.0, "max_volume": 0.0}
+    assert volume.PcmLevels(10, 0.0, 0).to_volume() == {"root_mean_square": -91.0, "max_volume": -91.0}
+
+
+PCM_BUFFER = struct.pack("<8h", 0, 1, -1, 32767, -32768, 1234, -4321, 16384)
+PCM_CHUNKS = [PCM_BUFFER[:6], b"", PCM_BUFFER[6:]]
+PCM_LEVELS = volume.PcmLevels(8, float(1 + 1 + 32767**2 + 32768**2 + 1234**2 + 4321**2 + 16384**2), 32768)
+
+
+def test_pcm_levels_without_numpy(monkeypatch):
+    monkeypatch.setattr(volume, "_numpy", lambda: None)
+
+    assert volume.pcm_levels(PCM_CHUNKS) == PCM_LEVELS
+
+
+def test_pcm_levels_without_numpy_match_numpy(monkeypatch):
+    pytest.importorskip("numpy")
+
+    with_numpy = volume.pcm_levels(PCM_CHUNKS)
+    monkeypatch.setattr(volume, "_numpy", lambda: None)
+
+    assert volume.pcm_levels(PCM_CHUNKS) == with_numpy == PCM_LEVELS
+
+
+def test_stratified_windows_cover_every_stratum():
+    windows = volume.stratified_windows(100.0, 4, 5.0, random.Random(1))
+
+    assert len(windows) == 4
+    for index, (start, length) in enumerate(windows):
+        assert length == 5.0
+        assert index * 25.0 <= start <= (index + 1) * 25.0 - 5.0
+
+    assert volume.stratified_windows(10.0, 4, 5.0) == [(0.0, 10.0)]
+
+
+def test_fast_volume_detect_streams_samples(monkeypatch):
+    samples = struct.pack("<4h", 16384, -16384, 16384, -32768)
+
+    def mock_stream_command(command_func, **kwargs):
+        yield samples[:4]
+        yield samples[4:]
+
+    monkeypatch.setattr(volume, "stream_command", mock_stream_command)
+
+    result = volume.fast_volume_detect("book.wav")
+
+    assert result == {"root_mean_square": -3.6, "max_volume": 0.0}
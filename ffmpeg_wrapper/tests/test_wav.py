@@ -0,0 +1,130 @@
+import struct
+import wave
+
+from ffmpeg_wrapper.simple import duration, silent
+from ffmpeg_wrapper import wav
+from ffmpeg_wrapper.wav import WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, read_wav_info, wav_duration, write_silence
+
+
+def write_wave(path, frames: int, sample_rate: int = 48000, channels: int = 1, sample_width: int = 2) -> str:
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(sample_width)
+        f.setframerate(sample_rate)
+        f.writeframes(b"\x00" * frames * channels * sample_width)
+    return str(path)
+
+
+def fmt_chunk(format_tag: int, channels: int, sample_rate: int, bits_per_sample: int) -> bytes:
+    block_align = channels * bits_per_sample // 8
+    byte_rate = sample_rate * block_align
+    body = struct.pack("<HHIIHH", format_tag, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+    return b"fmt " + struct.pack("<I", len(body)) + body
+
+
+def test_pcm_wave_duration(tmp_path):
+    path = write_wave(tmp_path / "a.wav", frames=72000, sample_rate=48000, channels=2)
+
+    info = read_wav_info(path)
+
+    assert info.format_tag == WAVE_FORMAT_PCM
+    assert info.channels == 2
+    assert info.sample_rate == 48000
+    assert info.bits_per_sample == 16
+    assert info.data_size == 72000 * 4
+    assert info.codec_name == "pcm_s16le"
+    assert wav_duration(path) == 1.5
+
+
+def test_header_chunks_before_data_are_skipped(tmp_path):
+    data = b"\x00" * 44100 * 4
+    list_chunk = b"LIST" + struct.pack("<I", 5) + b"INFOx" + b"\x00"
+    fmt = fmt_chunk(WAVE_FORMAT_IEEE_FLOAT, 1, 44100, 32)
+    body = b"WAVE" + fmt + list_chunk + b"data" + struct.pack("<I", len(data))
+    path = tmp_path / "float.wav"
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body) + len(data)) + body + data)
+
+    assert read_wav_info(str(path)).format_tag == WAVE_FORMAT_IEEE_FLOAT
+    assert read_wav_info(str(path)).codec_name == "pcm_f32le"
+    assert wav_duration(str(path)) == 1.0
+
+
+def test_rf64_duration(tmp_path):
+    data = b"\x00" * 48000 * 2 * 3
+    ds64 = b"ds64" + struct.pack("<IQQQI", 28, 0, len(data), 48000 * 3, 0)
+    body = b"WAVE" + ds64 + fmt_chunk(WAVE_FORMAT_PCM, 1, 48000, 16) + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    path = tmp_path / "long.wav"
+    path.write_bytes(b"RF64" + struct.pack("<I", 0xFFFFFFFF) + body + data)
+
+    assert wav_duration(str(path)) == 3.0
+
+
+def test_unparsable_files_are_left_to_ffprobe(tmp_path):
+    truncated = write_wave(tmp_path / "truncated.wav", frames=48000)
+    with open(truncated, "r+b") as f:
+        f.truncate(1000)
+
+    mp3 = tmp_path / "a.mp3"
+    mp3.write_bytes(b"ID3\x04\x00" + b"\x00" * 100)
+
+    assert wav_duration(truncated) is None
+    assert wav_duration(str(mp3)) is None
+    assert wav_duration(str(tmp_path / "missing.wav")) is None
+
+
+def test_header_with_zero_sample_size_is_left_to_ffprobe(tmp_path):
+    data = b"\x00" * 4800
+    fmt = b"fmt " + struct.pack("<IHHIIHH", 16, WAVE_FORMAT_PCM, 1, 48000, 0, 0, 0)
+    body = b"WAVE" + fmt + b"data" + struct.pack("<I", len(data))
+    path = tmp_path / "broken.wav"
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body) + len(data)) + body + data)
+
+    assert read_wav_info(str(path)) is None
+    assert wav_duration(str(path)) is None
+
+
+def test_duration_reads_wave_header_without_ffprobe(tmp_path, monkeypatch):
+    def mock_execute_command(*args, **kwargs):
+        raise AssertionError("ffprobe must not be executed")
+
+    monkeypatch.setattr("ffmpeg_wrapper.simple.execute_command", mock_execute_command)
+
+    assert duration(write_wave(tmp_path / "a.wav", frames=24000)) == 0.5
+
+
+def test_write_silence_matches_ffmpeg_parameters(tmp_path):
+    path = str(tmp_path / "pause.wav")
+
+    write_silence(path, 0.85)
+
+    with wave.open(path, "rb") as f:
+        assert (f.getnchannels(), f.getframerate(), f.getsampwidth(), f.getnframes()) == (1, 48000, 2, 40800)
+        assert f.readframes(f.getnframes()) == b"\x00" * 40800 * 2
+
+
+def test_silent_rejects_negative_duration(tmp_path):
+    path = tmp_path / "pause.wav"
+
+    try:
+        silent(-1, str(path))
+    except ValueError as exc:
+        assert "-1" in str(exc)
+    else:
+        raise AssertionError("ValueError was not raised")
+
+    assert not path.exists()
+
+
+def test_silence_cache_writes_every_duration_once(tmp_path, monkeypatch):
+    written = []
+    write_silence = wav.write_silence
+    monkeypatch.setattr(wav, "write_silence", lambda path, *args: written.append(path) or write_silence(path, *args))
+    cache = wav.SilenceCache(str(tmp_path / "silence"))
+
+    first = cache.path(0.5)
+
+    assert cache.path(0.5) == first
+    assert wav.SilenceCache(str(tmp_path / "silence")).path(0.5) == first
+    assert cache.path(1.0) != first
+    assert len(written) == 2
+    assert wav_duration(first) == 0.5
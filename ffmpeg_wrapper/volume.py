@@ -0,0 +1,205 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import math
+import operator
+import os
+import random
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ffmpeg_wrapper.cache import MetadataCache
+from ffmpeg_wrapper.pipes import PIPE_OUTPUT, stream_command
+from ffmpeg_wrapper.simple import VOLUME_DETECT_CACHE_KIND, duration
+
+
+# volumedetect reports silence and values below it as -91.0 dB
+MIN_VOLUME = -91.0
+FULL_SCALE = 32768
+WINDOW_DURATION = 5.0
+PCM_CHUNK_SIZE = 1024 * 1024
+
+
+class PcmLevels(NamedTuple):
+    """
+    Sums of decoded signed 16 bit samples, levels of several regions are combined by merge.
+
+    :param count: the number of samples of all channels
+    :param sum_of_squares: sum of squared samples
+    :param peak: maximum absolute value of sample
+    """
+
+    count: int
+    sum_of_squares: float
+    peak: int
+
+    def merge(self, other: "PcmLevels") -> "PcmLevels":
+        return PcmLevels(
+            self.count + other.count,
+            self.sum_of_squares + other.sum_of_squares,
+            max(self.peak, other.peak),
+        )
+
+    def to_volume(self) -> Dict[str, float]:
+        """
+        Convert levels to dB relative to full scale the same way as volumedetect filter.
+
+        :return: dict with root_mean_square and max_volume of audio in dB
+        """
+
+        power = self.sum_of_squares / self.count / FULL_SCALE**2 if self.count else 0.0
+        peak = (self.peak / FULL_SCALE) ** 2
+        return {
+            "root_mean_square": round(max(10 * math.log10(power), MIN_VOLUME), 1) if power else MIN_VOLUME,
+            "max_volume": round(max(10 * math.log10(peak), MIN_VOLUME), 1) if peak else MIN_VOLUME,
+        }
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def _numpy_chunk_levels(numpy, chunk: bytes) -> PcmLevels:
+    samples = numpy.frombuffer(chunk, dtype="<i2").astype(numpy.int64)
+    if not samples.size:
+        return PcmLevels(0, 0.0, 0)
+    return PcmLevels(int(samples.size), float(numpy.dot(samples, samples)), int(numpy.abs(samples).max()))
+
+
+def _array_chunk_levels(chunk: bytes) -> PcmLevels:
+    samples = array("h", chunk)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return PcmLevels(0, 0.0, 0)
+    return PcmLevels(len(samples), float(sum(map(operator.mul, samples, samples))), max(max(samples), -min(samples)))
+
+
+def pcm_ffmpeg_command(
+    input_path: str,
+    start: Optional[float] = None,
+    window_duration: Optional[float] = None,
+) -> List[str]:
+    """
+    Build command for ffmpeg which decodes audio to raw signed 16 bit samples and writes them to output.
+
+    :param input_path: path to audio file
+    :param start: start of decoded region in seconds, by default from the beginning
+    :param window_duration: duration of decoded region in seconds, by default till the end
+    :return: completed ffmpeg command for shell
+    """
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if start is not None:
+        command.extend(["-ss", f"{start:.3f}"])
+    if window_duration is not None:
+        command.extend(["-t", f"{window_duration:.3f}"])
+    command.extend(["-i", input_path, "-vn", "-f", "s16le", "-acodec", "pcm_s16le", PIPE_OUTPUT])
+    return command
+
+
+def pcm_levels(chunks: Iterable[bytes]) -> PcmLevels:
+    """
+    Calculate levels of raw signed 16 bit little endian samples by blocks, so memory doesn't depend on length of audio.
+    Blocks are summed by NumPy if it is installed, otherwise by pure Python which is much slower.
+
+    :param chunks: chunks of samples, every chunk has even size
+    :return: levels of samples
+    """
+
+    numpy = _numpy()
+    levels = PcmLevels(0, 0.0, 0)
+    for chunk in chunks:
+        if numpy is not None:
+            levels = levels.merge(_numpy_chunk_levels(numpy, chunk))
+        else:
+            levels = levels.merge(_array_chunk_levels(chunk))
+
+    return levels
+
+
+def stratified_windows(
+    total: float,
+    count: int,
+    window_duration: float = WINDOW_DURATION,
+    rng: Optional[random.Random] = None,
+) -> List[Tuple[float, float]]:
+    """
+    Choose regions for estimate of levels. Audio is split to count strata of equal duration and one window
+    is placed randomly inside every stratum, so the whole book is covered evenly.
+
+    :param total: duration of audio in seconds
+    :param count: the number of windows
+    :param window_duration: duration of one window in seconds
+    :param rng: random generator, pass seeded one for reproducible estimate
+    :return: pairs of start and duration in seconds, whole audio if windows would cover it
+    """
+
+    if count * window_duration >= total:
+        return [(0.0, total)]
+
+    rng = rng or random.Random()
+    stratum = total / count
+    return [(index * stratum + rng.uniform(0, stratum - window_duration), window_duration) for index in range(count)]
+
+
+def _window_levels(input_path: str, start: Optional[float], window_duration: Optional[float]) -> PcmLevels:
+    return pcm_levels(
+        stream_command(
+            pcm_ffmpeg_command,
+            input_path=input_path,
+            start=start,
+            window_duration=window_duration,
+            chunk_size=PCM_CHUNK_SIZE,
+        )
+    )
+
+
+def fast_volume_detect(
+    path_to_file: str,
+    sample_windows: Optional[int] = None,
+    window_duration: float = WINDOW_DURATION,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    cache: Optional[MetadataCache] = None,
+) -> Dict[str, float]:
+    """
+    Return mean and max volume of audio file like ffmpeg_wrapper.simple.volume_detect, but levels are calculated
+    over raw samples decoded by ffmpeg instead of volumedetect filter (see pcm_levels).
+
+    If sample_windows is set then only so many windows of audio are decoded (see stratified_windows)
+    and result is estimate: mean volume is close to exact one, max volume can be lower than exact one.
+
+    :param path_to_file: path to audio file
+    :param sample_windows: the number of sampled windows, by default the whole audio is decoded
+    :param window_duration: duration of one sampled window in seconds
+    :param seed: seed of random placement of windows
+    :param max_workers: maximum number of concurrently decoded windows, by default the number of CPUs
+    :param cache: cache of metadata, exact result is shared with volume_detect, estimate isn't cached
+    :return: dict with root_mean_square and max_volume of audio in dB
+    """
+
+    if not sample_windows:
+        if cache is not None:
+            cached = cache.get(path_to_file, VOLUME_DETECT_CACHE_KIND)
+            if cached is not None:
+                return cached
+
+        result = _window_levels(path_to_file, None, None).to_volume()
+        if cache is not None:
+            cache.set(path_to_file, VOLUME_DETECT_CACHE_KIND, result)
+        return result
+
+    windows = stratified_windows(duration(path_to_file), sample_windows, window_duration, random.Random(seed))
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(windows)))
+
+    levels = PcmLevels(0, 0.0, 0)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for window_levels in executor.map(lambda window: _window_levels(path_to_file, *window), windows):
+            levels = levels.merge(window_levels)
+
+    return levels.to_volume()
@@ -0,0 +1,296 @@
+import os
+import struct
+import tempfile
+import threading
+from typing import BinaryIO, Dict, NamedTuple, Optional, Tuple
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+PCM_FORMATS = (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT)
+
+# header chunks like LIST or bext are skipped, but file with too many of them is left to ffprobe
+MAX_CHUNKS = 32
+RF64_SIZE_PLACEHOLDER = 0xFFFFFFFF
+
+# parameters of audio created by ffmpeg_wrapper.simple.silent_ffmpeg_command
+SILENCE_SAMPLE_RATE = 48000
+SILENCE_CHANNELS = 1
+SILENCE_CODEC = "pcm_s16le"
+# zero samples are zero bytes in both integer and float formats
+SILENCE_CODECS = {"pcm_s16le": (WAVE_FORMAT_PCM, 16), "pcm_f32le": (WAVE_FORMAT_IEEE_FLOAT, 32)}
+MAX_RIFF_DATA_SIZE = 0xFFFFFFFF - 36
+
+
+class WavInfo(NamedTuple):
+    """
+    Parameters of PCM stream in WAV file.
+
+    :param format_tag: WAVE_FORMAT_PCM for integer samples or WAVE_FORMAT_IEEE_FLOAT for float samples
+    :param channels: the number of channels
+    :param sample_rate: sample rate
+    :param bits_per_sample: size of one sample of one channel in bits
+    :param data_offset: offset of audio data from beginning of file
+    :param data_size: size of audio data in bytes
+    """
+
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def block_align(self) -> int:
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def duration(self) -> float:
+        return self.data_size / (self.sample_rate * self.block_align)
+
+    @property
+    def codec_name(self) -> str:
+        """
+        Name of codec in terms of ffmpeg, for example "pcm_s16le".
+        """
+
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            return f"pcm_f{self.bits_per_sample}le"
+
+        if self.bits_per_sample == 8:
+            return "pcm_u8"
+
+        return f"pcm_s{self.bits_per_sample}le"
+
+
+def _read_chunk_header(f: BinaryIO) -> Optional[tuple]:
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+
+    return struct.unpack("<4sI", header)
+
+
+def _parse_fmt(body: bytes) -> Optional[tuple]:
+    if len(body) < 16:
+        return None
+
+    format_tag, channels, sample_rate, _, block_align, bits_per_sample = struct.unpack("<HHIIHH", body[:16])
+
+    if format_tag == WAVE_FORMAT_EXTENSIBLE:
+        # WAVEFORMATEXTENSIBLE: cbSize, valid bits, channel mask, then GUID which starts with format tag
+        if len(body) < 26:
+            return None
+        format_tag = struct.unpack("<H", body[24:26])[0]
+
+    if format_tag not in PCM_FORMATS or not channels or not sample_rate:
+        return None
+
+    # zero sizes of sample would make duration infinite, such header is left to ffprobe
+    if not bits_per_sample or bits_per_sample % 8 or not block_align:
+        return None
+
+    if block_align != channels * bits_per_sample // 8:
+        return None
+
+    return format_tag, channels, sample_rate, bits_per_sample
+
+
+def _walk_chunks(f: BinaryIO, file_size: int, is_rf64: bool) -> Optional[WavInfo]:
+    rf64_data_size = None
+    fmt = None
+
+    for _ in range(MAX_CHUNKS):
+        chunk = _read_chunk_header(f)
+        if chunk is None:
+            return None
+
+        chunk_id, chunk_size = chunk
+
+        if chunk_id == b"ds64":
+            body = f.read(chunk_size)
+            if len(body) < 24:
+                return None
+            # riff size, data size, sample count
+            rf64_data_size = struct.unpack("<QQQ", body[:24])[1]
+        elif chunk_id == b"fmt ":
+            fmt = _parse_fmt(f.read(chunk_size))
+            if fmt is None:
+                return None
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+
+            if is_rf64 and chunk_size == RF64_SIZE_PLACEHOLDER:
+                if rf64_data_size is None:
+                    return None
+                chunk_size = rf64_data_size
+
+            data_offset = f.tell()
+            # size of data which is being written yet or is truncated is unknown, let ffprobe estimate it
+            if chunk_size == 0 or data_offset + chunk_size > file_size:
+                return None
+
+            return WavInfo(*fmt, data_offset=data_offset, data_size=chunk_size)
+        else:
+            f.seek(chunk_size, os.SEEK_CUR)
+
+        # chunks are aligned to two bytes
+        if chunk_size % 2:
+            f.seek(1, os.SEEK_CUR)
+
+    return None
+
+
+def read_wav_info(file_path: str) -> Optional[WavInfo]:
+    """
+    Read parameters of PCM stream from RIFF/WAVE or RF64 header. Only chunk headers are read,
+    audio data is skipped with seek.
+
+    :param file_path: path to audio file
+    :return: info about stream or None if file isn't PCM WAV or its header can't be parsed confidently
+    """
+
+    try:
+        with open(file_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            riff = f.read(12)
+            if len(riff) < 12 or riff[8:12] != b"WAVE" or riff[:4] not in (b"RIFF", b"RF64"):
+                return None
+
+            return _walk_chunks(f, file_size, riff[:4] == b"RF64")
+    except OSError:
+        return None
+
+
+def wav_duration(file_path: str) -> Optional[float]:
+    """
+    Return duration of PCM WAV file in seconds from its header.
+
+    :param file_path: path to audio file
+    :return: duration or None if file isn't PCM WAV or its header can't be parsed confidently
+    """
+
+    info = read_wav_info(file_path)
+    if info is None:
+        return None
+
+    return info.duration
+
+
+def wav_header(
+    channels: int,
+    sample_rate: int,
+    bits_per_sample: int,
+    data_size: int,
+    format_tag: int = WAVE_FORMAT_PCM,
+) -> bytes:
+    """
+    Build header of RIFF/WAVE file with PCM samples.
+
+    :param channels: the number of channels
+    :param sample_rate: sample rate
+    :param bits_per_sample: size of one sample of one channel in bits
+    :param data_size: size of audio data in bytes
+    :param format_tag: WAVE_FORMAT_PCM for integer samples or WAVE_FORMAT_IEEE_FLOAT for float samples
+    :return: 44 bytes of header which is followed by audio data
+    """
+
+    block_align = channels * bits_per_sample // 8
+    byte_rate = sample_rate * block_align
+    fmt = struct.pack("<HHIIHH", format_tag, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+    return b"".join(
+        [
+            struct.pack("<4sI4s", b"RIFF", 36 + data_size, b"WAVE"),
+            struct.pack("<4sI", b"fmt ", len(fmt)),
+            fmt,
+            struct.pack("<4sI", b"data", data_size),
+        ]
+    )
+
+
+def write_silence(
+    output_path: str,
+    duration_value: float,
+    sample_rate: int = SILENCE_SAMPLE_RATE,
+    channels: int = SILENCE_CHANNELS,
+    codec: str = SILENCE_CODEC,
+) -> None:
+    """
+    Write silent PCM WAV file without ffmpeg. Only header is written, file is extended by truncate,
+    so file system fills audio data with zeros and doesn't store them at all if it supports sparse files.
+    Duration is rounded to milliseconds like in ffmpeg_wrapper.simple.silent_ffmpeg_command.
+
+    :param output_path: path to result
+    :param duration_value: duration for silent audio in seconds
+    :param sample_rate: sample rate
+    :param channels: the number of channels
+    :param codec: "pcm_s16le" or "pcm_f32le"
+    """
+
+    if not duration_value >= 0:
+        raise ValueError(f"duration of silence must be non-negative, got {duration_value}")
+
+    format_tag, bits_per_sample = SILENCE_CODECS[codec]
+    block_align = channels * bits_per_sample // 8
+    data_size = round(round(duration_value, 3) * sample_rate) * block_align
+    if data_size > MAX_RIFF_DATA_SIZE:
+        raise ValueError(f"silence of {duration_value} seconds doesn't fit to WAV file")
+
+    header = wav_header(channels, sample_rate, bits_per_sample, data_size, format_tag)
+    with open(output_path, "wb") as f:
+        f.write(header)
+        f.truncate(len(header) + data_size)
+
+
+class SilenceCache:
+    """
+    Directory of silent WAV files, every duration is written once and its path is reused by next calls.
+    Files are written to temporary file and renamed, so concurrent processes never see partial file.
+    """
+
+    def __init__(self, directory: str, sample_rate: int = SILENCE_SAMPLE_RATE, channels: int = SILENCE_CHANNELS):
+        """
+        :param directory: directory where silent files are kept
+        :param sample_rate: sample rate
+        :param channels: the number of channels
+        """
+
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._paths: Dict[Tuple[int, int, int], str] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, duration_value: float) -> str:
+        """
+        Return path to silent audio with selected duration, write it if it doesn't exist yet.
+
+        :param duration_value: duration for silent audio in seconds
+        :return: path to silent WAV file
+        """
+
+        milliseconds = round(duration_value * 1000)
+        key = (milliseconds, self.sample_rate, self.channels)
+
+        with self._lock:
+            path = self._paths.get(key)
+            if path is not None:
+                return path
+
+            path = os.path.join(self.directory, f"silence_{milliseconds}ms_{self.sample_rate}_{self.channels}.wav")
+            if not os.path.exists(path):
+                fd, tmp_path = tempfile.mkstemp(prefix=".silence.", suffix=".wav", dir=self.directory)
+                os.close(fd)
+                try:
+                    write_silence(tmp_path, milliseconds / 1000, self.sample_rate, self.channels)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+
+            self._paths[key] = path
+            return path